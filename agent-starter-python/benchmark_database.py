@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Database benchmarks for the Glow Beauty Salon help-request store
+
+Usage:
+    python benchmark_database.py connections [--threads 4] [--ops 500]
+    python benchmark_database.py search [--answers 100000] [--queries 200]
+    python benchmark_database.py write-behind [--inserts 5000] [--synchronous FULL]
+    python benchmark_database.py rows [--requests 100000]
+    python benchmark_database.py startup [--calls 50]
+    python benchmark_database.py index [--sizes 10000 1000000] [--queries 200]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+sys.path.insert(0, 'src')
+
+from database import Database, RequestStatus, _fts_query as database_fts_query, _to_epoch_ms
+
+
+class ConnectPerCallStore:
+    """The original access pattern: open, query, commit and close on every call"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Database(db_path).close()
+        # Reset to the default rollback journal so "before" really is the old setup
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+    async def create_help_request(self, id: str, customer_phone: str, question: str):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            INSERT INTO help_requests (id, customer_phone, question, status, created_at)
+            VALUES (?, ?, ?, 'pending', ?)
+        ''', (id, customer_phone, question, _to_epoch_ms(datetime.now())))
+        conn.commit()
+        conn.close()
+
+    async def get_pending_requests(self):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            "SELECT * FROM help_requests WHERE status = 'pending' ORDER BY created_at"
+        ).fetchall()
+        conn.close()
+        return rows
+
+    def close(self):
+        pass
+
+
+def _worker(store, ops: int, errors: list):
+    async def run():
+        for i in range(ops):
+            try:
+                if i % 2 == 0:
+                    await store.create_help_request(str(uuid.uuid4()), "+15550000000", f"question {i}")
+                else:
+                    await store.get_pending_requests()
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+
+    asyncio.run(run())
+
+
+def _run_threads(store, threads: int, ops: int) -> tuple:
+    errors: list = []
+    workers = [threading.Thread(target=_worker, args=(store, ops, errors)) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return (threads * ops) / elapsed, len(errors)
+
+
+def bench_connections(args):
+    print(f"Mixed insert/read workload: {args.threads} threads x {args.ops} ops\n")
+    for label, store_cls in (("connect per call (before)", ConnectPerCallStore),
+                             ("pooled WAL connections (after)", Database)):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = store_cls(os.path.join(tmp, "bench.db"))
+            ops_per_sec, errors = _run_threads(store, args.threads, args.ops)
+            store.close()
+        print(f"{label:<32} {ops_per_sec:>10.0f} ops/sec   locked errors: {errors}")
+
+
+SERVICES = ["haircut", "balayage", "highlights", "keratin", "manicure", "pedicure", "gel", "facial",
+            "microblading", "lash lift", "brow tint", "waxing", "threading", "perm", "extensions", "massage"]
+ASPECTS = ["price", "duration", "aftercare", "availability", "deposit", "cancellation", "allergy", "parking"]
+
+
+def _populate_learned_answers(db: Database, count: int):
+    rng = random.Random(42)
+    now = _to_epoch_ms(datetime.now())
+    rows = []
+    for i in range(count):
+        service, aspect = rng.choice(SERVICES), rng.choice(ASPECTS)
+        rows.append((str(uuid.uuid4()), f"What is the {aspect} for {service} {i}?",
+                     f"The {aspect} for {service} depends on the stylist, ask about option {i}.", now))
+    with db.connections.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO learned_answers (id, question, answer, learned_at) VALUES (?, ?, ?, ?)", rows
+        )
+
+
+def _summarize(timings: list) -> tuple:
+    timings.sort()
+    return statistics.mean(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def _latency_ms(fn, queries) -> tuple:
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        timings.append((time.perf_counter() - start) * 1000)
+    return _summarize(timings)
+
+
+def _async_latency_ms(fn, queries) -> tuple:
+    async def run():
+        timings = []
+        for q in queries:
+            start = time.perf_counter()
+            await fn(q)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    return _summarize(asyncio.run(run()))
+
+
+def bench_search(args):
+    rng = random.Random(7)
+    queries = [f"{rng.choice(ASPECTS)} {rng.choice(SERVICES)}" for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        _populate_learned_answers(db, args.answers)
+        print(f"Loaded {args.answers} learned answers in {time.perf_counter() - start:.1f}s\n")
+
+        conn = db.connections.get()
+
+        def like_scan(q):
+            conn.execute('''
+                SELECT id, question, answer, learned_at FROM learned_answers
+                WHERE question LIKE ? OR answer LIKE ?
+                ORDER BY learned_at DESC
+            ''', (f"%{q}%", f"%{q}%")).fetchall()
+
+        def fts_query_only(q):
+            db._select_matching_answers(conn, database_fts_query(q), 5)
+
+        results = (
+            ("LIKE scan (before)", _latency_ms(like_scan, queries)),
+            ("FTS5 BM25 top-5, query only (after)", _latency_ms(fts_query_only, queries)),
+            ("FTS5 BM25 top-5, awaited (after)", _async_latency_ms(db.search_learned_answers, queries)),
+        )
+        for label, (mean, p95) in results:
+            print(f"{label:<40} mean {mean:8.2f} ms   p95 {p95:8.2f} ms")
+        db.close()
+
+
+def bench_write_behind(args):
+    print(f"{args.inserts} concurrent create_help_request calls, synchronous={args.synchronous}\n")
+
+    async def burst(db: Database) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            db.create_help_request(str(uuid.uuid4()), "+15550000000", f"question {i}")
+            for i in range(args.inserts)
+        ))
+        await db.flush()
+        return time.perf_counter() - start
+
+    modes = (
+        ("commit per insert (before)", {}),
+        (f"write-behind, {args.interval * 1000:.0f} ms window (after)",
+         {"write_behind": True, "write_behind_max_batch": args.batch, "write_behind_interval": args.interval}),
+    )
+    for label, options in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "bench.db"), **options)
+            # Only the writer thread's connection commits, so that is where fsync policy matters
+            db.executor.submit_write(lambda cursor: cursor.connection.execute(
+                f"PRAGMA synchronous = {args.synchronous}")).result()
+            elapsed = asyncio.run(burst(db))
+            assert db.executor.submit_read(db._count_requests, None).result() == args.inserts
+            db.close()
+        print(f"{label:<40} {args.inserts / elapsed:>10.0f} inserts/sec")
+
+
+@dataclass
+class EagerHelpRequest:
+    """The original row type: a regular dataclass decoded eagerly"""
+    id: str
+    customer_phone: str
+    question: str
+    status: RequestStatus
+    created_at: datetime
+    supervisor_response: Optional[str] = None
+    responded_at: Optional[datetime] = None
+
+
+def _eager_from_row(row) -> EagerHelpRequest:
+    return EagerHelpRequest(
+        id=row[0],
+        customer_phone=row[1],
+        question=row[2],
+        status=RequestStatus(row[3]),
+        created_at=datetime.fromtimestamp(row[4] / 1000),
+        supervisor_response=row[5],
+        responded_at=datetime.fromtimestamp(row[6] / 1000) if row[6] else None
+    )
+
+
+def _measure_listing(build) -> tuple:
+    start = time.perf_counter()
+    items = build()
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for item in items:
+        item.created_at
+    touched = time.perf_counter() - start
+    del items
+
+    # Allocation counts come from a second, traced run so tracing does not skew wall time
+    tracemalloc.start()
+    items = build()
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    size = sum(stat.size for stat in snapshot.statistics("filename"))
+    return elapsed, touched, blocks, size, peak
+
+
+def bench_rows(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        now = _to_epoch_ms(datetime.now())
+        with db.connections.transaction() as cursor:
+            cursor.executemany(
+                "INSERT INTO help_requests (id, customer_phone, question, status, created_at, "
+                "supervisor_response, responded_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(str(uuid.uuid4()), "+15550000000", f"question {i}", "resolved" if i % 2 else "pending",
+                  now, "Yes." if i % 2 else None, now if i % 2 else None) for i in range(args.requests)],
+            )
+        conn = db.connections.get()
+        sql = '''
+            SELECT id, customer_phone, question, status, created_at, supervisor_response, responded_at
+            FROM help_requests ORDER BY created_at DESC
+        '''
+
+        print(f"get_all_requests over {args.requests} rows\n")
+        print(f"{'':<26} {'wall':>8} {'+created_at':>12} {'live blocks':>12} {'retained':>10} {'peak':>9}")
+        for label, build in (
+            ("eager dataclass (before)", lambda: [_eager_from_row(r) for r in conn.execute(sql)]),
+            ("lazy slots row (after)", lambda: db._select_requests(conn, "", (), "created_at DESC")),
+        ):
+            elapsed, touched, blocks, size, peak = _measure_listing(build)
+            print(f"{label:<26} {elapsed * 1000:>6.0f}ms {touched * 1000:>10.0f}ms {blocks:>12,} "
+                  f"{size / 2**20:>8.1f}MB {peak / 2**20:>7.1f}MB")
+
+        start = time.perf_counter()
+        asyncio.run(db.get_all_requests())
+        print(f"\nawaited get_all_requests (after): {(time.perf_counter() - start) * 1000:.0f}ms")
+        db.close()
+
+
+def bench_startup(args):
+    from learned_answer_cache import LearnedAnswerCache
+
+    async def first_lookup(answers: LearnedAnswerCache):
+        await answers.search_learned_answers("hair extensions")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed = Database(path)
+        _populate_learned_answers(seed, 1000)
+        seed.close()
+
+        # Before: every call opened (and schema-checked) its own Database
+        timings = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            db = Database(path)
+            asyncio.run(first_lookup(LearnedAnswerCache(db)))
+            timings.append((time.perf_counter() - start) * 1000)
+            db.close()
+        per_call = _summarize(timings)
+
+        # After: prewarm opens one Database per worker process and calls share it
+        shared = Database(path)
+        answers = LearnedAnswerCache(shared)
+        timings = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            asyncio.run(first_lookup(answers))
+            timings.append((time.perf_counter() - start) * 1000)
+        shared.close()
+
+    print(f"Call setup up to the first learned-answer lookup, {args.calls} calls\n")
+    for label, (mean, p95) in (("Database per call (before)", per_call),
+                               ("shared from prewarm (after)", _summarize(timings))):
+        print(f"{label:<32} mean {mean:8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def bench_index(args):
+    from answer_index import LearnedAnswerIndex
+
+    rng = random.Random(11)
+    queries = [f"{rng.choice(ASPECTS)} for {rng.choice(SERVICES)}?" for _ in range(args.queries)]
+    print(f"Cosine top-3 over learned-answer questions, {args.queries} queries\n")
+    for size in args.sizes:
+        index = LearnedAnswerIndex(None)
+        start = time.perf_counter()
+        for offset in range(0, size, 50_000):
+            batch = range(offset, min(size, offset + 50_000))
+            index.add([str(i) for i in batch],
+                      [f"What is the {rng.choice(ASPECTS)} for {rng.choice(SERVICES)} {i}?" for i in batch])
+        build = time.perf_counter() - start
+        mean, p95 = _latency_ms(lambda q: index.nearest(q, k=3), queries)
+        print(f"{size:>9,} questions  build {build:6.1f}s  matrix {len(index) * index.dim * 4 / 2**20:7.1f}MB   "
+              f"query mean {mean:7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    connections = sub.add_parser("connections", help="connect-per-call vs pooled WAL connections")
+    connections.add_argument("--threads", type=int, default=4)
+    connections.add_argument("--ops", type=int, default=500)
+    connections.set_defaults(func=bench_connections)
+
+    search = sub.add_parser("search", help="LIKE scan vs FTS5 ranked search over learned answers")
+    search.add_argument("--answers", type=int, default=100_000)
+    search.add_argument("--queries", type=int, default=200)
+    search.set_defaults(func=bench_search)
+
+    write_behind = sub.add_parser("write-behind", help="commit per insert vs write-behind group commit")
+    write_behind.add_argument("--inserts", type=int, default=5000)
+    write_behind.add_argument("--batch", type=int, default=100)
+    write_behind.add_argument("--interval", type=float, default=0.05)
+    write_behind.add_argument("--synchronous", choices=["OFF", "NORMAL", "FULL"], default="NORMAL")
+    write_behind.set_defaults(func=bench_write_behind)
+
+    rows = sub.add_parser("rows", help="eager dataclass rows vs lazily decoded slot rows")
+    rows.add_argument("--requests", type=int, default=100_000)
+    rows.set_defaults(func=bench_rows)
+
+    startup = sub.add_parser("startup", help="per-call Database vs one shared from prewarm")
+    startup.add_argument("--calls", type=int, default=50)
+    startup.set_defaults(func=bench_startup)
+
+    index = sub.add_parser("index", help="semantic nearest-neighbour lookup latency by index size")
+    index.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    index.add_argument("--queries", type=int, default=200)
+    index.set_defaults(func=bench_index)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Offline load test: how many concurrent calls one worker process handles
+
+Usage:
+    python load_test.py [--sessions 1 10 25 50] [--turns 6] [--llm-ttft 0.35] [--tts-ttfb 0.15]
+                        [--fast-llm-ttft 0.15]
+
+Runs N simultaneous AgentSessions with the real Assistant in one process. STT,
+LLM and TTS are the deterministic stand-ins from src/offline_plugins.py, so no
+network or API keys are needed. Each simulated caller speaks a seeded mix of
+small talk, questions with learned answers and new questions that escalate to
+a supervisor, and waits for the agent to finish speaking before the next turn.
+With --fast-llm-ttft, turns are routed between a fast and a large LLM as in
+production (src/llm_router.py), the large one keeping --llm-ttft.
+
+Each concurrency level runs in a fresh process and reports:
+
+    turn latency   end of caller speech -> first agent audio, p50/p95/p99 per kind of turn
+    loop lag       how late a 10 ms timer fires on the shared event loop
+    CPU            process CPU time per session, as a share of one core
+    RSS            resident memory growth per session
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+sys.path.insert(0, 'src')
+
+from livekit.agents import AgentSession
+
+from agent import Assistant
+from answer_index import LearnedAnswerIndex
+from database import Database
+from learned_answer_cache import LearnedAnswerCache
+from llm_router import RoutingLLM
+from offline_plugins import PacedAudioOutput, RuleBasedLLM, ScriptedSTT, SilenceInput, ToneTTS
+from question_classifier import QuestionClassifier
+from supervisor_alerts import SupervisorAlertDispatcher
+
+LEARNED_ANSWERS = [
+    ("Do you offer hair extensions?", "Yes, we do tape-in and clip-in extensions, from $250."),
+    ("How much is a brow tint?", "A brow tint is $25 and takes about 15 minutes."),
+    ("Do you do keratin treatments?", "Yes, keratin smoothing starts at $200."),
+    ("Can I get a lash lift if I wear contacts?", "Yes, just bring your case so you can take them out."),
+]
+
+CALLER_LINES = {
+    "small_talk": ["Can you hear me?", "Hello?", "Thank you so much."],
+    "learned": [question for question, _ in LEARNED_ANSWERS],
+    # A handful of new questions, so concurrent callers sometimes join one request
+    "escalation": [
+        "Do you have a stylist who does bridal updos?",
+        "Is microblading safe during pregnancy?",
+        "Can you fix a bad bleach job from another salon?",
+        "Do you do hair coloring for kids with green dye?",
+        "Can my dog come with me to my appointment?",
+    ],
+}
+TURN_WEIGHTS = {"small_talk": 2, "learned": 3, "escalation": 2}
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current RSS outside Linux; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def _monitor(lags: List[float], rss: List[int], interval: float = 0.01):
+    """Sample event-loop lag every `interval` and RSS every ~0.5 s until cancelled"""
+    ticks = 0
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+        ticks += 1
+        if ticks % 50 == 0:
+            rss.append(_rss_bytes())
+
+
+async def _run_caller(index: int, args, shared: Dict, latencies: Dict[str, List[float]], timeouts: List[str]):
+    async def discard_alerts(alerts):
+        pass
+
+    rng = random.Random(args.seed * 1000 + index)
+    stt = ScriptedSTT(words_per_second=args.words_per_second)
+    audio_started = asyncio.Event()
+    audio_start_times: List[float] = []
+
+    def on_audio_start(t: float):
+        audio_start_times.append(t)
+        audio_started.set()
+
+    listening = asyncio.Event()
+    session_llm = RuleBasedLLM(ttft=args.llm_ttft, classifier=shared["classifier"])
+    if args.fast_llm_ttft is not None:
+        session_llm = RoutingLLM(fast=RuleBasedLLM(ttft=args.fast_llm_ttft, classifier=shared["classifier"]),
+                                 large=session_llm, classifier=shared["classifier"])
+    session = AgentSession(
+        stt=stt,
+        llm=session_llm,
+        tts=ToneTTS(ttfb=args.tts_ttfb),
+        turn_detection="stt",
+        min_endpointing_delay=args.endpointing_delay,
+        preemptive_generation=True,
+        resume_false_interruption=False,
+    )
+    session.on("agent_state_changed",
+               lambda ev: listening.set() if ev.new_state == "listening" else listening.clear())
+    session.input.audio = SilenceInput()
+    session.output.audio = PacedAudioOutput(on_audio_start=on_audio_start)
+    assistant = Assistant(
+        db=shared["db"],
+        learned_answers=shared["learned_answers"],
+        answer_index=shared["answer_index"],
+        classifier=shared["classifier"],
+        alerts=SupervisorAlertDispatcher(discard_alerts),
+        speculative_lookup=args.speculative_lookup,
+    )
+    assistant.set_customer_phone(f"+1555{index:07d}")
+
+    # Callers don't all dial in on the same tick
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    await session.start(agent=assistant)
+    kinds = list(TURN_WEIGHTS)
+    try:
+        for _ in range(args.turns):
+            kind = rng.choices(kinds, weights=[TURN_WEIGHTS[k] for k in kinds])[0]
+            await asyncio.wait_for(listening.wait(), args.turn_timeout)
+            audio_started.clear()
+            ended = await stt.speak(rng.choice(CALLER_LINES[kind]))
+            try:
+                await asyncio.wait_for(audio_started.wait(), args.turn_timeout)
+            except asyncio.TimeoutError:
+                timeouts.append(kind)
+                continue
+            # Small talk can be answered from the final transcript, just before
+            # end of speech; count that as no wait rather than negative
+            latencies[kind].append(max(0.0, audio_start_times[-1] - ended))
+            listening.clear()
+            await asyncio.wait_for(listening.wait(), args.turn_timeout)
+            await asyncio.sleep(rng.uniform(0.2, 1.0))
+    finally:
+        await session.aclose()
+
+
+async def _run_level(sessions: int, args) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        # Shared per worker process, as prewarm sets them up
+        db = Database(os.path.join(tmp, "load.db"))
+        for question, answer in LEARNED_ANSWERS:
+            await db.add_learned_answer(question, answer)
+        answer_index = LearnedAnswerIndex(db)
+        await answer_index.sync(force=True)
+        QuestionClassifier.compile()
+        shared = {"db": db, "learned_answers": LearnedAnswerCache(db), "answer_index": answer_index,
+                  "classifier": QuestionClassifier}
+
+        latencies: Dict[str, List[float]] = {kind: [] for kind in TURN_WEIGHTS}
+        timeouts: List[str] = []
+        lags: List[float] = []
+        rss = [_rss_bytes()]
+        monitor = asyncio.create_task(_monitor(lags, rss))
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        results = await asyncio.gather(
+            *(_run_caller(i, args, shared, latencies, timeouts) for i in range(sessions)),
+            return_exceptions=True,
+        )
+        cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+        monitor.cancel()
+        requests = await db.count_requests()
+        db.close()
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    for error in errors[:3]:
+        print(f"  session failed: {error!r}", file=sys.stderr)
+    return {
+        "sessions": sessions,
+        "latencies": latencies,
+        "timeouts": len(timeouts),
+        "errors": len(errors),
+        "lag_p99_ms": (_percentile(lags, 99) or 0) * 1000,
+        "lag_max_ms": max(lags, default=0) * 1000,
+        "cpu_pct_per_session": cpu / wall / sessions * 100,
+        "cpu_pct_total": cpu / wall * 100,
+        "rss_mb_per_session": (max(rss) - rss[0]) / sessions / 2**20,
+        "help_requests": requests,
+    }
+
+
+def _level_in_process(sessions: int, args) -> Dict:
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.ERROR)
+    return asyncio.run(_run_level(sessions, args))
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value * 1000:7.0f}" if value is not None else "      -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 25, 50])
+    parser.add_argument("--turns", type=int, default=6, help="caller turns per session")
+    parser.add_argument("--llm-ttft", type=float, default=0.35, help="LLM time to first token, seconds")
+    parser.add_argument("--fast-llm-ttft", type=float, help="route turns to a fast LLM with this TTFT")
+    parser.add_argument("--tts-ttfb", type=float, default=0.15, help="TTS time to first audio, seconds")
+    parser.add_argument("--endpointing-delay", type=float, default=0.5)
+    parser.add_argument("--words-per-second", type=float, default=3.0, help="caller speaking rate")
+    parser.add_argument("--speculative-lookup", choices=["off", "inject", "answer"], default="inject")
+    parser.add_argument("--ramp", type=float, default=2.0, help="spread session starts over this many seconds")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="show agent logs")
+    args = parser.parse_args()
+
+    routing = f" (fast route {args.fast_llm_ttft * 1000:.0f} ms)" if args.fast_llm_ttft is not None else ""
+    print(f"LLM TTFT {args.llm_ttft * 1000:.0f} ms{routing}, TTS TTFB {args.tts_ttfb * 1000:.0f} ms, "
+          f"endpointing {args.endpointing_delay * 1000:.0f} ms, {args.turns} turns per session\n")
+    print(f"{'sessions':>8}  {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}  {'lag p99':>7} {'lag max':>7}  "
+          f"{'CPU/sess':>8} {'CPU tot':>7}  {'RSS/sess':>9}  {'timeouts':>8}")
+    breakdowns = []
+    for sessions in args.sessions:
+        # A fresh process per level, so RSS growth and loop state don't carry over
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(_level_in_process, sessions, args).result()
+        turns = [t for kind in result["latencies"].values() for t in kind]
+        print(f"{sessions:>8}  {_ms(_percentile(turns, 50))} {_ms(_percentile(turns, 95))} "
+              f"{_ms(_percentile(turns, 99))}  {result['lag_p99_ms']:7.1f} {result['lag_max_ms']:7.1f}  "
+              f"{result['cpu_pct_per_session']:7.2f}% {result['cpu_pct_total']:6.1f}%  "
+              f"{result['rss_mb_per_session']:7.2f}MB  {result['timeouts'] + result['errors']:>8}")
+        breakdowns.append(result)
+
+    print("\nTurn latency by kind (p50 / p95 ms)")
+    print(f"{'sessions':>8}  " + "  ".join(f"{kind:>17}" for kind in TURN_WEIGHTS))
+    for result in breakdowns:
+        cells = [f"{_ms(_percentile(t, 50)).strip():>7} / {_ms(_percentile(t, 95)).strip():<7}"
+                 for t in result["latencies"].values()]
+        print(f"{result['sessions']:>8}  " + "  ".join(f"{cell:>17}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import logging
+import os
+import time
 import uuid
 import asyncio
 from datetime import datetime
+from functools import partial
+from typing import AsyncIterable, Dict, List, Optional
 
+import aiohttp
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
@@ -16,20 +21,60 @@ from livekit.agents import (
     metrics,
     function_tool,
     RunContext,
+    ChatContext,
+    ChatMessage,
+    ModelSettings,
+    StopResponse,
+    UserInputTranscribedEvent,
+    UserStateChangedEvent,
+    AgentStateChangedEvent,
 )
-from livekit.plugins import noise_cancellation, silero, groq, elevenlabs
+from livekit.plugins import noise_cancellation, silero, groq, elevenlabs, openai
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
-from database import Database
+from database import Database, UNKNOWN_PHONE
+from learned_answer_cache import LearnedAnswerCache
+from llm_router import RoutingLLM
+from pipeline_metrics import PipelineMetrics, start_metrics_server
+from provider_failover import FailoverLLM, FailoverSTT, FailoverTTS
+from answer_index import LearnedAnswerIndex
 from question_classifier import QuestionClassifier
+from small_talk import SmallTalkShortCircuit
+from speculative_lookup import SpeculativeLookup
+from supervisor_alerts import SupervisorAlert, SupervisorAlertDispatcher
+from tool_metrics import ToolCallMetrics
+from tts_cache import TTSCache
 
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
+TTS_VOICE_ID = "2EiwWnXFnvU5JabPnv8n"  # Professional female voice
+TTS_MODEL = "eleven_turbo_v2_5"
+TTS_CACHE_DIR = "tts_cache"
+# Seconds prewarm may spend synthesizing canned lines; LiveKit allows a worker
+# 10 s to initialize, and lines not ready by then are spoken with live TTS
+TTS_PREWARM_TIMEOUT = 4.0
+
+LARGE_LLM_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+FAST_LLM_MODEL = "llama-3.1-8b-instant"
+STT_MODEL = "whisper-large-v3-turbo"
+
+# Backup providers, used when Groq or ElevenLabs is slow or failing
+BACKUP_LLM_MODEL = "gpt-4o-mini"
+BACKUP_STT_MODEL = "gpt-4o-mini-transcribe"
+BACKUP_TTS_MODEL = "tts-1"
+BACKUP_TTS_VOICE = "alloy"
+
+ESCALATION_RESPONSE = "That's a great question! I don't have that information right now, but let me check with my supervisor to get you an accurate answer."
+SUPERVISOR_UNAVAILABLE_RESPONSE = "I'm having trouble connecting with my supervisor right now. Please call us directly at 555-0123 for immediate assistance."
+
 
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(self, db: Optional[Database] = None, learned_answers: Optional[LearnedAnswerCache] = None,
+                 answer_index: Optional[LearnedAnswerIndex] = None, classifier=QuestionClassifier,
+                 tts_cache: Optional[TTSCache] = None, alerts: Optional[SupervisorAlertDispatcher] = None,
+                 speculative_lookup: str = "inject") -> None:
         super().__init__(
             instructions="""You are a professional AI receptionist for "Glow Beauty Salon", a high-end beauty salon offering various services.
 
@@ -61,8 +106,109 @@ ONLY escalate to human supervisor for:
 
 Your responses should be professional, friendly, and concise. Greet customers warmly and help them efficiently.""",
         )
-        self.db = Database()
+        # Workers share these through proc.userdata (see prewarm); a standalone
+        # Assistant opens its own
+        self.db = db if db is not None else Database()
+        self.learned_answers = learned_answers if learned_answers is not None else LearnedAnswerCache(self.db)
+        # An empty index is falsy (it has a length), so test for None
+        self.answer_index = answer_index if answer_index is not None else LearnedAnswerIndex(self.db)
+        self.small_talk = SmallTalkShortCircuit(classifier)
+        self.speculative = SpeculativeLookup(self.answer_index, mode=speculative_lookup)
+        self.tts_cache = tts_cache
+        self.alerts = alerts if alerts is not None else SupervisorAlertDispatcher()
+        self.tool_metrics = ToolCallMetrics()
         self.customer_phone = None
+        # Help requests this session opened or joined
+        self.escalations = 0
+        self._early_response: Optional[asyncio.Task] = None
+
+    def on_transcript(self, transcript: str, is_final: bool, user_speaking: bool = False):
+        """Classify the open user turn as STT transcripts arrive"""
+        response = self.small_talk.on_transcript(transcript, is_final, user_speaking)
+        if response is not None:
+            self._early_response = asyncio.create_task(self._respond_early(self.small_talk.turn_text, response))
+            self._early_response.add_done_callback(self._log_early_response_failure)
+        else:
+            # Search learned answers while the caller is still speaking
+            self.speculative.on_transcript(transcript, is_final)
+
+    async def _respond_early(self, transcript: str, response: str):
+        # Speak before end-of-turn detection; on_user_turn_completed then stops
+        # the turn. If the caller goes on speaking, the line is interrupted and
+        # the longer turn goes to the LLM.
+        chat_ctx = self.chat_ctx.copy()
+        chat_ctx.items.append(ChatMessage(role="user", content=[transcript]))
+        await self.update_chat_ctx(chat_ctx)
+        self.session.say(response)
+        logger.info(f"Answered small talk before end of turn: {transcript}")
+
+    @staticmethod
+    def _log_early_response_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to answer small talk early: {str(task.exception())}")
+
+    async def on_user_turn_completed(self, turn_ctx: ChatContext, new_message: ChatMessage) -> None:
+        if self.small_talk.end_turn(new_message.text_content or ""):
+            self.speculative.reset()
+            raise StopResponse()
+
+        # Answer small talk ("can you hear me?", "thanks") without an LLM round trip
+        start = time.perf_counter()
+        response = self.small_talk.response_for(new_message.text_content or "")
+        if response is None:
+            self.small_talk.record_turn(short_circuited=False)
+            await self._use_learned_answer(turn_ctx, new_message)
+            return
+
+        self.speculative.reset()
+        # Keep the user's turn in the history, since StopResponse drops it
+        chat_ctx = self.chat_ctx.copy()
+        chat_ctx.items.append(new_message)
+        await self.update_chat_ctx(chat_ctx)
+        self.session.say(response)
+        self.small_talk.record_turn(short_circuited=True, elapsed=time.perf_counter() - start)
+        logger.info(f"Answered small talk without the LLM: {new_message.text_content}")
+        raise StopResponse()
+
+    async def _use_learned_answer(self, turn_ctx: ChatContext, new_message: ChatMessage):
+        # A confident learned-answer match skips the LLM -> tool -> LLM round trip
+        answer = await self.speculative.match(new_message.text_content or "")
+        if answer is None:
+            return
+        logger.info(f"Speculative learned answer ({answer.score:.2f}) for: {new_message.text_content}")
+        if self.speculative.mode == "inject":
+            turn_ctx.add_message(
+                role="system",
+                content=f"A supervisor already answered this question (\"{answer.question}\"): {answer.answer} "
+                        f"Use this to answer directly; do not call request_help or check_learned_answers.",
+            )
+            return
+        chat_ctx = self.chat_ctx.copy()
+        chat_ctx.items.append(new_message)
+        await self.update_chat_ctx(chat_ctx)
+        self.session.say(answer.answer)
+        raise StopResponse()
+
+    async def llm_node(self, chat_ctx: ChatContext, tools, model_settings: ModelSettings):
+        # Preemptive generation starts on the stable partial transcript before
+        # on_user_turn_completed runs; don't spend a completion on small talk
+        last = chat_ctx.items[-1] if chat_ctx.items else None
+        if (isinstance(last, ChatMessage) and last.role == "user"
+                and self.small_talk.response_for(last.text_content or "") is not None):
+            return
+        async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            yield chunk
+
+    async def tts_node(self, text: AsyncIterable[str], model_settings: ModelSettings):
+        # Play pre-synthesized audio for canned and frequent lines
+        if self.tts_cache is None:
+            async for frame in Agent.default.tts_node(self, text, model_settings):
+                yield frame
+            return
+        async for frame in self.tts_cache.speak(
+            text, lambda replayed: Agent.default.tts_node(self, replayed, model_settings)
+        ):
+            yield frame
 
     @function_tool
     async def request_help(self, context: RunContext, question: str):
@@ -74,9 +220,13 @@ Your responses should be professional, friendly, and concise. Greet customers wa
         Args:
             question: The specific question that requires supervisor expertise
         """
+        with self.tool_metrics.measure("request_help"):
+            return await self._request_help(question)
+    
+    async def _request_help(self, question: str):
         try:
             # First check if we've learned this before
-            learned_answer = await self.check_learned_answers(context, question)
+            learned_answer = await self._check_learned_answers(question)
             if learned_answer:
                 logger.info(f"Found learned answer for: {question}")
                 return learned_answer
@@ -85,25 +235,26 @@ Your responses should be professional, friendly, and concise. Greet customers wa
             
             logger.info(f"Escalating to supervisor for: {question}")
             
-            # Create help request
-            request_id = str(uuid.uuid4())
-            request = await self.db.create_help_request(
-                id=request_id,
-                customer_phone=self.customer_phone or "unknown",
+            # Create help request, or join the pending one for the same question
+            request, created = await self.db.create_or_join_help_request(
+                id=str(uuid.uuid4()),
+                customer_phone=self.customer_phone or UNKNOWN_PHONE,
                 question=question
             )
+            self.escalations += 1
+            if not created:
+                # The supervisor is already on it; this caller gets the same follow-up
+                logger.info(f"Joined pending request {request.id} for: {question}")
+                return ESCALATION_RESPONSE
             
-            # Simulate supervisor notification (in real implementation, this would be a webhook/ SMS)
-            message = f"🆘 SUPERVISOR ALERT: Need help answering customer question: '{question}' from {self.customer_phone or 'unknown customer'}. Request ID: {request_id}"
-            print(f"\n{'='*50}")
-            print(f"SUPERVISOR NOTIFICATION: {message}")
-            print(f"{'='*50}\n")
+            # The request is committed, so the reply need not wait for the alert
+            self.alerts.enqueue(SupervisorAlert(request.id, question, self.customer_phone or "unknown customer"))
             
-            return "That's a great question! I don't have that information right now, but let me check with my supervisor to get you an accurate answer."
+            return ESCALATION_RESPONSE
             
         except Exception as e:
             logger.error(f"Error requesting help: {str(e)}")
-            return "I'm having trouble connecting with my supervisor right now. Please call us directly at 555-0123 for immediate assistance."
+            return SUPERVISOR_UNAVAILABLE_RESPONSE
     
     @function_tool  
     async def check_learned_answers(self, context: RunContext, query: str):
@@ -112,11 +263,19 @@ Your responses should be professional, friendly, and concise. Greet customers wa
         Args:
             query: The question or topic to search for in learned answers
         """
+        with self.tool_metrics.measure("check_learned_answers"):
+            return await self._check_learned_answers(query)
+    
+    async def _check_learned_answers(self, query: str):
         try:
-            answers = await self.db.search_learned_answers(query)
+            # Paraphrases first ("price for eyebrow tinting" vs "How much is a
+            # brow tint?"), then keyword search
+            answers = await self.answer_index.search(query, k=1)
+            if not answers:
+                answers = await self.learned_answers.search_learned_answers(query)
             
             if answers:
-                best_match = answers[0]  # Take the most recent match
+                best_match = answers[0]  # Take the best-ranked match
                 return f"Based on previous learning: {best_match.answer}"
             
             return None
@@ -153,22 +312,146 @@ def prewarm(proc: JobProcess):
     except Exception as e:
         logger.warning(f"Failed to prewarm VAD: {e}")
 
+    # Storage and the learned-answer index are shared by every job in this
+    # worker process, so calls don't open and migrate the database themselves
+    try:
+        db = Database()
+        proc.userdata["db"] = db
+        proc.userdata["learned_answers"] = LearnedAnswerCache(db)
+    except Exception as e:
+        logger.warning(f"Failed to open the database: {e}")
+
+    # Embed learned-answer questions up front; a saved index is memory-mapped
+    if "db" in proc.userdata:
+        try:
+            index_path = os.getenv("ANSWER_INDEX_PATH", "answer_index")
+            answer_index = asyncio.run(_open_answer_index(proc.userdata["db"], index_path))
+            proc.userdata["answer_index"] = answer_index
+            logger.info(f"Learned-answer index ready: {len(answer_index)} questions")
+        except Exception as e:
+            logger.warning(f"Failed to build the learned-answer index: {e}")
+
+    # Use the trained intent model (train_intent_model.py) when there is one
+    intent_model_path = os.getenv("INTENT_MODEL_PATH", "intent_model.npz")
+    if os.path.exists(intent_model_path):
+        try:
+            QuestionClassifier.load_intent_model(intent_model_path)
+            logger.info(f"Loaded intent model from {intent_model_path}")
+        except Exception as e:
+            logger.warning(f"Failed to load intent model: {e}")
+    QuestionClassifier.compile()
+    proc.userdata["classifier"] = QuestionClassifier
+
+    # Synthesize canned responses once per worker so they play without a TTS request
+    try:
+        tts_cache = TTSCache(TTS_CACHE_DIR, TTS_VOICE_ID, TTS_MODEL)
+        proc.userdata["tts_cache"] = tts_cache
+        added = asyncio.run(asyncio.wait_for(_prewarm_tts_cache(tts_cache), TTS_PREWARM_TIMEOUT))
+        logger.info(f"TTS cache ready: {len(tts_cache)} entries ({added} synthesized)")
+    except asyncio.TimeoutError:
+        logger.warning(f"TTS cache prewarm timed out after {TTS_PREWARM_TIMEOUT}s with "
+                       f"{len(tts_cache)} entries; the rest use live TTS")
+    except Exception as e:
+        logger.warning(f"Failed to prewarm TTS cache: {e}")
+
+
+async def _open_answer_index(db: Database, index_path: str) -> LearnedAnswerIndex:
+    """Map the saved index, embed only answers learned since it was saved, and
+    save it again when that added any, so the next worker starts from it"""
+    answer_index = None
+    if os.path.exists(os.path.join(index_path, "meta.json")):
+        try:
+            answer_index = LearnedAnswerIndex.load(index_path, db)
+            if not await answer_index.matches_database():
+                logger.warning(f"Rebuilding the learned-answer index, {index_path} is from another database")
+                answer_index = None
+        except Exception as e:
+            logger.warning(f"Rebuilding the learned-answer index, failed to load {index_path}: {e}")
+            answer_index = None
+    # A rebuilt index is always saved, replacing the one it could not use
+    saved = -1
+    if answer_index is None:
+        answer_index = LearnedAnswerIndex(db)
+    else:
+        saved = len(answer_index)
+    await answer_index.sync(force=True)
+    if len(answer_index) > saved:
+        try:
+            answer_index.save(index_path)
+        except Exception as e:
+            logger.warning(f"Failed to save the learned-answer index: {e}")
+    return answer_index
+
+
+def canned_responses() -> List[str]:
+    """Every fixed line the agent speaks verbatim"""
+    responses = [response for _, _, response in QuestionClassifier.STANDARD_RESPONSES]
+    responses += [ESCALATION_RESPONSE, SUPERVISOR_UNAVAILABLE_RESPONSE]
+    return responses
+
+
+async def _prewarm_tts_cache(tts_cache: TTSCache) -> int:
+    # No job context exists yet, so the TTS needs its own HTTP session
+    async with aiohttp.ClientSession() as http_session:
+        tts = elevenlabs.TTS(voice_id=TTS_VOICE_ID, model=TTS_MODEL, http_session=http_session)
+        try:
+            return await tts_cache.prewarm(tts, canned_responses())
+        finally:
+            await tts.aclose()
+
 
 async def entrypoint(ctx: JobContext):
+    # Startup latency is measured from job assignment to the agent's first audio
+    job_started = time.perf_counter()
+    startup_ms: Dict[str, float] = {}
+
+    def mark_startup(stage: str):
+        if stage not in startup_ms:
+            startup_ms[stage] = (time.perf_counter() - job_started) * 1000
+
     # Logging setup
     # Add any other context you want in all log entries here
     ctx.log_context_fields = {
         "room": ctx.room.name,
     }
 
-    # Set up a voice AI pipeline using Groq AI (for LLM and STT) and fallback TTS
+    # Large Language Model (LLM) using Groq AI - Llama 4 Scout with 30K TPM, for
+    # turns that may need tools; turns answered from the instructions go to the
+    # fast model. LLM_ROUTING=off sends every turn to the large model.
+    large_llm = groq.LLM(model=os.getenv("LLM_LARGE_MODEL", LARGE_LLM_MODEL))
+    fast_llm = groq.LLM(model=os.getenv("LLM_FAST_MODEL", FAST_LLM_MODEL))
+    # Speech-to-text (STT) using Groq's Whisper integration
+    session_stt = groq.STT(model=STT_MODEL)
+    # Text-to-speech (TTS) using ElevenLabs (with working voice ID)
+    session_tts = elevenlabs.TTS(voice_id=TTS_VOICE_ID, model=TTS_MODEL)  # Professional female voice
+
+    # With OPENAI_API_KEY set, OpenAI backs up each service: a slow or failing
+    # provider is skipped for a while, and a request its provider hasn't
+    # answered by its p95 also goes to the backup (see provider_failover.py).
+    # PROVIDER_FAILOVER=off uses Groq and ElevenLabs alone, PROVIDER_HEDGING=off
+    # fails over without hedging.
+    failover = {}
+    if os.getenv("OPENAI_API_KEY") and os.getenv("PROVIDER_FAILOVER", "on") != "off":
+        hedge = os.getenv("PROVIDER_HEDGING", "on") != "off"
+        failover = {
+            "stt": FailoverSTT([session_stt, openai.STT(model=BACKUP_STT_MODEL)], hedge=hedge, max_p95=2.0),
+            "llm": FailoverLLM([large_llm, openai.LLM(model=BACKUP_LLM_MODEL)], hedge=hedge, max_p95=2.0),
+            "fast_llm": FailoverLLM([fast_llm, openai.LLM(model=BACKUP_LLM_MODEL)], hedge=hedge, max_p95=1.5),
+            "tts": FailoverTTS([session_tts, openai.TTS(model=BACKUP_TTS_MODEL, voice=BACKUP_TTS_VOICE)],
+                               hedge=hedge, max_p95=1.5),
+        }
+        session_stt, large_llm, fast_llm, session_tts = (
+            failover["stt"], failover["llm"], failover["fast_llm"], failover["tts"])
+
+    session_llm = large_llm
+    if os.getenv("LLM_ROUTING", "on") != "off":
+        session_llm = RoutingLLM(fast=fast_llm, large=large_llm)
+
+    # Set up a voice AI pipeline using Groq AI (for LLM and STT) and ElevenLabs TTS
     session = AgentSession(
-        # Speech-to-text (STT) using Groq's Whisper integration
-        stt=groq.STT(model="whisper-large-v3-turbo"),
-        # Large Language Model (LLM) using Groq AI - Llama 4 Scout with 30K TPM
-        llm=groq.LLM(model="meta-llama/llama-4-scout-17b-16e-instruct"),
-        # Text-to-speech (TTS) using ElevenLabs (with working voice ID)
-        tts=elevenlabs.TTS(voice_id="2EiwWnXFnvU5JabPnv8n"),  # Professional female voice
+        stt=session_stt,
+        llm=session_llm,
+        tts=session_tts,
         # VAD for speech detection
         vad=ctx.proc.userdata["vad"],
         # Simple turn detection without multilingual model (avoids job context requirement)
@@ -190,15 +473,75 @@ async def entrypoint(ctx: JobContext):
     # Metrics collection, to measure pipeline performance
     # For more information, see https://docs.livekit.io/agents/build/metrics/
     usage_collector = metrics.UsageCollector()
+    assistant = Assistant(
+        db=ctx.proc.userdata.get("db"),
+        learned_answers=ctx.proc.userdata.get("learned_answers"),
+        answer_index=ctx.proc.userdata.get("answer_index"),
+        classifier=ctx.proc.userdata.get("classifier", QuestionClassifier),
+        tts_cache=ctx.proc.userdata.get("tts_cache"),
+        # off, inject (into the LLM's context) or answer (spoken without the LLM)
+        speculative_lookup=os.getenv("SPECULATIVE_LOOKUP", "inject"),
+    )
+    mark_startup("assistant_ready")
+    # Stage latency histograms, scraped from the worker's /metrics when METRICS_PORT is set
+    pipeline_metrics = PipelineMetrics(room=ctx.room.name, agent=type(assistant).__name__)
+    assistant.tool_metrics.on_record = pipeline_metrics.observe_tool_call
+    if isinstance(session_llm, RoutingLLM):
+        session_llm.on_route = pipeline_metrics.observe_llm_route
+    for service, instance in failover.items():
+        instance.pool.on_outcome = partial(pipeline_metrics.observe_provider_attempt, service)
 
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
+        pipeline_metrics.observe(ev.metrics)
+        if isinstance(ev.metrics, metrics.LLMMetrics) and not ev.metrics.cancelled:
+            assistant.small_talk.record_llm_ttft(ev.metrics.ttft)
+
+    @session.on("user_input_transcribed")
+    def _on_user_input_transcribed(ev: UserInputTranscribedEvent):
+        assistant.on_transcript(ev.transcript, ev.is_final, user_speaking=session.user_state == "speaking")
+
+    # Time to first audio: user stops speaking -> agent starts speaking
+    @session.on("user_state_changed")
+    def _on_user_state_changed(ev: UserStateChangedEvent):
+        if ev.old_state == "speaking":
+            assistant.small_talk.on_user_stopped_speaking(ev.created_at)
+
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev: AgentStateChangedEvent):
+        if ev.new_state == "listening":
+            mark_startup("listening")
+        if ev.new_state == "speaking":
+            assistant.small_talk.on_agent_started_speaking(ev.created_at)
+            if "first_audio" not in startup_ms:
+                mark_startup("first_audio")
+                # The agent waits for the caller to speak first, so first_audio includes that wait
+                logger.info(f"Startup latency (ms since job assignment, shared state: "
+                            f"{'db' in ctx.proc.userdata}): {startup_ms}")
 
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        logger.info(f"Learned answer cache: {assistant.learned_answers.stats()}")
+        small_talk = assistant.small_talk.stats()
+        logger.info(f"Small talk short circuit: {small_talk}")
+        logger.info(f"Speculative learned answers: {assistant.speculative.stats(small_talk['mean_llm_ttft_ms'])}")
+        if assistant.tts_cache is not None:
+            logger.info(f"TTS cache: {assistant.tts_cache.stats()}")
+        await assistant.alerts.aclose()
+        logger.info(f"Supervisor alerts: {assistant.alerts.stats()}")
+        logger.info(f"Tool call latency: {assistant.tool_metrics.stats()}")
+        if isinstance(session_llm, RoutingLLM):
+            logger.info(f"LLM routes: {session_llm.stats()}")
+        for service, instance in failover.items():
+            logger.info(f"Provider failover ({service}): {instance.stats()}")
+        # Kept for capacity planning; see usage_report.py for the rollups
+        try:
+            await assistant.db.add_session_usage(pipeline_metrics.session_usage(summary, assistant.escalations))
+        except Exception as e:
+            logger.error(f"Failed to save session usage: {str(e)}")
 
     ctx.add_shutdown_callback(log_usage)
 
@@ -212,7 +555,7 @@ async def entrypoint(ctx: JobContext):
 
     # Start the session, which initializes the voice pipeline and warms up the models
     await session.start(
-        agent=Assistant(),
+        agent=assistant,
         room=ctx.room,
         room_input_options=RoomInputOptions(
             # For telephony applications, use `BVCTelephony` for best results
@@ -225,4 +568,7 @@ async def entrypoint(ctx: JobContext):
 
 
 if __name__ == "__main__":
+    # Started before any job process, so they all report to this endpoint
+    if os.getenv("METRICS_PORT"):
+        start_metrics_server(int(os.getenv("METRICS_PORT")))
     cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
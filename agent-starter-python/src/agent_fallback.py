@@ -20,7 +20,7 @@ from livekit.agents import (
 from livekit.plugins import noise_cancellation, silero, groq
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
-from database import Database
+from database import Database, UNKNOWN_PHONE
 
 logger = logging.getLogger("agent")
 
@@ -56,19 +56,19 @@ Your responses should be professional, friendly, and concise. Greet customers wa
         try:
             logger.info(f"Requesting help for question: {question}")
             
-            # Create help request
-            request_id = str(uuid.uuid4())
-            request = await self.db.create_help_request(
-                id=request_id,
-                customer_phone=self.customer_phone or "unknown",
+            # Create help request, or join the pending one for the same question
+            request, created = await self.db.create_or_join_help_request(
+                id=str(uuid.uuid4()),
+                customer_phone=self.customer_phone or UNKNOWN_PHONE,
                 question=question
             )
             
-            # Simulate supervisor notification (in real implementation, this would be a webhook/ SMS)
-            message = f"🆘 SUPERVISOR ALERT: Need help answering customer question: '{question}' from {self.customer_phone or 'unknown customer'}. Request ID: {request_id}"
-            print(f"\n{'='*50}")
-            print(f"SUPERVISOR NOTIFICATION: {message}")
-            print(f"{'='*50}\n")
+            if created:
+                # Simulate supervisor notification (in real implementation, this would be a webhook/ SMS)
+                message = f"🆘 SUPERVISOR ALERT: Need help answering customer question: '{question}' from {self.customer_phone or 'unknown customer'}. Request ID: {request.id}"
+                print(f"\n{'='*50}")
+                print(f"SUPERVISOR NOTIFICATION: {message}")
+                print(f"{'='*50}\n")
             
             return "Let me check with my supervisor and get back to you with the answer to your question."
             
@@ -87,7 +87,7 @@ Your responses should be professional, friendly, and concise. Greet customers wa
             answers = await self.db.search_learned_answers(query)
             
             if answers:
-                best_match = answers[0]  # Take the most recent match
+                best_match = answers[0]  # Take the best-ranked match
                 return f"Based on previous learning: {best_match.answer}"
             
             return None
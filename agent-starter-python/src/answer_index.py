@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from database import Database, LearnedAnswer, SEARCH_STOPWORDS
+from intent_model import hash_ngrams
+
+logger = logging.getLogger("answer_index")
+
+FORMAT_VERSION = 1
+
+# Paraphrases callers use for the same thing, folded before hashing
+_SYNONYMS = [
+    (re.compile(r"\bhow much\b"), "price"),
+    (re.compile(r"\b(?:cost|costs|pricing|prices|priced|rates?|fees?)\b"), "price"),
+    (re.compile(r"\beye ?brows?\b|\bbrows\b"), "brow"),
+    (re.compile(r"\beye ?lash(?:es)?\b|\blashes\b"), "lash"),
+    (re.compile(r"\bmani\b"), "manicure"),
+    (re.compile(r"\bpedi\b"), "pedicure"),
+]
+_STOPWORDS = SEARCH_STOPWORDS | {"offer", "any", "there", "get", "like", "want", "know", "much"}
+
+
+def _prepare(text: str) -> str:
+    text = text.lower()
+    for pattern, replacement in _SYNONYMS:
+        text = pattern.sub(replacement, text)
+    words = [w for w in re.findall(r"\w+", text) if w not in _STOPWORDS]
+    return " ".join(words)
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def key_terms(text: str) -> List[str]:
+    """Content words of `text`, folded and stemmed as the index sees them"""
+    return [_stem(word) for word in _prepare(text).split()]
+
+
+def terms_agree(query: str, question: str) -> bool:
+    """True when every key term of a learned `question` is in `query`.
+
+    Similar character n-grams alone match "nail extensions" to "hair
+    extensions" or botox to microblading; a learned answer is only trusted
+    when the caller mentioned everything its question was about.
+    """
+    asked = set(key_terms(query))
+    return all(term in asked or any(len(term) >= 4 and len(word) >= 4 and
+                                    (word.startswith(term) or term.startswith(word)) for word in asked)
+               for term in key_terms(question))
+
+
+def embed(texts: Sequence[str], dim: int = 256) -> np.ndarray:
+    """L2-normalized hashed character 3-5-gram embeddings, float32[len(texts), dim]"""
+    rows, buckets, values = hash_ngrams([_prepare(t) for t in texts], (3, 5), dim)
+    flat = np.bincount(rows * dim + buckets, weights=values, minlength=len(texts) * dim)
+    vectors = flat.reshape(len(texts), dim).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+class LearnedAnswerIndex:
+    """Cosine nearest-neighbour index over learned-answer questions.
+
+    Questions are embedded on the CPU (hashed character n-grams after folding
+    common paraphrases such as "how much" -> "price") into a contiguous float32
+    matrix, so a lookup is one matrix-vector product and a partial sort. New
+    answers are appended incrementally: `sync` reads only rows inserted since
+    the last one indexed, and is cheap to call before every lookup because it
+    first compares the learned_answers change counter. A saved index is
+    memory-mapped on load, so large indexes start without reading the matrix.
+
+    A wrong answer is worse than an escalation, so a hit needs both a high
+    similarity and the key terms of its question in the query (`terms_agree`).
+    """
+
+    def __init__(self, database: Database, dim: int = 256, threshold: float = 0.78,
+                 revalidate_interval: float = 0.5):
+        self.db = database
+        self.dim = dim
+        self.threshold = threshold
+        self.revalidate_interval = revalidate_interval
+        # Saved (possibly memory-mapped) rows, plus a growable tail of new ones
+        self._base = np.empty((0, dim), dtype=np.float32)
+        self._base_ids: List[str] = []
+        self._tail = np.empty((64, dim), dtype=np.float32)
+        self._tail_ids: List[str] = []
+        self._last_rowid = 0
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._base_ids) + len(self._tail_ids)
+
+    def add(self, ids: Sequence[str], questions: Sequence[str]):
+        """Embed and append questions"""
+        if not ids:
+            return
+        vectors = embed(questions, self.dim)
+        count = len(self._tail_ids)
+        if count + len(ids) > len(self._tail):
+            grown = np.empty((max(2 * len(self._tail), count + len(ids)), self.dim), dtype=np.float32)
+            grown[:count] = self._tail[:count]
+            self._tail = grown
+        self._tail[count:count + len(ids)] = vectors
+        self._tail_ids.extend(ids)
+
+    async def sync(self, force: bool = False):
+        """Index answers added since the last sync, by this or any other process"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.revalidate_interval:
+            return
+        self._checked_at = now
+        version = await self.db.get_learned_answers_version()
+        if version == self._version:
+            return
+        self._version = version
+        while True:
+            rows = await self.db.get_learned_answers_after(self._last_rowid, limit=1000)
+            if not rows:
+                return
+            self.add([answer.id for _, answer in rows], [answer.question for _, answer in rows])
+            self._last_rowid = rows[-1][0]
+
+    def nearest(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Top `k` (answer id, cosine similarity) pairs, most similar first"""
+        if not len(self):
+            return []
+        q = embed([query], self.dim)[0]
+        scores = np.concatenate([self._base @ q, self._tail[:len(self._tail_ids)] @ q])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        base_count = len(self._base_ids)
+        return [(self._base_ids[i] if i < base_count else self._tail_ids[i - base_count], float(scores[i]))
+                for i in top]
+
+    async def search(self, query: str, k: int = 3) -> List[LearnedAnswer]:
+        """Learned answers at or above the similarity threshold whose key terms
+        the query mentions, most similar first. Each result carries its cosine
+        similarity in `score`."""
+        await self.sync()
+        matches = [(id, score) for id, score in self.nearest(query, k) if score >= self.threshold]
+        answers = await self.db.get_learned_answers_by_ids([id for id, _ in matches])
+        scores = dict(matches)
+        for answer in answers:
+            answer.score = scores[answer.id]
+        return [answer for answer in answers if terms_agree(query, answer.question)]
+
+    def save(self, path: str):
+        """Write the index to directory `path` (vectors.npy, ids.npy, meta.json).
+
+        Worker processes may save at the same time, so each writes its own
+        temporary files; meta.json is replaced last, so a reader never sees it
+        ahead of the vectors it describes.
+        """
+        os.makedirs(path, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        vectors = np.concatenate([self._base, self._tail[:len(self._tail_ids)]])
+        with open(os.path.join(path, "vectors.npy" + suffix), "wb") as f:
+            np.save(f, vectors, allow_pickle=False)
+        with open(os.path.join(path, "ids.npy" + suffix), "wb") as f:
+            np.save(f, np.array(self._base_ids + self._tail_ids, dtype=str), allow_pickle=False)
+        with open(os.path.join(path, "meta.json" + suffix), "w") as f:
+            json.dump({"format": FORMAT_VERSION, "dim": self.dim, "last_rowid": self._last_rowid}, f)
+        for name in ("vectors.npy", "ids.npy", "meta.json"):
+            os.replace(os.path.join(path, name + suffix), os.path.join(path, name))
+
+    @classmethod
+    def load(cls, path: str, database: Database, **options) -> "LearnedAnswerIndex":
+        """Open a saved index, memory-mapping its vectors"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported answer index format: {meta.get('format')}")
+        index = cls(database, dim=meta["dim"], **options)
+        index._base = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        index._base_ids = np.load(os.path.join(path, "ids.npy")).tolist()
+        index._last_rowid = meta["last_rowid"]
+        return index
+
+    async def matches_database(self) -> bool:
+        """False when the answer at the last indexed rowid is not the one this
+        index holds, e.g. because the database was recreated after the index
+        was saved. Such an index would skip new answers at rowids it already
+        counts as indexed."""
+        if not len(self):
+            return self._last_rowid == 0
+        rows = await self.db.get_learned_answers_after(self._last_rowid - 1, limit=1)
+        last_id = self._tail_ids[-1] if self._tail_ids else self._base_ids[-1]
+        return bool(rows) and rows[0][0] == self._last_rowid and rows[0][1].id == last_id
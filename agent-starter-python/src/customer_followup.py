@@ -1,8 +1,8 @@
 import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Optional
-from database import Database, HelpRequest
+from database import Database, HelpRequest, RequestStatus, UNKNOWN_PHONE
 
 logger = logging.getLogger("customer_followup")
 
@@ -11,33 +11,49 @@ class CustomerFollowupService:
         self.db = database
     
     async def send_customer_response(self, request_id: str) -> bool:
-        """Send the supervisor's response back to the customer"""
+        """Send the supervisor's response to every caller waiting on the request"""
         try:
             # Get the updated request with supervisor response
-            all_requests = await self.db.get_all_requests()
-            target_request = None
+            target_request = await self.db.get_request(request_id)
             
-            for request in all_requests:
-                if request.id == request_id and request.status.value == "resolved":
-                    target_request = request
-                    break
-            
-            if not target_request or not target_request.supervisor_response:
+            if (not target_request or target_request.status != RequestStatus.RESOLVED
+                    or not target_request.supervisor_response):
                 logger.error(f"No valid resolved request found for ID: {request_id}")
                 return False
             
-            # Simulate sending SMS/webhook to customer
-            success = await self._simulate_customer_notification(
-                phone=target_request.customer_phone,
-                message=target_request.supervisor_response,
-                question=target_request.question
+            # Callers who asked the same question share the ticket; each number
+            # hears back once, with the question as they asked it. Callers
+            # without a known number are told apart by their own request id.
+            callers = {}
+            for caller in await self.db.get_request_callers(request_id, waiting_only=True):
+                key = caller.caller_request_id if caller.customer_phone == UNKNOWN_PHONE else caller.customer_phone
+                callers.setdefault(key, caller)
+            if not callers:
+                logger.info(f"Every caller waiting on request {request_id} has already been notified")
+                return True
+            
+            # Simulate sending SMS/webhook to the customers, all at once
+            results = await asyncio.gather(*(
+                self._simulate_customer_notification(
+                    phone=caller.customer_phone,
+                    message=target_request.supervisor_response,
+                    question=caller.question
+                )
+                for caller in callers.values()
+            ))
+            notified = [caller for caller, success in zip(callers.values(), results) if success]
+            await self.db.mark_callers_notified(
+                request_id,
+                [caller.customer_phone for caller in notified if caller.customer_phone != UNKNOWN_PHONE],
+                [caller.caller_request_id for caller in notified if caller.customer_phone == UNKNOWN_PHONE],
             )
             
-            if success:
-                logger.info(f"Successfully sent follow-up to customer {target_request.customer_phone}")
+            if len(notified) == len(callers):
+                logger.info(f"Successfully sent follow-up to {len(notified)} customer(s) for request {request_id}")
                 return True
             else:
-                logger.error(f"Failed to send follow-up to customer {target_request.customer_phone}")
+                failed = [key for key, caller in callers.items() if caller not in notified]
+                logger.error(f"Failed to send follow-up to customer(s) {', '.join(failed)}")
                 return False
                 
         except Exception as e:
@@ -85,16 +101,10 @@ Sent at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
     async def check_and_send_followups(self):
         """Check for resolved requests that haven't been followed up with"""
         try:
-            all_requests = await self.db.get_all_requests()
-            
-            for request in all_requests:
-                if request.status.value == "resolved" and request.responded_at:
-                    # Check if we should send follow-up (newly resolved)
-                    time_since_response = datetime.now() - request.responded_at
-                    
-                    # Send follow-up for recently resolved requests
-                    if time_since_response.total_seconds() < 60:  # Within last minute
-                        await self.send_customer_response(request.id)
+            # Send follow-up for recently resolved requests (within last minute)
+            since = datetime.now() - timedelta(seconds=60)
+            for request in await self.db.get_requests_resolved_since(since):
+                await self.send_customer_response(request.id)
                         
         except Exception as e:
             logger.error(f"Error in check_and_send_followups: {str(e)}")
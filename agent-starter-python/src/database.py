@@ -1,71 +1,916 @@
 import sqlite3
 import asyncio
+import base64
+import bisect
+import json
+import logging
+import queue
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional, List
-from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Generic, Iterator, Optional, List, Tuple, TypeVar
+from dataclasses import dataclass, field
 from enum import Enum
 
+logger = logging.getLogger("database")
+
 class RequestStatus(Enum):
     PENDING = "pending"
     RESOLVED = "resolved"
     UNRESOLVED = "unresolved"
 
+_STATUS_BY_VALUE = {status.value: status for status in RequestStatus}
+
+# Schema 2 stores every timestamp as integer epoch milliseconds; schema 1 stored
+# ISO-8601 text, which is converted in place by migrate_timestamps()
+SCHEMA_VERSION = 2
+
+# Stored as customer_phone when the caller's number is not known
+UNKNOWN_PHONE = "unknown"
+
+_TIMESTAMP_COLUMNS = (
+    ("help_requests", ("created_at", "responded_at")),
+    ("learned_answers", ("learned_at",)),
+    ("help_request_callers", ("joined_at", "notified_at")),
+)
+
+def _to_epoch_ms(value: datetime) -> int:
+    """Naive datetimes are local time, as produced by datetime.now()"""
+    return int(value.timestamp() * 1000)
+
+def _decode_timestamp(value):
+    """Decode a stored timestamp, passing through values that already are datetimes"""
+    if value is None or value.__class__ is datetime:
+        return value
+    if value.__class__ is int:
+        return datetime.fromtimestamp(value / 1000)
+    # Schema 1 text that the background migration has not reached yet
+    return datetime.fromisoformat(value)
+
+class _Row:
+    """Compact, slot-based row object.
+
+    Rows fetched from SQLite keep their raw epoch-millisecond timestamps; those
+    are decoded on first access and cached in place, so listings never pay for fields the
+    caller does not read.
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{self.__class__.__name__}({values})"
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+class HelpRequest(_Row):
+    __slots__ = ("id", "customer_phone", "question", "status", "_created_at",
+                 "supervisor_response", "_responded_at")
+    _fields = ("id", "customer_phone", "question", "status", "created_at",
+               "supervisor_response", "responded_at")
+
+    def __init__(self, id: str, customer_phone: str, question: str, status: RequestStatus,
+                 created_at: datetime, supervisor_response: Optional[str] = None,
+                 responded_at: Optional[datetime] = None):
+        self.id = id
+        self.customer_phone = customer_phone
+        self.question = question
+        self.status = status
+        self._created_at = created_at
+        self.supervisor_response = supervisor_response
+        self._responded_at = responded_at
+
+    @property
+    def created_at(self) -> datetime:
+        value = self._created_at = _decode_timestamp(self._created_at)
+        return value
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        self._created_at = value
+
+    @property
+    def responded_at(self) -> Optional[datetime]:
+        value = self._responded_at = _decode_timestamp(self._responded_at)
+        return value
+
+    @responded_at.setter
+    def responded_at(self, value: Optional[datetime]):
+        self._responded_at = value
+
+class LearnedAnswer(_Row):
+    __slots__ = ("id", "question", "answer", "_learned_at", "score")
+    _fields = ("id", "question", "answer", "learned_at", "score")
+
+    def __init__(self, id: str, question: str, answer: str, learned_at: datetime,
+                 score: Optional[float] = None):
+        self.id = id
+        self.question = question
+        self.answer = answer
+        self._learned_at = learned_at
+        self.score = score
+
+    @property
+    def learned_at(self) -> datetime:
+        value = self._learned_at = _decode_timestamp(self._learned_at)
+        return value
+
+    @learned_at.setter
+    def learned_at(self, value: datetime):
+        self._learned_at = value
+
+class WaitingCaller(_Row):
+    """A caller waiting on a help request, with the question as they asked it.
+    `caller_request_id` is the id the caller escalated under, which tells apart
+    callers without a known phone number."""
+    __slots__ = ("request_id", "customer_phone", "question", "_joined_at", "_notified_at", "caller_request_id")
+    _fields = ("request_id", "customer_phone", "question", "joined_at", "notified_at", "caller_request_id")
+    
+    def __init__(self, request_id: str, customer_phone: str, question: str, joined_at: datetime,
+                 notified_at: Optional[datetime] = None, caller_request_id: Optional[str] = None):
+        self.request_id = request_id
+        self.customer_phone = customer_phone
+        self.question = question
+        self._joined_at = joined_at
+        self._notified_at = notified_at
+        self.caller_request_id = caller_request_id
+    
+    @property
+    def joined_at(self) -> datetime:
+        value = self._joined_at = _decode_timestamp(self._joined_at)
+        return value
+    
+    @property
+    def notified_at(self) -> Optional[datetime]:
+        value = self._notified_at = _decode_timestamp(self._notified_at)
+        return value
+
+# Upper bounds (ms) of the latency histograms kept per session and per rollup;
+# one more bucket takes everything slower. Histograms add up exactly, so
+# rollups keep percentiles without the raw samples.
+LATENCY_BUCKETS_MS = (50, 100, 150, 200, 300, 400, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+USAGE_COUNTERS = ("llm_prompt_tokens", "llm_cached_tokens", "llm_completion_tokens", "stt_audio_seconds",
+                  "tts_characters", "tts_audio_seconds", "turns", "escalations")
+
+USAGE_PERIODS = ("hour", "day")
+
 @dataclass
-class HelpRequest:
+class SessionUsage:
+    """One finished agent session: provider usage, turns, escalations and
+    per-stage latency. `latency` maps a stage to {"count", "total_ms",
+    "max_ms", "buckets"}, as built by add_latency_sample."""
     id: str
-    customer_phone: str
-    question: str
-    status: RequestStatus
-    created_at: datetime
-    supervisor_response: Optional[str] = None
-    responded_at: Optional[datetime] = None
+    room: str
+    started_at: datetime
+    ended_at: datetime
+    llm_prompt_tokens: int = 0
+    llm_cached_tokens: int = 0
+    llm_completion_tokens: int = 0
+    stt_audio_seconds: float = 0.0
+    tts_characters: int = 0
+    tts_audio_seconds: float = 0.0
+    turns: int = 0
+    escalations: int = 0
+    latency: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
 @dataclass
-class LearnedAnswer:
-    id: str
-    question: str
-    answer: str
-    learned_at: datetime
+class UsageRollup:
+    """Usage of every session that started in one hour or day (local time)"""
+    period: str
+    period_start: datetime
+    sessions: int = 0
+    duration_seconds: float = 0.0
+    llm_prompt_tokens: int = 0
+    llm_cached_tokens: int = 0
+    llm_completion_tokens: int = 0
+    stt_audio_seconds: float = 0.0
+    tts_characters: int = 0
+    tts_audio_seconds: float = 0.0
+    turns: int = 0
+    escalations: int = 0
+    latency: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+def add_latency_sample(latency: Dict[str, Dict[str, Any]], stage: str, ms: float):
+    """Count one latency sample for `stage`"""
+    summary = latency.get(stage)
+    if summary is None:
+        summary = latency[stage] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                    "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+    summary["count"] += 1
+    summary["total_ms"] += ms
+    summary["max_ms"] = max(summary["max_ms"], ms)
+    summary["buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+
+def merge_latency(into: Dict[str, Dict[str, Any]], other: Dict[str, Dict[str, Any]]):
+    """Add the latency summaries of `other` to `into`"""
+    for stage, summary in other.items():
+        target = into.get(stage)
+        if target is None:
+            into[stage] = {"count": summary["count"], "total_ms": summary["total_ms"],
+                           "max_ms": summary["max_ms"], "buckets": list(summary["buckets"])}
+            continue
+        target["count"] += summary["count"]
+        target["total_ms"] += summary["total_ms"]
+        target["max_ms"] = max(target["max_ms"], summary["max_ms"])
+        target["buckets"] = [a + b for a, b in zip(target["buckets"], summary["buckets"])]
+
+def latency_percentile(summary: Dict[str, Any], pct: float) -> Optional[float]:
+    """Approximate percentile in ms: the upper bound of the bucket holding it,
+    capped at the slowest sample seen"""
+    if not summary or not summary["count"]:
+        return None
+    rank = summary["count"] * pct / 100
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS, summary["buckets"]):
+        seen += count
+        if seen >= rank:
+            return min(bound, summary["max_ms"])
+    return summary["max_ms"]
+
+def _period_start(period: str, started_at: datetime) -> datetime:
+    if period == "hour":
+        return started_at.replace(minute=0, second=0, microsecond=0)
+    return started_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+T = TypeVar("T")
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    # Opaque keyset cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+class ConnectionManager:
+    """Hands out one long-lived SQLite connection per thread.
+
+    The agent worker, the web server and the timeout thread all share the same
+    database file, so every connection runs in WAL mode (readers never block the
+    writer) and waits on a busy timeout instead of failing with
+    `database is locked`.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000, cache_size_kib: int = 8192,
+                 mmap_size: int = 64 * 1024 * 1024):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        # NORMAL is durable across application crashes in WAL mode; only an OS
+        # crash or power loss can roll back the last few commits.
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Yield a cursor inside a transaction that commits on success"""
+        conn = self.get()
+        with conn:
+            yield conn.cursor()
+
+    def close_all(self):
+        """Close every connection handed out by this manager"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+class StorageExecutor:
+    """Runs blocking SQLite work off the event loop.
+
+    Writes are fed through a queue to one dedicated writer thread, so they are
+    serialized without contending for the SQLite write lock. Reads run on a small
+    thread pool where each worker keeps its own pooled connection; in WAL mode
+    they never wait on the writer.
+    """
+
+    _STOP = object()
+
+    def __init__(self, connections: ConnectionManager, read_workers: int = 4):
+        self.connections = connections
+        self.read_workers = read_workers
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._readers: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._readers = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="db-reader")
+                writer = threading.Thread(target=self._write_loop, name="db-writer", daemon=True)
+                writer.start()
+                self._writer = writer
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            fn, args, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with self.connections.transaction() as cursor:
+                    result = fn(cursor, *args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def _read(self, fn: Callable[..., Any], args: tuple) -> Any:
+        return fn(self.connections.get(), *args)
+
+    def submit_write(self, fn: Callable[..., Any], *args) -> Future:
+        """Queue fn(cursor, *args) to run in its own transaction on the writer thread"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    def submit_read(self, fn: Callable[..., Any], *args) -> Future:
+        """Run fn(connection, *args) on a reader thread"""
+        self._ensure_started()
+        return self._readers.submit(self._read, fn, args)
+
+    def shutdown(self):
+        """Drain queued writes, then stop the writer and reader threads"""
+        with self._lock:
+            writer, readers = self._writer, self._readers
+            self._writer = self._readers = None
+        if writer is not None:
+            self._queue.put(self._STOP)
+            writer.join()
+        if readers is not None:
+            readers.shutdown(wait=True)
+
+class WriteBehindBuffer:
+    """Collects inserts and group-commits them on the writer thread.
+
+    Rows are flushed with one executemany per statement inside a single
+    transaction as soon as `max_batch` rows are waiting or `flush_interval`
+    seconds after the first buffered row, whichever comes first. That interval is
+    the durability window: a crash can lose at most that much buffered work.
+
+    Writes that must read before they insert are queued with `call` and run
+    after the inserts, in the same transaction, which takes the write lock
+    up front so no other process can change what they read.
+    """
+
+    def __init__(self, executor: StorageExecutor, max_batch: int = 100, flush_interval: float = 0.05):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending: dict = {}
+        self._calls: List[Tuple[Callable[..., Any], tuple, Future]] = []
+        self._size = 0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def add(self, *statements: Tuple[str, tuple]):
+        """Buffer the (sql, params) inserts of one record; flushes immediately once
+        the batch is full. A record's inserts are always committed together."""
+        with self._lock:
+            for sql, params in statements:
+                self._pending.setdefault(sql, []).append(params)
+            self._added_locked()
+
+    def call(self, fn: Callable[..., Any], *args) -> Future:
+        """Buffer fn(cursor, *args) for the next batch. The future resolves with
+        its result once the batch is committed; if fn raises, only its own
+        changes are rolled back."""
+        future: Future = Future()
+        with self._lock:
+            self._calls.append((fn, args, future))
+            self._added_locked()
+        return future
+
+    def _added_locked(self):
+        self._size += 1
+        if self._size >= self.max_batch:
+            self._submit_locked()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush_nowait)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> Future:
+        """Queue everything buffered so far; the future resolves once it and every
+        earlier batch are committed.
+
+        Writes submitted to the executor after this call are ordered after the
+        flushed rows.
+        """
+        with self._lock:
+            return self._submit_locked(barrier=True)
+
+    def flush_nowait(self):
+        """Queue buffered rows, if any, without waiting on earlier batches"""
+        with self._lock:
+            self._submit_locked()
+
+    def _submit_locked(self, barrier: bool = False) -> Future:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, calls = self._pending, self._calls
+        self._pending, self._calls, self._size = {}, [], 0
+        if not batch and not calls and not barrier:
+            done: Future = Future()
+            done.set_result(0)
+            return done
+        outcomes: list = []
+        future = self.executor.submit_write(self._commit_batch, batch, calls, outcomes)
+        future.add_done_callback(self._log_failure)
+        if calls:
+            future.add_done_callback(lambda committed: self._settle(committed, calls, outcomes))
+        return future
+
+    @staticmethod
+    def _commit_batch(cursor: sqlite3.Cursor, batch: dict, calls: list, outcomes: list) -> int:
+        if calls and not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        for sql, rows in batch.items():
+            cursor.executemany(sql, rows)
+        for fn, args, _ in calls:
+            cursor.execute("SAVEPOINT buffered_call")
+            try:
+                outcomes.append((fn(cursor, *args), None))
+            except Exception as e:
+                cursor.execute("ROLLBACK TO buffered_call")
+                outcomes.append((None, e))
+            cursor.execute("RELEASE buffered_call")
+        return sum(len(rows) for rows in batch.values()) + len(calls)
+
+    @staticmethod
+    def _settle(committed: Future, calls: list, outcomes: list):
+        # A failed commit rolled back every call in the batch
+        error = committed.exception()
+        for i, (_, _, future) in enumerate(calls):
+            result, call_error = outcomes[i] if error is None else (None, error)
+            if call_error is not None:
+                future.set_exception(call_error)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Write-behind flush failed, batch rolled back: {future.exception()}")
+
+# Words too common to say anything about which learned answer fits a question
+SEARCH_STOPWORDS = frozenset("""
+    a an and are as at be can could do does for from have how i in is it me my
+    of on or our please the to what when where which who will with would you your
+""".split())
+
+def _fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query that requires every meaningful term"""
+    terms = re.findall(r"\w+", text.lower())
+    keywords = [t for t in terms if t not in SEARCH_STOPWORDS] or terms
+    if not keywords:
+        return None
+    # Quote each term so user text can never be parsed as FTS5 syntax
+    return " AND ".join(f'"{t}"' for t in dict.fromkeys(keywords))
+
+def normalize_question(question: str) -> str:
+    """Key under which escalations of the same question share one ticket:
+    every word, lower-cased, without punctuation. Callers who join a ticket
+    are sent its answer, so words such as "when", "where" or "not" must never
+    be dropped."""
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+def _encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        timestamp, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    return timestamp, id
+
+def _request_from_row(row) -> HelpRequest:
+    # Timestamps go in raw; the properties decode them on first use
+    return HelpRequest(row[0], row[1], row[2], _STATUS_BY_VALUE[row[3]], row[4], row[5], row[6])
+
+def _answer_from_row(row) -> LearnedAnswer:
+    return LearnedAnswer(*row)
+
+def _rollup_from_row(row) -> UsageRollup:
+    return UsageRollup(row[0], datetime.fromtimestamp(row[1] / 1000), *row[2:-1], latency=json.loads(row[-1]))
+
+@dataclass(frozen=True)
+class _PageSource:
+    table: str
+    columns: str
+    time_column: str
+    time_index: int
+    from_row: Callable[[tuple], Any]
+
+_REQUESTS_PAGE = _PageSource(
+    table="help_requests",
+    columns="id, customer_phone, question, status, created_at, supervisor_response, responded_at",
+    time_column="created_at",
+    time_index=4,
+    from_row=_request_from_row,
+)
+
+_ANSWERS_PAGE = _PageSource(
+    table="learned_answers",
+    columns="id, question, answer, learned_at",
+    time_column="learned_at",
+    time_index=3,
+    from_row=_answer_from_row,
+)
+
+_INSERT_HELP_REQUEST = '''
+    INSERT INTO help_requests (id, customer_phone, question, status, created_at, question_key)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+_INSERT_CALLER = '''
+    INSERT INTO help_request_callers (request_id, customer_phone, question, joined_at, caller_request_id)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+_INSERT_LEARNED_ANSWER = '''
+    INSERT INTO learned_answers (id, question, answer, learned_at)
+    VALUES (?, ?, ?, ?)
+'''
+
+_INSERT_SESSION_USAGE = f'''
+    INSERT INTO session_usage (id, room, started_at, ended_at, {", ".join(USAGE_COUNTERS)}, latency)
+    VALUES (?, ?, ?, ?, {", ".join("?" * len(USAGE_COUNTERS))}, ?)
+'''
 
 class Database:
-    def __init__(self, db_path: str = "help_requests.db"):
+    def __init__(self, db_path: str = "help_requests.db", busy_timeout_ms: int = 5000, read_workers: int = 4,
+                 write_behind: bool = False, write_behind_max_batch: int = 100,
+                 write_behind_interval: float = 0.05):
+        """With `write_behind`, create_help_request and add_learned_answer return as
+        soon as the row is buffered and are group-committed within
+        `write_behind_interval` seconds. Reads only see buffered rows after they
+        are flushed; other writes are always ordered after them.
+        create_or_join_help_request is group-committed too, but returns once its
+        batch is committed, since the caller needs the ticket it joined."""
         self.db_path = db_path
-        self._init_db()
-    
-    def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create help_requests table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS help_requests (
-                id TEXT PRIMARY KEY,
-                customer_phone TEXT NOT NULL,
-                question TEXT NOT NULL,
-                status TEXT NOT NULL,
-                created_at TIMESTAMP NOT NULL,
-                supervisor_response TEXT,
-                responded_at TIMESTAMP
+        self.connections = ConnectionManager(db_path, busy_timeout_ms=busy_timeout_ms)
+        self.executor = StorageExecutor(self.connections, read_workers=read_workers)
+        self.write_buffer = (
+            WriteBehindBuffer(self.executor, write_behind_max_batch, write_behind_interval)
+            if write_behind else None
+        )
+        self._listeners: List[Callable[[str, str, Optional[int]], None]] = []
+        self._stop_migration = threading.Event()
+        self.migration_thread: Optional[threading.Thread] = None
+        if self._init_db() < SCHEMA_VERSION:
+            # Convert legacy timestamps in the background so callers are not held up
+            self.migration_thread = threading.Thread(
+                target=self._run_timestamp_migration, name="db-migration", daemon=True
             )
-        ''')
-        
-        # Create learned_answers table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS learned_answers (
-                id TEXT PRIMARY KEY,
-                question TEXT NOT NULL,
-                answer TEXT NOT NULL,
-                learned_at TIMESTAMP NOT NULL
+            self.migration_thread.start()
+    
+    def _init_db(self) -> int:
+        """Create or upgrade the schema and return the schema version on disk"""
+        with self.connections.transaction() as cursor:
+            is_new = not cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'help_requests'"
+            ).fetchone()
+            version = SCHEMA_VERSION if is_new else cursor.execute("PRAGMA user_version").fetchone()[0]
+            
+            # Create help_requests table (timestamps are epoch milliseconds)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS help_requests (
+                    id TEXT PRIMARY KEY,
+                    customer_phone TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    supervisor_response TEXT,
+                    responded_at INTEGER,
+                    question_key TEXT
+                )
+            ''')
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(help_requests)")}
+            if "question_key" not in columns:
+                cursor.execute("ALTER TABLE help_requests ADD COLUMN question_key TEXT")
+                # Only pending requests can still be joined
+                pending = cursor.execute("SELECT id, question FROM help_requests WHERE status = 'pending'").fetchall()
+                cursor.executemany(
+                    "UPDATE help_requests SET question_key = ? WHERE id = ?",
+                    [(normalize_question(question), id) for id, question in pending],
+                )
+            
+            # Everyone waiting on each request: callers asking a question that is
+            # already pending join its ticket instead of opening another one
+            has_callers = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'help_request_callers'"
+            ).fetchone()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS help_request_callers (
+                    request_id TEXT NOT NULL,
+                    customer_phone TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    joined_at INTEGER NOT NULL,
+                    notified_at INTEGER,
+                    caller_request_id TEXT
+                )
+            ''')
+            if not has_callers:
+                cursor.execute('''
+                    INSERT INTO help_request_callers
+                        (request_id, customer_phone, question, joined_at, notified_at, caller_request_id)
+                    SELECT id, customer_phone, question, created_at, responded_at, id FROM help_requests
+                ''')
+            elif "caller_request_id" not in {row[1] for row in cursor.execute("PRAGMA table_info(help_request_callers)")}:
+                cursor.execute("ALTER TABLE help_request_callers ADD COLUMN caller_request_id TEXT")
+                cursor.execute("UPDATE help_request_callers SET caller_request_id = request_id")
+            
+            # Create learned_answers table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS learned_answers (
+                    id TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    learned_at INTEGER NOT NULL
+                )
+            ''')
+            
+            if version < SCHEMA_VERSION:
+                # Timestamp rewrites must not churn the full-text index
+                cursor.execute("DROP TRIGGER IF EXISTS learned_answers_fts_update")
+            
+            # Full-text index over learned answers, kept in sync by triggers
+            has_fts = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'learned_answers_fts'"
+            ).fetchone()
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS learned_answers_fts USING fts5(
+                    id UNINDEXED,
+                    question,
+                    answer,
+                    tokenize = 'porter unicode61'
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS learned_answers_fts_insert
+                AFTER INSERT ON learned_answers BEGIN
+                    INSERT INTO learned_answers_fts (rowid, id, question, answer)
+                    VALUES (new.rowid, new.id, new.question, new.answer);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS learned_answers_fts_delete
+                AFTER DELETE ON learned_answers BEGIN
+                    DELETE FROM learned_answers_fts WHERE rowid = old.rowid;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS learned_answers_fts_update
+                AFTER UPDATE OF id, question, answer ON learned_answers BEGIN
+                    DELETE FROM learned_answers_fts WHERE rowid = old.rowid;
+                    INSERT INTO learned_answers_fts (rowid, id, question, answer)
+                    VALUES (new.rowid, new.id, new.question, new.answer);
+                END
+            ''')
+            # Change counter other processes poll to invalidate learned-answer caches
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_counters (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute("INSERT OR IGNORE INTO change_counters (name, version) VALUES ('learned_answers', 0)")
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS learned_answers_version_{event.lower()}
+                    AFTER {event} ON learned_answers BEGIN
+                        UPDATE change_counters SET version = version + 1 WHERE name = 'learned_answers';
+                    END
+                ''')
+            
+            if not has_fts:
+                # Index answers learned before the full-text table existed
+                cursor.execute('''
+                    INSERT INTO learned_answers_fts (rowid, id, question, answer)
+                    SELECT rowid, id, question, answer FROM learned_answers
+                ''')
+            
+            # One row per finished agent session, appended at shutdown, and
+            # hourly/daily sums kept up to date incrementally by roll_up_usage()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS session_usage (
+                    id TEXT PRIMARY KEY,
+                    room TEXT NOT NULL,
+                    started_at INTEGER NOT NULL,
+                    ended_at INTEGER NOT NULL,
+                    llm_prompt_tokens INTEGER NOT NULL,
+                    llm_cached_tokens INTEGER NOT NULL,
+                    llm_completion_tokens INTEGER NOT NULL,
+                    stt_audio_seconds REAL NOT NULL,
+                    tts_characters INTEGER NOT NULL,
+                    tts_audio_seconds REAL NOT NULL,
+                    turns INTEGER NOT NULL,
+                    escalations INTEGER NOT NULL,
+                    latency TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS usage_rollups (
+                    period TEXT NOT NULL,
+                    period_start INTEGER NOT NULL,
+                    sessions INTEGER NOT NULL,
+                    duration_seconds REAL NOT NULL,
+                    llm_prompt_tokens INTEGER NOT NULL,
+                    llm_cached_tokens INTEGER NOT NULL,
+                    llm_completion_tokens INTEGER NOT NULL,
+                    stt_audio_seconds REAL NOT NULL,
+                    tts_characters INTEGER NOT NULL,
+                    tts_audio_seconds REAL NOT NULL,
+                    turns INTEGER NOT NULL,
+                    escalations INTEGER NOT NULL,
+                    latency TEXT NOT NULL,
+                    PRIMARY KEY (period, period_start)
+                )
+            ''')
+            # Last session_usage rowid folded into the rollups
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rollup_progress (
+                    name TEXT PRIMARY KEY,
+                    last_rowid INTEGER NOT NULL
+                )
+            ''')
+            
+            # Secondary indexes for the status queues and per-customer lookups
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_help_requests_status_created
+                ON help_requests (status, created_at)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_help_requests_customer_phone
+                ON help_requests (customer_phone, created_at)
+            ''')
+            
+            # Keyset pagination walks (timestamp, id) in order
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_help_requests_created
+                ON help_requests (created_at, id)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_learned_answers_learned
+                ON learned_answers (learned_at, id)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_help_requests_pending_question
+                ON help_requests (question_key) WHERE status = 'pending'
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_help_request_callers_request
+                ON help_request_callers (request_id)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_help_requests_responded
+                ON help_requests (responded_at) WHERE responded_at IS NOT NULL
+            ''')
+            
+            if is_new:
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            return version
+    
+    async def migrate_timestamps(self, batch_size: int = 1000):
+        """Convert schema 1 text timestamps to epoch milliseconds in place.
+
+        Each batch is its own short transaction on the writer thread, so the agent
+        and dashboard keep reading and writing while a large file is converted.
+        Safe to run concurrently from several processes.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._run_timestamp_migration, batch_size)
+    
+    def _run_timestamp_migration(self, batch_size: int = 1000):
+        try:
+            for table, columns in _TIMESTAMP_COLUMNS:
+                after = 0
+                while after is not None:
+                    if self._stop_migration.is_set():
+                        return
+                    after = self.executor.submit_write(
+                        self._migrate_timestamp_batch, table, columns, after, batch_size
+                    ).result()
+            self.executor.submit_write(self._set_schema_version, SCHEMA_VERSION).result()
+            logger.info(f"Timestamp migration to schema {SCHEMA_VERSION} complete for {self.db_path}")
+        except Exception as e:
+            logger.error(f"Timestamp migration failed for {self.db_path}: {str(e)}")
+    
+    @staticmethod
+    def _migrate_timestamp_batch(cursor: sqlite3.Cursor, table: str, columns: Tuple[str, ...],
+                                 after_rowid: int, batch_size: int) -> Optional[int]:
+        upper = cursor.execute(f'''
+            SELECT MAX(rowid) FROM (
+                SELECT rowid FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?
             )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        ''', (after_rowid, batch_size)).fetchone()[0]
+        if upper is None:
+            return None
+        # Legacy text is naive local time, hence the 'utc' modifier
+        assignments = ", ".join(
+            f"{column} = CASE WHEN typeof({column}) = 'text' "
+            f"THEN CAST(ROUND((julianday({column}, 'utc') - 2440587.5) * 86400000) AS INTEGER) "
+            f"ELSE {column} END"
+            for column in columns
+        )
+        cursor.execute(
+            f"UPDATE {table} SET {assignments} WHERE rowid > ? AND rowid <= ?",
+            (after_rowid, upper),
+        )
+        return upper
+    
+    @staticmethod
+    def _set_schema_version(cursor: sqlite3.Cursor, version: int):
+        cursor.execute(f"PRAGMA user_version = {int(version)}")
+    
+    async def flush(self):
+        """Commit any rows still waiting in the write-behind buffer"""
+        if self.write_buffer is not None:
+            await asyncio.wrap_future(self.write_buffer.flush())
+    
+    def close(self):
+        """Flush buffered inserts, finish queued writes and close all pooled connections"""
+        self._stop_migration.set()
+        if self.migration_thread is not None:
+            self.migration_thread.join()
+        if self.write_buffer is not None:
+            self.write_buffer.flush_nowait()
+        self.executor.shutdown()
+        self.connections.close_all()
+    
+    def add_listener(self, listener: Callable[[str, str, Optional[int]], None]):
+        """Register listener(event, id, created_at_ms) for changes made through
+        this Database. Events are "created", "joined" and "resolved" for help
+        requests and "learned" for learned answers; listeners run on the caller's thread and
+        must not block."""
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[str, str, Optional[int]], None]):
+        self._listeners.remove(listener)
+    
+    def _notify(self, event: str, request_id: str, created_at_ms: Optional[int] = None):
+        for listener in list(self._listeners):
+            try:
+                listener(event, request_id, created_at_ms)
+            except Exception as e:
+                logger.error(f"Database listener failed on {event} {request_id}: {str(e)}")
+    
+    async def _read(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.wrap_future(self.executor.submit_read(fn, *args))
+    
+    async def _write(self, fn: Callable[..., Any], *args) -> Any:
+        if self.write_buffer is not None:
+            # Keep updates ordered after the inserts they may refer to
+            self.write_buffer.flush_nowait()
+        return await asyncio.wrap_future(self.executor.submit_write(fn, *args))
     
     async def create_help_request(self, id: str, customer_phone: str, question: str) -> HelpRequest:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         request = HelpRequest(
             id=id,
             customer_phone=customer_phone,
@@ -73,101 +918,305 @@ class Database:
             status=RequestStatus.PENDING,
             created_at=datetime.now()
         )
-        
-        cursor.execute('''
-            INSERT INTO help_requests (id, customer_phone, question, status, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (request.id, request.customer_phone, request.question, request.status.value, request.created_at))
-        
-        conn.commit()
-        conn.close()
+        created_at_ms = _to_epoch_ms(request.created_at)
+        await self._insert(
+            (_INSERT_HELP_REQUEST, (request.id, request.customer_phone, request.question, request.status.value,
+                                    created_at_ms, normalize_question(question))),
+            (_INSERT_CALLER, (request.id, request.customer_phone, request.question, created_at_ms, request.id)),
+        )
+        self._notify("created", request.id, created_at_ms)
         return request
     
-    async def get_pending_requests(self) -> List[HelpRequest]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+    async def create_or_join_help_request(self, id: str, customer_phone: str,
+                                          question: str) -> Tuple[HelpRequest, bool]:
+        """Open a help request, or add the caller to the pending request asking the
+        same normalized question. Returns (request, created); when `created` is
+        False the request is the existing ticket and the supervisor needs no new
+        alert. Atomic across processes sharing the database file."""
+        now_ms = _to_epoch_ms(datetime.now())
+        args = (id, customer_phone, question, normalize_question(question), now_ms)
+        if self.write_buffer is not None:
+            request, created = await asyncio.wrap_future(self.write_buffer.call(self._insert_or_join, *args))
+        else:
+            request, created = await self._write(self._insert_or_join, *args)
+        if created:
+            self._notify("created", request.id, now_ms)
+        else:
+            self._notify("joined", request.id)
+        return request, created
+    
+    @staticmethod
+    def _insert_or_join(cursor: sqlite3.Cursor, id: str, customer_phone: str, question: str,
+                        question_key: str, now_ms: int) -> Tuple[HelpRequest, bool]:
+        if not cursor.connection.in_transaction:
+            # Hold the write lock while looking, so two processes cannot both
+            # open a ticket for the same question
+            cursor.execute("BEGIN IMMEDIATE")
+        row = cursor.execute('''
             SELECT id, customer_phone, question, status, created_at, supervisor_response, responded_at
             FROM help_requests
-            WHERE status = 'pending'
+            WHERE question_key = ? AND status = 'pending'
             ORDER BY created_at
-        ''')
-        
-        requests = []
-        for row in cursor.fetchall():
-            requests.append(HelpRequest(
-                id=row[0],
-                customer_phone=row[1],
-                question=row[2],
-                status=RequestStatus(row[3]),
-                created_at=datetime.fromisoformat(row[4]),
-                supervisor_response=row[5],
-                responded_at=datetime.fromisoformat(row[6]) if row[6] else None
-            ))
-        
-        conn.close()
-        return requests
+            LIMIT 1
+        ''', (question_key,)).fetchone()
+        if row is None:
+            request = HelpRequest(id, customer_phone, question, RequestStatus.PENDING, now_ms)
+            cursor.execute(_INSERT_HELP_REQUEST,
+                           (id, customer_phone, question, RequestStatus.PENDING.value, now_ms, question_key))
+        else:
+            request = _request_from_row(row)
+        cursor.execute(_INSERT_CALLER, (request.id, customer_phone, question, now_ms, id))
+        return request, row is None
+    
+    async def _insert(self, *statements: Tuple[str, tuple]):
+        if self.write_buffer is not None:
+            self.write_buffer.add(*statements)
+        else:
+            await self._write(self._execute, statements)
+    
+    @staticmethod
+    def _execute(cursor: sqlite3.Cursor, statements: Tuple[Tuple[str, tuple], ...]):
+        for sql, params in statements:
+            cursor.execute(sql, params)
+    
+    async def get_pending_requests(self) -> List[HelpRequest]:
+        return await self._read(self._select_requests, "WHERE status = ?", (RequestStatus.PENDING.value,), "created_at")
+    
+    async def get_request(self, id: str) -> Optional[HelpRequest]:
+        return await self._read(self._select_request, id)
+    
+    async def get_requests_by_status(self, status: RequestStatus) -> List[HelpRequest]:
+        return await self._read(self._select_requests, "WHERE status = ?", (status.value,), "created_at DESC")
+    
+    async def get_requests_by_phone(self, customer_phone: str) -> List[HelpRequest]:
+        return await self._read(self._select_requests, "WHERE customer_phone = ?", (customer_phone,), "created_at DESC")
+    
+    @staticmethod
+    def _select_request(conn: sqlite3.Connection, id: str) -> Optional[HelpRequest]:
+        row = conn.execute('''
+            SELECT id, customer_phone, question, status, created_at, supervisor_response, responded_at
+            FROM help_requests
+            WHERE id = ?
+        ''', (id,)).fetchone()
+        return _request_from_row(row) if row else None
+    
+    @staticmethod
+    def _select_requests(conn: sqlite3.Connection, where: str, params: tuple, order_by: str) -> List[HelpRequest]:
+        cursor = conn.execute(f'''
+            SELECT id, customer_phone, question, status, created_at, supervisor_response, responded_at
+            FROM help_requests
+            {where}
+            ORDER BY {order_by}
+        ''', params)
+        return [_request_from_row(row) for row in cursor]
+    
+    async def count_requests(self, status: Optional[RequestStatus] = None) -> int:
+        return await self._read(self._count_requests, status)
+    
+    @staticmethod
+    def _count_requests(conn: sqlite3.Connection, status: Optional[RequestStatus]) -> int:
+        if status is None:
+            return conn.execute("SELECT COUNT(*) FROM help_requests").fetchone()[0]
+        return conn.execute(
+            "SELECT COUNT(*) FROM help_requests WHERE status = ?", (status.value,)
+        ).fetchone()[0]
+    
+    async def get_requests_page(self, status: Optional[RequestStatus] = None, limit: int = 50,
+                                cursor: Optional[str] = None, oldest_first: bool = False) -> Page[HelpRequest]:
+        """Return one page of requests (newest first unless `oldest_first`),
+        optionally filtered by status. Pass the returned `next_cursor` back in to
+        continue; each page costs the same no matter how deep it is."""
+        where, params = ("status = ?", (status.value,)) if status else ("", ())
+        after = _decode_cursor(cursor) if cursor else None
+        items, next_key = await self._read(
+            self._select_page, _REQUESTS_PAGE, where, params, not oldest_first, limit, after
+        )
+        return Page(items, _encode_cursor(next_key) if next_key else None)
+    
+    async def iter_requests(self, status: Optional[RequestStatus] = None, batch_size: int = 500,
+                            oldest_first: bool = False) -> AsyncIterator[HelpRequest]:
+        """Stream every matching request, fetching `batch_size` rows at a time"""
+        cursor = None
+        while True:
+            page = await self.get_requests_page(status, batch_size, cursor, oldest_first)
+            for request in page.items:
+                yield request
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+    
+    @staticmethod
+    def _select_page(conn: sqlite3.Connection, source: "_PageSource", where: str, params: tuple,
+                     descending: bool, limit: int, after: Optional[tuple]) -> Tuple[list, Optional[tuple]]:
+        conditions = [where] if where else []
+        order = "DESC" if descending else "ASC"
+        if after is not None:
+            conditions.append(f"({source.time_column}, id) {'<' if descending else '>'} (?, ?)")
+            params = params + tuple(after)
+        where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = conn.execute(f'''
+            SELECT {source.columns}
+            FROM {source.table}
+            {where_sql}
+            ORDER BY {source.time_column} {order}, id {order}
+            LIMIT ?
+        ''', params + (limit + 1,)).fetchall()
+        # Fetch one extra row to learn whether another page exists
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_key = (last[source.time_index], last[0])
+        return [source.from_row(row) for row in rows], next_key
     
     async def resolve_help_request(self, id: str, response: str) -> bool:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        resolved = await self._write(self._update_resolved, id, response, _to_epoch_ms(datetime.now()))
+        if resolved:
+            self._notify("resolved", id)
+        return resolved
+    
+    @staticmethod
+    def _update_resolved(cursor: sqlite3.Cursor, id: str, response: str, responded_at: int) -> bool:
         cursor.execute('''
             UPDATE help_requests
             SET status = 'resolved', supervisor_response = ?, responded_at = ?
             WHERE id = ?
-        ''', (response, datetime.now(), id))
-        
-        result = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return result
+        ''', (response, responded_at, id))
+        return cursor.rowcount > 0
+    
+    async def get_request_callers(self, request_id: str, waiting_only: bool = False) -> List[WaitingCaller]:
+        """Everyone who asked the question of this request, first caller first;
+        with `waiting_only`, just those not yet sent the answer"""
+        return await self._read(self._select_callers, request_id, waiting_only)
+    
+    @staticmethod
+    def _select_callers(conn: sqlite3.Connection, request_id: str, waiting_only: bool) -> List[WaitingCaller]:
+        cursor = conn.execute(f'''
+            SELECT request_id, customer_phone, question, joined_at, notified_at, caller_request_id
+            FROM help_request_callers
+            WHERE request_id = ? {"AND notified_at IS NULL" if waiting_only else ""}
+            ORDER BY joined_at, rowid
+        ''', (request_id,))
+        return [WaitingCaller(*row) for row in cursor]
+    
+    async def count_request_callers(self, request_ids: List[str]) -> Dict[str, int]:
+        """Number of callers waiting on each of the given requests"""
+        if not request_ids:
+            return {}
+        return await self._read(self._count_callers, list(request_ids))
+    
+    @staticmethod
+    def _count_callers(conn: sqlite3.Connection, request_ids: List[str]) -> Dict[str, int]:
+        counts = {}
+        for start in range(0, len(request_ids), 500):
+            chunk = request_ids[start:start + 500]
+            counts.update(conn.execute(f'''
+                SELECT request_id, COUNT(*) FROM help_request_callers
+                WHERE request_id IN ({", ".join("?" * len(chunk))})
+                GROUP BY request_id
+            ''', chunk).fetchall())
+        return counts
+    
+    async def mark_callers_notified(self, request_id: str, customer_phones: List[str],
+                                    caller_request_ids: Optional[List[str]] = None) -> int:
+        """Record that these callers, by phone number or by the id they escalated
+        under, were sent the answer; returns how many changed"""
+        caller_request_ids = list(caller_request_ids or [])
+        if not customer_phones and not caller_request_ids:
+            return 0
+        return await self._write(self._update_notified, request_id, list(customer_phones), caller_request_ids,
+                                 _to_epoch_ms(datetime.now()))
+    
+    @staticmethod
+    def _update_notified(cursor: sqlite3.Cursor, request_id: str, customer_phones: List[str],
+                         caller_request_ids: List[str], notified_at: int) -> int:
+        cursor.execute(f'''
+            UPDATE help_request_callers
+            SET notified_at = ?
+            WHERE request_id = ? AND notified_at IS NULL
+              AND (customer_phone IN ({", ".join("?" * len(customer_phones))})
+                   OR caller_request_id IN ({", ".join("?" * len(caller_request_ids))}))
+        ''', [notified_at, request_id, *customer_phones, *caller_request_ids])
+        return cursor.rowcount
+    
+    async def get_requests_resolved_since(self, since: datetime) -> List[HelpRequest]:
+        return await self._read(
+            self._select_requests, "WHERE responded_at >= ? AND status = ?",
+            (_to_epoch_ms(since), RequestStatus.RESOLVED.value), "responded_at"
+        )
     
     async def get_all_requests(self) -> List[HelpRequest]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, customer_phone, question, status, created_at, supervisor_response, responded_at
-            FROM help_requests
-            ORDER BY created_at DESC
-        ''')
-        
-        requests = []
-        for row in cursor.fetchall():
-            requests.append(HelpRequest(
-                id=row[0],
-                customer_phone=row[1],
-                question=row[2],
-                status=RequestStatus(row[3]),
-                created_at=datetime.fromisoformat(row[4]),
-                supervisor_response=row[5],
-                responded_at=datetime.fromisoformat(row[6]) if row[6] else None
-            ))
-        
-        conn.close()
-        return requests
+        return await self._read(self._select_requests, "", (), "created_at DESC")
     
     async def mark_timeout_requests(self, timeout_hours: int = 24):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         timeout_time = datetime.now() - timedelta(hours=timeout_hours)
-        
+        await self._write(self._update_timed_out, _to_epoch_ms(timeout_time))
+    
+    @staticmethod
+    def _update_timed_out(cursor: sqlite3.Cursor, timeout_time: int):
         cursor.execute('''
             UPDATE help_requests
             SET status = 'unresolved'
             WHERE status = 'pending' AND created_at < ?
         ''', (timeout_time,))
-        
-        conn.commit()
-        conn.close()
+    
+    async def get_pending_deadlines(self, created_since: Optional[datetime] = None) -> List[Tuple[int, str]]:
+        """Return (created_at_ms, id) for pending requests, oldest first, optionally
+        only those created at or after `created_since`"""
+        since_ms = _to_epoch_ms(created_since) if created_since else None
+        return await self._read(self._select_pending_deadlines, since_ms)
+    
+    @staticmethod
+    def _select_pending_deadlines(conn: sqlite3.Connection, since_ms: Optional[int]) -> List[Tuple[int, str]]:
+        if since_ms is None:
+            rows = conn.execute(
+                "SELECT created_at, id FROM help_requests WHERE status = 'pending' ORDER BY created_at"
+            ).fetchall()
+        else:
+            # Schema 1 text sorts after every integer, so it is always included
+            rows = conn.execute(
+                "SELECT created_at, id FROM help_requests WHERE status = 'pending' AND created_at >= ? "
+                "ORDER BY created_at",
+                (since_ms,),
+            ).fetchall()
+        if rows and rows[-1][0].__class__ is not int:
+            # Schema 1 text that the background migration has not reached yet
+            rows = sorted((created_at if created_at.__class__ is int
+                           else _to_epoch_ms(_decode_timestamp(created_at)), id) for created_at, id in rows)
+        return rows
+    
+    async def expire_requests(self, ids: List[str]) -> int:
+        """Mark the given requests unresolved if they are still pending; returns
+        how many changed"""
+        if not ids:
+            return 0
+        return await self._write(self._update_expired, list(ids))
+    
+    @staticmethod
+    def _update_expired(cursor: sqlite3.Cursor, ids: List[str]) -> int:
+        expired = 0
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(f'''
+                UPDATE help_requests
+                SET status = 'unresolved'
+                WHERE status = 'pending' AND id IN ({", ".join("?" * len(chunk))})
+            ''', chunk)
+            expired += cursor.rowcount
+        return expired
+    
+    async def get_data_version(self) -> int:
+        """PRAGMA data_version as seen by the writer connection: it changes whenever
+        another connection or process commits to the file"""
+        return await asyncio.wrap_future(self.executor.submit_write(self._select_data_version))
+    
+    @staticmethod
+    def _select_data_version(cursor: sqlite3.Cursor) -> int:
+        return cursor.execute("PRAGMA data_version").fetchone()[0]
     
     async def add_learned_answer(self, question: str, answer: str) -> LearnedAnswer:
         import uuid
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         
         learned = LearnedAnswer(
             id=str(uuid.uuid4()),
@@ -175,57 +1224,197 @@ class Database:
             answer=answer,
             learned_at=datetime.now()
         )
-        
-        cursor.execute('''
-            INSERT INTO learned_answers (id, question, answer, learned_at)
-            VALUES (?, ?, ?, ?)
-        ''', (learned.id, learned.question, learned.answer, learned.learned_at))
-        
-        conn.commit()
-        conn.close()
+        await self._insert((_INSERT_LEARNED_ANSWER,
+                            (learned.id, learned.question, learned.answer, _to_epoch_ms(learned.learned_at))))
+        self._notify("learned", learned.id)
         return learned
     
-    async def get_learned_answers(self) -> List[LearnedAnswer]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+    async def get_learned_answers_version(self) -> int:
+        """Counter bumped by every insert, update or delete on learned_answers,
+        from any connection or process"""
+        return await self._read(self._select_learned_answers_version)
+    
+    @staticmethod
+    def _select_learned_answers_version(conn: sqlite3.Connection) -> int:
+        return conn.execute(
+            "SELECT version FROM change_counters WHERE name = 'learned_answers'"
+        ).fetchone()[0]
+    
+    async def get_learned_answers_after(self, rowid: int, limit: int = 1000) -> List[Tuple[int, LearnedAnswer]]:
+        """Return up to `limit` (rowid, answer) pairs inserted after `rowid`, in
+        insertion order, for consumers that index answers incrementally"""
+        return await self._read(self._select_learned_answers_after, rowid, limit)
+    
+    @staticmethod
+    def _select_learned_answers_after(conn: sqlite3.Connection, rowid: int,
+                                      limit: int) -> List[Tuple[int, LearnedAnswer]]:
+        cursor = conn.execute('''
+            SELECT rowid, id, question, answer, learned_at
+            FROM learned_answers
+            WHERE rowid > ?
+            ORDER BY rowid
+            LIMIT ?
+        ''', (rowid, limit))
+        return [(row[0], _answer_from_row(row[1:])) for row in cursor]
+    
+    async def get_learned_answers_by_ids(self, ids: List[str]) -> List[LearnedAnswer]:
+        """Return the learned answers with these ids, in the order given"""
+        if not ids:
+            return []
+        return await self._read(self._select_learned_answers_by_ids, ids)
+    
+    @staticmethod
+    def _select_learned_answers_by_ids(conn: sqlite3.Connection, ids: List[str]) -> List[LearnedAnswer]:
+        placeholders = ", ".join("?" * len(ids))
+        cursor = conn.execute(f'''
             SELECT id, question, answer, learned_at
             FROM learned_answers
-            ORDER BY learned_at DESC
-        ''')
-        
-        answers = []
-        for row in cursor.fetchall():
-            answers.append(LearnedAnswer(
-                id=row[0],
-                question=row[1],
-                answer=row[2],
-                learned_at=datetime.fromisoformat(row[3])
-            ))
-        
-        conn.close()
-        return answers
+            WHERE id IN ({placeholders})
+        ''', ids)
+        by_id = {row[0]: _answer_from_row(row) for row in cursor}
+        return [by_id[id] for id in ids if id in by_id]
     
-    async def search_learned_answers(self, query: str) -> List[LearnedAnswer]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+    async def get_learned_answers(self) -> List[LearnedAnswer]:
+        return await self._read(self._select_learned_answers)
+    
+    @staticmethod
+    def _select_learned_answers(conn: sqlite3.Connection) -> List[LearnedAnswer]:
+        cursor = conn.execute('''
             SELECT id, question, answer, learned_at
             FROM learned_answers
-            WHERE question LIKE ? OR answer LIKE ?
             ORDER BY learned_at DESC
-        ''', (f'%{query}%', f'%{query}%'))
+        ''')
+        return [_answer_from_row(row) for row in cursor]
+    
+    async def get_learned_answers_page(self, limit: int = 50, cursor: Optional[str] = None) -> Page[LearnedAnswer]:
+        """Return one page of learned answers, most recently learned first"""
+        after = _decode_cursor(cursor) if cursor else None
+        items, next_key = await self._read(self._select_page, _ANSWERS_PAGE, "", (), True, limit, after)
+        return Page(items, _encode_cursor(next_key) if next_key else None)
+    
+    async def iter_learned_answers(self, batch_size: int = 500) -> AsyncIterator[LearnedAnswer]:
+        """Stream every learned answer, fetching `batch_size` rows at a time"""
+        cursor = None
+        while True:
+            page = await self.get_learned_answers_page(batch_size, cursor)
+            for answer in page.items:
+                yield answer
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+    
+    async def search_learned_answers(self, query: str, limit: int = 5) -> List[LearnedAnswer]:
+        """Return up to `limit` learned answers matching every keyword in `query`,
+        best BM25 match first. Each result carries its relevance in `score`
+        (higher is better)."""
+        match = _fts_query(query)
+        if match is None:
+            return []
+        return await self._read(self._select_matching_answers, match, limit)
+    
+    @staticmethod
+    def _select_matching_answers(conn: sqlite3.Connection, match: str, limit: int) -> List[LearnedAnswer]:
+        # bm25() is lower-is-better; questions weigh twice as much as answers
+        cursor = conn.execute('''
+            SELECT la.id, la.question, la.answer, la.learned_at,
+                   -bm25(learned_answers_fts, 0.0, 2.0, 1.0) AS score
+            FROM learned_answers_fts
+            JOIN learned_answers la ON la.id = learned_answers_fts.id
+            WHERE learned_answers_fts MATCH ?
+            ORDER BY score DESC
+            LIMIT ?
+        ''', (match, limit))
+        return [_answer_from_row(row) for row in cursor]
+    
+    async def add_session_usage(self, usage: SessionUsage):
+        """Append a finished session's usage record"""
+        await self._insert((_INSERT_SESSION_USAGE, (
+            usage.id, usage.room, _to_epoch_ms(usage.started_at), _to_epoch_ms(usage.ended_at),
+            *(getattr(usage, name) for name in USAGE_COUNTERS), json.dumps(usage.latency, separators=(",", ":")),
+        )))
+    
+    async def roll_up_usage(self, batch_size: int = 1000) -> int:
+        """Fold session usage records added since the last call into the hourly
+        and daily rollups; returns how many were folded in. Each batch reads
+        only new rows and rewrites only the periods they touch, in one
+        transaction with the progress marker, so concurrent callers never
+        count a session twice."""
+        folded = 0
+        while True:
+            count = await self._write(self._roll_up_usage_batch, batch_size)
+            if not count:
+                return folded
+            folded += count
+    
+    @staticmethod
+    def _roll_up_usage_batch(cursor: sqlite3.Cursor, batch_size: int) -> int:
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        row = cursor.execute("SELECT last_rowid FROM rollup_progress WHERE name = 'session_usage'").fetchone()
+        rows = cursor.execute(f'''
+            SELECT rowid, started_at, ended_at, {", ".join(USAGE_COUNTERS)}, latency
+            FROM session_usage
+            WHERE rowid > ?
+            ORDER BY rowid
+            LIMIT ?
+        ''', (row[0] if row else 0, batch_size)).fetchall()
+        if not rows:
+            return 0
         
-        answers = []
-        for row in cursor.fetchall():
-            answers.append(LearnedAnswer(
-                id=row[0],
-                question=row[1],
-                answer=row[2],
-                learned_at=datetime.fromisoformat(row[3])
-            ))
+        rollups: Dict[Tuple[str, int], UsageRollup] = {}
+        for row in rows:
+            started_at = datetime.fromtimestamp(row[1] / 1000)
+            counters = row[3:3 + len(USAGE_COUNTERS)]
+            latency = json.loads(row[-1])
+            for period in USAGE_PERIODS:
+                key = (period, _to_epoch_ms(_period_start(period, started_at)))
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = (Database._select_rollup(cursor, *key)
+                                             or UsageRollup(period, datetime.fromtimestamp(key[1] / 1000)))
+                rollup.sessions += 1
+                rollup.duration_seconds += (row[2] - row[1]) / 1000
+                for name, value in zip(USAGE_COUNTERS, counters):
+                    setattr(rollup, name, getattr(rollup, name) + value)
+                merge_latency(rollup.latency, latency)
         
-        conn.close()
-        return answers
+        cursor.executemany(f'''
+            INSERT OR REPLACE INTO usage_rollups
+                (period, period_start, sessions, duration_seconds, {", ".join(USAGE_COUNTERS)}, latency)
+            VALUES (?, ?, ?, ?, {", ".join("?" * len(USAGE_COUNTERS))}, ?)
+        ''', [(period, start, rollup.sessions, rollup.duration_seconds,
+               *(getattr(rollup, name) for name in USAGE_COUNTERS),
+               json.dumps(rollup.latency, separators=(",", ":")))
+              for (period, start), rollup in rollups.items()])
+        cursor.execute('''
+            INSERT INTO rollup_progress (name, last_rowid) VALUES ('session_usage', ?)
+            ON CONFLICT (name) DO UPDATE SET last_rowid = excluded.last_rowid
+        ''', (rows[-1][0],))
+        return len(rows)
+    
+    @staticmethod
+    def _select_rollup(conn, period: str, period_start: int) -> Optional[UsageRollup]:
+        row = conn.execute(f'''
+            SELECT period, period_start, sessions, duration_seconds, {", ".join(USAGE_COUNTERS)}, latency
+            FROM usage_rollups
+            WHERE period = ? AND period_start = ?
+        ''', (period, period_start)).fetchone()
+        return _rollup_from_row(row) if row else None
+    
+    async def get_usage_rollups(self, period: str = "hour", since: Optional[datetime] = None) -> List[UsageRollup]:
+        """Rollups for `period` ("hour" or "day"), oldest first, optionally only
+        periods starting at or after `since`. Call roll_up_usage() first to
+        include the latest sessions."""
+        if period not in USAGE_PERIODS:
+            raise ValueError(f"Unknown usage period: {period!r}, expected one of {USAGE_PERIODS}")
+        return await self._read(self._select_rollups, period, _to_epoch_ms(since) if since else 0)
+    
+    @staticmethod
+    def _select_rollups(conn: sqlite3.Connection, period: str, since_ms: int) -> List[UsageRollup]:
+        cursor = conn.execute(f'''
+            SELECT period, period_start, sessions, duration_seconds, {", ".join(USAGE_COUNTERS)}, latency
+            FROM usage_rollups
+            WHERE period = ? AND period_start >= ?
+            ORDER BY period_start
+        ''', (period, since_ms))
+        return [_rollup_from_row(row) for row in cursor]
@@ -0,0 +1,200 @@
+"""
+Intent Model - A small local model deciding if an utterance is a service question
+
+Utterances are turned into hashed character n-gram features and scored with
+a logistic regression, all in NumPy, so a whole batch is classified with a
+handful of vectorized operations and no network round trip.
+
+Model files are uncompressed NumPy .npz archives holding:
+    weights  float32[n_features]  one weight per hash bucket
+    bias     float32[]            intercept
+    config   uint8[]              UTF-8 JSON: format, ngram_range, threshold, metrics
+"""
+
+import json
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from question_classifier import QuestionClassifier
+
+FORMAT_VERSION = 1
+
+# Responses the old auto-resolver stored for non-service escalations
+_AUTO_RESOLVED_PREFIX = "Auto-resolved"
+
+_HASH_PRIME = np.uint64(0x100000001B3)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_ngrams(texts: Sequence[str], ngram_range: Tuple[int, int],
+                n_features: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hash every character n-gram of every text in one vectorized pass.
+
+    Returns (rows, buckets, values): the text index, feature bucket and weight
+    of each n-gram occurrence. Values are 1/sqrt(n-grams in the text), so long
+    and short utterances score on the same scale.
+    """
+    # Pad each text with spaces so word starts and ends form their own n-grams
+    padded = [f" {' '.join(t.lower().split())} " for t in texts]
+    lengths = np.fromiter((len(t) for t in padded), dtype=np.int64, count=len(padded))
+    codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    owner = np.repeat(np.arange(len(padded)), lengths)
+
+    rows, buckets = [], []
+    mask = np.uint64(n_features - 1)
+    with np.errstate(over="ignore"):
+        for n in range(ngram_range[0], ngram_range[1] + 1):
+            count = len(codes) - n + 1
+            if count <= 0:
+                continue
+            # Windows that would straddle two texts are dropped
+            valid = owner[:count] == owner[n - 1:]
+            h = np.full(count, np.uint64(n), dtype=np.uint64)
+            for k in range(n):
+                h = (h ^ codes[k:k + count]) * _HASH_PRIME
+            h ^= h >> np.uint64(29)
+            h *= _HASH_MIX
+            h ^= h >> np.uint64(32)
+            rows.append(owner[:count][valid])
+            buckets.append((h[valid] & mask).astype(np.int64))
+
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    buckets = np.concatenate(buckets) if buckets else np.empty(0, dtype=np.int64)
+    per_text = np.bincount(rows, minlength=len(padded)).astype(np.float32)
+    values = 1.0 / np.sqrt(np.maximum(per_text, 1.0))[rows]
+    return rows, buckets, values.astype(np.float32)
+
+
+class IntentModel:
+    """Hashed character n-gram logistic regression for service-question intent"""
+
+    def __init__(self, weights: np.ndarray, bias: float, ngram_range: Tuple[int, int] = (2, 4),
+                 threshold: float = 0.5, metrics: Optional[Dict[str, float]] = None):
+        n_features = len(weights)
+        if n_features & (n_features - 1):
+            raise ValueError("n_features must be a power of two")
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.ngram_range = tuple(ngram_range)
+        self.threshold = threshold
+        self.metrics = metrics or {}
+
+    @property
+    def n_features(self) -> int:
+        return len(self.weights)
+
+    def decision_function(self, texts: Sequence[str]) -> np.ndarray:
+        """Raw logits, one per text"""
+        rows, buckets, values = hash_ngrams(texts, self.ngram_range, self.n_features)
+        scores = np.bincount(rows, weights=self.weights[buckets] * values, minlength=len(texts))
+        return scores + self.bias
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Probability that each text is a service question"""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(texts)))
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        """True for each text that is a service question"""
+        return self.predict_proba(texts) >= self.threshold
+
+    def is_service_question(self, question: str) -> bool:
+        return bool(self.predict([question])[0])
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[bool], n_features: int = 2 ** 18,
+              ngram_range: Tuple[int, int] = (2, 4), epochs: int = 300, learning_rate: float = 0.05,
+              l2: float = 1e-6) -> "IntentModel":
+        """Fit with full-batch Adam on the class-balanced logistic loss"""
+        y = np.asarray(labels, dtype=np.float32)
+        if len(y) == 0 or y.min() == y.max():
+            raise ValueError("Training data needs both service and non-service examples")
+        rows, buckets, values = hash_ngrams(texts, ngram_range, n_features)
+
+        # Weight classes equally however skewed the history is
+        positives = y.sum()
+        sample_weight = np.where(y > 0, len(y) / (2 * positives), len(y) / (2 * (len(y) - positives)))
+        sample_weight = (sample_weight / len(y)).astype(np.float32)
+
+        params = np.zeros(n_features + 1, dtype=np.float32)
+        m = np.zeros_like(params)
+        v = np.zeros_like(params)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        for step in range(1, epochs + 1):
+            w, b = params[:-1], params[-1]
+            logits = np.bincount(rows, weights=w[buckets] * values, minlength=len(y)) + b
+            error = (1.0 / (1.0 + np.exp(-logits)) - y) * sample_weight
+            grad = np.empty_like(params)
+            grad[:-1] = np.bincount(buckets, weights=error[rows] * values, minlength=n_features) + l2 * w
+            grad[-1] = error.sum()
+            m = beta1 * m + (1 - beta1) * grad
+            v = beta2 * v + (1 - beta2) * grad * grad
+            params -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+        return cls(params[:-1].copy(), float(params[-1]), ngram_range)
+
+    def save(self, path: str):
+        config = {
+            "format": FORMAT_VERSION,
+            "ngram_range": list(self.ngram_range),
+            "threshold": self.threshold,
+            "metrics": self.metrics,
+        }
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, bias=np.float32(self.bias),
+                     config=np.frombuffer(json.dumps(config).encode(), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with np.load(path) as archive:
+            config = json.loads(archive["config"].tobytes())
+            if config.get("format") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported intent model format: {config.get('format')}")
+            return cls(archive["weights"], float(archive["bias"]), tuple(config["ngram_range"]),
+                       config["threshold"], config.get("metrics"))
+
+
+def seed_examples() -> Tuple[List[str], List[bool]]:
+    """Small-talk negatives from the classifier's phrase lists, so every model knows them"""
+    phrases = QuestionClassifier.TECHNICAL_PHRASES + QuestionClassifier.CONVERSATIONAL_PHRASES
+    texts = []
+    for phrase in phrases:
+        texts += [phrase, f"{phrase.capitalize()}?", f"{phrase}, {phrases[len(texts) % len(phrases)]}"]
+    return texts, [False] * len(texts)
+
+
+def load_history(db_path: str) -> Tuple[List[str], List[bool]]:
+    """Labelled questions from escalation history.
+
+    Resolved requests answered by a supervisor and every learned answer are
+    service questions; requests auto-resolved as audio checks or greetings are
+    not. Pending and unresolved requests carry no label and are skipped.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        texts, labels = [], []
+        for question, response in conn.execute(
+            "SELECT question, supervisor_response FROM help_requests WHERE status = 'resolved'"
+        ):
+            texts.append(question)
+            labels.append(not (response or "").startswith(_AUTO_RESOLVED_PREFIX))
+        for (question,) in conn.execute("SELECT question FROM learned_answers"):
+            texts.append(question)
+            labels.append(True)
+        return texts, labels
+    finally:
+        conn.close()
+
+
+def load_labels(path: str) -> Tuple[List[str], List[bool]]:
+    """Extra examples from a TSV file of `label<TAB>text` lines (label 1 = service)"""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            label, text = line.rstrip("\n").split("\t", 1)
+            texts.append(text)
+            labels.append(label.strip() in ("1", "service", "true"))
+    return texts, labels
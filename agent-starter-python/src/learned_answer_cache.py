@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+from database import Database, LearnedAnswer
+
+logger = logging.getLogger("learned_answer_cache")
+
+class LearnedAnswerCache:
+    """Read-through LRU cache in front of the learned-answer lookups.
+
+    Learned answers only change when a supervisor responds, so repeated
+    `search_learned_answers` and `get_learned_answers` calls are served from
+    memory. The cache is dropped as soon as this process learns something new
+    (through the Database listener hook), and at most `revalidate_interval`
+    seconds after another process does, by comparing the learned_answers change
+    counter maintained by SQLite triggers.
+    """
+
+    def __init__(self, database: Database, max_entries: int = 256, revalidate_interval: float = 0.5):
+        self.db = database
+        self.max_entries = max_entries
+        self.revalidate_interval = revalidate_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, List[LearnedAnswer]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so in-flight misses never store stale results
+        self._generation = 0
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self.db.add_listener(self._on_database_change)
+
+    def close(self):
+        """Detach from the database's change notifications"""
+        self.db.remove_listener(self._on_database_change)
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    async def search_learned_answers(self, query: str, limit: int = 5) -> List[LearnedAnswer]:
+        key = ("search", self._normalize(query), limit)
+        return await self._get(key, self.db.search_learned_answers, query, limit)
+
+    async def get_learned_answers(self) -> List[LearnedAnswer]:
+        return await self._get(("all",), self.db.get_learned_answers)
+
+    async def add_learned_answer(self, question: str, answer: str) -> LearnedAnswer:
+        # The database listener invalidates the cache
+        return await self.db.add_learned_answer(question, answer)
+
+    def invalidate(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for sizing the cache"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def _on_database_change(self, event: str, id: str, created_at_ms: Optional[int]):
+        if event == "learned":
+            self.invalidate()
+
+    async def _revalidate(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.revalidate_interval:
+            return
+        self._checked_at = now
+        version = await self.db.get_learned_answers_version()
+        if self._version is not None and version != self._version:
+            logger.debug("Learned answers changed in another process, invalidating cache")
+            self.invalidate()
+        self._version = version
+
+    async def _get(self, key: Hashable, loader, *args) -> List[LearnedAnswer]:
+        await self._revalidate()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(cached)
+            self.misses += 1
+            generation = self._generation
+
+        result = await loader(*args)
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return list(result)
@@ -0,0 +1,177 @@
+"""
+LLM Router - Sends each LLM turn to a fast or a large model
+
+Most receptionist turns are answered from the instructions (hours, address,
+listed prices) or only put a tool result into words, and don't need the large
+model. The route is picked locally from the conversation, with no extra
+latency:
+
+    fast   small talk, questions about what the instructions already list,
+           phrasing a tool result, answers injected by speculative lookup
+    large  everything else: questions likely to need a tool (so escalation
+           keeps the stronger tool caller), empty tool results, long
+           questions and long conversations
+"""
+
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from livekit.agents import APIConnectOptions, llm
+from livekit.agents.llm import ChatContext, ChatMessage
+from livekit.agents.metrics import LLMMetrics
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
+
+from question_classifier import PhraseMatcher, QuestionClassifier
+
+logger = logging.getLogger("llm_router")
+
+ROUTES = ("fast", "large")
+
+# What the agent's instructions answer without a tool
+LISTED_TOPICS = [
+    "hours", "open", "opening", "close", "closing", "closed", "sunday", "saturday", "weekend",
+    "location", "located", "address", "where are you", "directions", "phone number",
+    "haircut", "haircuts", "hair coloring", "hair color", "coloring", "styling",
+    "manicure", "manicures", "pedicure", "pedicures", "facial", "facials", "waxing", "wax",
+]
+
+# Things the instructions don't cover, which the model should look up or escalate
+UNLISTED_TOPICS = [
+    "botox", "filler", "laser", "microblading", "tattoo", "piercing", "massage", "makeup",
+    "extension", "extensions", "lash", "lashes", "brow", "brows", "keratin", "perm", "bleach",
+    "bridal", "wedding", "pregnant", "pregnancy", "allergy", "allergic", "sensitive", "rash",
+    "medical", "safe", "refund", "complaint", "manager", "stylist", "available", "availability",
+    "appointment", "book", "booking", "schedule", "discount", "package", "special", "gift card",
+    "kids", "children", "dog", "before",
+]
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    route: str
+    reason: str
+
+
+class RoutingLLM(llm.LLM):
+    """Routes each completion to the `fast` or `large` LLM.
+
+    Each route is its own LLM instance, configured with its own model and
+    sampling options; `conn_options` can override timeouts and retries per
+    route. Questions above `max_fast_words` words and conversations above
+    `max_fast_items` chat items always use the large model. `on_route`, when
+    set, sees every decision. Metrics of both models are re-emitted as this
+    LLM's own.
+    """
+
+    def __init__(self, fast: llm.LLM, large: llm.LLM, classifier=QuestionClassifier,
+                 conn_options: Optional[Dict[str, APIConnectOptions]] = None, max_fast_words: int = 25,
+                 max_fast_items: int = 40, on_route: Optional[Callable[[RouteDecision], None]] = None):
+        super().__init__()
+        self.routes = {"fast": fast, "large": large}
+        self.classifier = classifier
+        self.conn_options = conn_options or {}
+        self.max_fast_words = max_fast_words
+        self.max_fast_items = max_fast_items
+        self.on_route = on_route
+        self._topics = PhraseMatcher({"listed": LISTED_TOPICS, "unlisted": UNLISTED_TOPICS})
+        self._decisions: Counter = Counter()
+        self._ttft: Dict[str, List[float]] = defaultdict(list)
+        self._tokens: Dict[str, Counter] = defaultdict(Counter)
+        self._forwarders = {}
+        for route, instance in self.routes.items():
+            self._forwarders[route] = self._metrics_forwarder(route)
+            instance.on("metrics_collected", self._forwarders[route])
+
+    @property
+    def model(self) -> str:
+        return f"RoutingLLM({self.routes['fast'].model}, {self.routes['large'].model})"
+
+    def route(self, chat_ctx: ChatContext) -> RouteDecision:
+        """Pick the model for the next completion of this conversation"""
+        items = chat_ctx.items
+        last = items[-1] if items else None
+        if last is not None and last.type == "function_call_output":
+            # An empty result leaves the next step (e.g. request_help) to decide
+            if last.is_error or not (last.output or "").strip() or last.output == "None":
+                return RouteDecision("large", "empty_tool_result")
+            return RouteDecision("fast", "tool_result")
+        if not isinstance(last, ChatMessage) or last.role != "user":
+            return RouteDecision("fast", "no_user_turn")
+        if len(items) > self.max_fast_items:
+            return RouteDecision("large", "long_conversation")
+        if self._has_injected_context(items):
+            return RouteDecision("fast", "injected_answer")
+
+        question = last.text_content or ""
+        if len(question.split()) > self.max_fast_words:
+            return RouteDecision("large", "long_question")
+        if not self.classifier.classify(question).is_service:
+            return RouteDecision("fast", "small_talk")
+        topics = self._topics.match(question)
+        if "listed" in topics and "unlisted" not in topics:
+            return RouteDecision("fast", "listed_info")
+        return RouteDecision("large", "tool_likely")
+
+    @staticmethod
+    def _has_injected_context(items: list) -> bool:
+        # A system message since the last reply; the first item is the instructions
+        for item in reversed(items[1:]):
+            if isinstance(item, ChatMessage):
+                if item.role == "system":
+                    return True
+                if item.role == "assistant":
+                    return False
+        return False
+
+    def chat(self, *, chat_ctx: ChatContext, tools: Optional[list] = None,
+             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+             parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN, tool_choice=NOT_GIVEN,
+             extra_kwargs=NOT_GIVEN) -> llm.LLMStream:
+        decision = self.route(chat_ctx)
+        self._decisions[decision] += 1
+        logger.debug(f"LLM route {decision.route} ({decision.reason})")
+        if self.on_route is not None:
+            self.on_route(decision)
+        return self.routes[decision.route].chat(
+            chat_ctx=chat_ctx,
+            tools=tools,
+            conn_options=self.conn_options.get(decision.route, conn_options),
+            parallel_tool_calls=parallel_tool_calls,
+            tool_choice=tool_choice,
+            extra_kwargs=extra_kwargs,
+        )
+
+    def _metrics_forwarder(self, route: str) -> Callable:
+        def forward(metrics):
+            if isinstance(metrics, LLMMetrics) and not metrics.cancelled:
+                self._ttft[route].append(metrics.ttft)
+                self._tokens[route]["prompt_tokens"] += metrics.prompt_tokens
+                self._tokens[route]["completion_tokens"] += metrics.completion_tokens
+            self.emit("metrics_collected", metrics)
+
+        return forward
+
+    def prewarm(self):
+        for instance in self.routes.values():
+            instance.prewarm()
+
+    async def aclose(self):
+        for route, instance in self.routes.items():
+            instance.off("metrics_collected", self._forwarders[route])
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-route completions, time to first token and tokens, and the
+        reasons behind each route"""
+        summary = {}
+        for route in ROUTES:
+            ttft = sorted(self._ttft[route])
+            summary[route] = {
+                "completions": sum(n for d, n in self._decisions.items() if d.route == route),
+                "reasons": {d.reason: n for d, n in self._decisions.items() if d.route == route},
+                "mean_ttft_ms": sum(ttft) / len(ttft) * 1000 if ttft else None,
+                "p95_ttft_ms": ttft[min(len(ttft) - 1, int(len(ttft) * 0.95))] * 1000 if ttft else None,
+                **self._tokens[route],
+            }
+        return summary
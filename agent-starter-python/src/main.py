@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import threading
 import subprocess
@@ -10,7 +9,6 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from database import Database
-from timeout_service import TimeoutService
 from customer_followup import CustomerFollowupService
 
 logging.basicConfig(
@@ -34,12 +32,6 @@ def run_agent():
     # Change to dev mode for continuous running
     subprocess.run([sys.executable, "src/agent.py", "dev"])
 
-async def run_timeout_service():
-    """Run the timeout monitoring service"""
-    db = Database()
-    timeout_service = TimeoutService(db, timeout_hours=24)
-    await timeout_service.start_monitoring()
-
 def main():
     """Main entry point that runs both web server and agent"""
     logger.info("🌟 Starting Glow Beauty Salon AI Receptionist System")
@@ -71,13 +63,7 @@ def main():
     print("\n🎯 System is running... Press Ctrl+C to stop\n")
     
     try:
-        # Run timeout service in background
-        timeout_service_thread = threading.Thread(
-            target=lambda: asyncio.run(run_timeout_service()),
-            daemon=True
-        )
-        timeout_service_thread.start()
-        
+        # Timeout monitoring runs inside the web server (see web_server.timeout_service)
         # Keep the main thread running
         logger.info("✅ All services started. Press Ctrl+C to stop.")
         
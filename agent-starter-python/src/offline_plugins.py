@@ -0,0 +1,354 @@
+"""
+Offline Plugins - Deterministic local stand-ins for the STT, LLM and TTS services
+
+They run a real AgentSession with the real Assistant and no network, for the
+load harness (load_test.py) and tests:
+
+    ScriptedSTT       streaming STT; the caller script speaks through `speak`
+    CannedSTT         batch STT returning a fixed transcript
+    RuleBasedLLM      calls request_help for service questions, otherwise
+                      answers with a fixed line, after a configurable TTFT
+    ToneTTS           streaming TTS emitting a sine tone as long as the text
+    SilenceInput      room-less microphone producing silent frames in real time
+    PacedAudioOutput  speaker that plays audio out in real time
+
+CannedSTT, RuleBasedLLM and ToneTTS also stand in for real providers behind
+provider_failover: their latency may be a function drawn from per request,
+`fail` makes every request fail, and `provider` names them apart.
+"""
+
+import asyncio
+import json
+import time
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import APIConnectionError, APIConnectOptions, APIError, llm, stt, tts, utils
+from livekit.agents.llm import ChatContext, ChatMessage, is_function_tool
+from livekit.agents.llm.tool_context import get_function_info
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, NotGivenOr
+from livekit.agents.voice import io
+
+from question_classifier import QuestionClassifier
+
+DEFAULT_REPLY = "Hello! Welcome to Glow Beauty Salon. How can I help you today?"
+
+# Seconds, or a function returning each request's seconds
+Latency = Union[float, Callable[[], float]]
+
+
+def _seconds(latency: Latency) -> float:
+    return latency() if callable(latency) else latency
+
+
+async def _respond_after(latency: Latency, fail: bool, provider: str):
+    await asyncio.sleep(_seconds(latency))
+    if fail:
+        raise APIConnectionError(f"{provider} is unavailable")
+
+
+class _ScriptedSTTStream(stt.RecognizeStream):
+    async def _run(self):
+        # Audio is consumed and ignored; transcripts come from the script
+        async for _ in self._input_ch:
+            pass
+
+    def send(self, event_type: stt.SpeechEventType, text: str = ""):
+        alternatives = [stt.SpeechData(language="en", text=text, confidence=1.0)] if text else []
+        self._event_ch.send_nowait(stt.SpeechEvent(type=event_type, alternatives=alternatives))
+
+
+class ScriptedSTT(stt.STT):
+    """Streaming STT whose transcripts are spoken by a caller script.
+
+    `speak` plays one utterance: start of speech, an interim transcript per
+    word at `words_per_second`, then the final transcript and end of speech.
+    Use it with turn_detection="stt".
+    """
+
+    def __init__(self, words_per_second: float = 3.0):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self.words_per_second = words_per_second
+        self._stream: Optional[_ScriptedSTTStream] = None
+        self._stream_ready = asyncio.Event()
+
+    async def _recognize_impl(self, buffer, *, language: NotGivenOr[str] = NOT_GIVEN,
+                              conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> stt.SpeechEvent:
+        # Transcripts come from the caller script through `speak`, never from audio
+        raise APIError("ScriptedSTT is streaming-only; transcribe through stream() and speak()",
+                       retryable=False)
+
+    def stream(self, *, language: NotGivenOr[str] = NOT_GIVEN,
+               conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> stt.RecognizeStream:
+        self._stream = _ScriptedSTTStream(stt=self, conn_options=conn_options)
+        self._stream_ready.set()
+        return self._stream
+
+    async def speak(self, text: str) -> float:
+        """Say `text` word by word; returns the perf_counter time speech ended"""
+        await self._stream_ready.wait()
+        stream = self._stream
+        stream.send(stt.SpeechEventType.START_OF_SPEECH)
+        words = text.split()
+        for i in range(1, len(words) + 1):
+            await asyncio.sleep(1 / self.words_per_second)
+            stream.send(stt.SpeechEventType.INTERIM_TRANSCRIPT, " ".join(words[:i]))
+        stream.send(stt.SpeechEventType.FINAL_TRANSCRIPT, text)
+        ended = time.perf_counter()
+        stream.send(stt.SpeechEventType.END_OF_SPEECH)
+        return ended
+
+
+class CannedSTT(stt.STT):
+    """Batch STT that hears `text` in every buffer, after `latency` seconds"""
+
+    def __init__(self, text: str = "What are your hours?", latency: Latency = 0.3, fail: bool = False,
+                 provider: str = "offline"):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self.text = text
+        self.latency = latency
+        self.fail = fail
+        self._provider = provider
+
+    @property
+    def model(self) -> str:
+        return "canned"
+
+    @property
+    def provider(self) -> str:
+        return self._provider
+
+    async def _recognize_impl(self, buffer, *, language: NotGivenOr[str] = NOT_GIVEN,
+                              conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> stt.SpeechEvent:
+        await _respond_after(self.latency, self.fail, self._provider)
+        return stt.SpeechEvent(type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                               alternatives=[stt.SpeechData(language="en", text=self.text, confidence=1.0)])
+
+
+class _RuleBasedStream(llm.LLMStream):
+    async def _run(self):
+        reply, tool_call = self._llm.respond(self._chat_ctx, self._tools)
+        request_id = utils.shortuuid()
+        await _respond_after(self._llm.ttft, self._llm.fail, self._llm.provider)
+        if tool_call is not None:
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id, delta=llm.ChoiceDelta(role="assistant", tool_calls=[tool_call])
+            ))
+            tokens = 1
+        else:
+            words = reply.split()
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(1 / self._llm.tokens_per_second)
+                self._event_ch.send_nowait(llm.ChatChunk(
+                    id=request_id, delta=llm.ChoiceDelta(role="assistant", content=f"{word} ")
+                ))
+            tokens = len(words)
+        prompt_tokens = sum(len((item.text_content or "").split()) for item in self._chat_ctx.items
+                            if isinstance(item, ChatMessage))
+        self._event_ch.send_nowait(llm.ChatChunk(id=request_id, usage=llm.CompletionUsage(
+            completion_tokens=tokens, prompt_tokens=prompt_tokens, total_tokens=tokens + prompt_tokens
+        )))
+
+
+class RuleBasedLLM(llm.LLM):
+    """Deterministic LLM: escalates service questions through request_help and
+    answers everything else, including tool results, with a fixed line.
+    Like the real model, it answers directly when the turn carries context
+    injected by the agent (a system message after the last reply)."""
+
+    def __init__(self, ttft: Latency = 0.3, tokens_per_second: float = 80.0, classifier=QuestionClassifier,
+                 fail: bool = False, provider: str = "offline"):
+        super().__init__()
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.classifier = classifier
+        self.fail = fail
+        self._provider = provider
+
+    @property
+    def model(self) -> str:
+        return "rule-based"
+
+    @property
+    def provider(self) -> str:
+        return self._provider
+
+    def chat(self, *, chat_ctx: ChatContext, tools: Optional[list] = None,
+             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+             parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN, tool_choice=NOT_GIVEN,
+             extra_kwargs=NOT_GIVEN) -> llm.LLMStream:
+        return _RuleBasedStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+    def respond(self, chat_ctx: ChatContext, tools: list):
+        """(reply text, tool call) for the conversation so far"""
+        last = chat_ctx.items[-1] if chat_ctx.items else None
+        if last is not None and last.type == "function_call_output":
+            return last.output or DEFAULT_REPLY, None
+        if isinstance(last, ChatMessage) and last.role == "user":
+            question = last.text_content or ""
+            tool_names = {get_function_info(t).name for t in tools if is_function_tool(t)}
+            if ("request_help" in tool_names and not self._has_injected_context(chat_ctx)
+                    and self.classifier.classify(question).is_service):
+                return "", llm.FunctionToolCall(
+                    name="request_help", arguments=json.dumps({"question": question}),
+                    call_id=utils.shortuuid("call_"),
+                )
+        return DEFAULT_REPLY, None
+
+    @staticmethod
+    def _has_injected_context(chat_ctx: ChatContext) -> bool:
+        # The first item is the agent's instructions
+        for item in reversed(chat_ctx.items[1:]):
+            if isinstance(item, ChatMessage):
+                if item.role == "system":
+                    return True
+                if item.role == "assistant":
+                    return False
+        return False
+
+
+class _ToneStream(tts.SynthesizeStream):
+    async def _run(self, output_emitter: tts.AudioEmitter):
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._tts.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        started = False
+        async for data in self._input_ch:
+            if isinstance(data, self._FlushSentinel) or not data:
+                continue
+            if not started:
+                self._mark_started()
+                await _respond_after(self._tts.ttfb, self._tts.fail, self._tts.provider)
+                started = True
+            output_emitter.push(self._tts.tone(len(data) / self._tts.chars_per_second))
+        output_emitter.end_segment()
+
+
+class _ToneChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter):
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._tts.sample_rate,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        await _respond_after(self._tts.ttfb, self._tts.fail, self._tts.provider)
+        output_emitter.push(self._tts.tone(len(self._input_text) / self._tts.chars_per_second))
+        output_emitter.flush()
+
+
+class ToneTTS(tts.TTS):
+    """Streaming TTS that speaks a sine tone, `chars_per_second` of text per second
+    of audio, with `ttfb` seconds before the first audio of each utterance"""
+
+    def __init__(self, sample_rate: int = 24000, ttfb: Latency = 0.15, chars_per_second: float = 15.0,
+                 frequency: float = 220.0, fail: bool = False, provider: str = "offline"):
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=True), sample_rate=sample_rate,
+                         num_channels=1)
+        self.ttfb = ttfb
+        self.chars_per_second = chars_per_second
+        self.fail = fail
+        self._provider = provider
+        t = np.arange(sample_rate) / sample_rate
+        self._second = (np.sin(2 * np.pi * frequency * t) * 3000).astype(np.int16)
+
+    def tone(self, seconds: float) -> bytes:
+        """`seconds` of tone as 16-bit mono PCM"""
+        samples = max(1, int(seconds * self.sample_rate))
+        return np.resize(self._second, samples).tobytes()
+
+    @property
+    def model(self) -> str:
+        return "tone"
+
+    @property
+    def provider(self) -> str:
+        return self._provider
+
+    def synthesize(self, text: str, *,
+                   conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> tts.ChunkedStream:
+        return _ToneChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> tts.SynthesizeStream:
+        return _ToneStream(tts=self, conn_options=conn_options)
+
+
+class SilenceInput(io.AudioInput):
+    """Microphone stand-in producing silent frames in real time"""
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20):
+        super().__init__(label="SilenceInput")
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self._samples = sample_rate * frame_ms // 1000
+        self._silence = bytes(self._samples * 2)
+        self._next_frame_at: Optional[float] = None
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        now = time.monotonic()
+        if self._next_frame_at is None or self._next_frame_at < now - 1:
+            self._next_frame_at = now
+        self._next_frame_at += self.frame_ms / 1000
+        await asyncio.sleep(max(0.0, self._next_frame_at - now))
+        return rtc.AudioFrame(self._silence, self.sample_rate, 1, self._samples)
+
+
+class PacedAudioOutput(io.AudioOutput):
+    """Speaker stand-in: audio plays out in real time from its first frame.
+
+    `on_audio_start(t)` is called with the perf_counter time of the first frame
+    of every utterance, which is when the caller would start hearing it.
+    """
+
+    def __init__(self, sample_rate: int = 24000, on_audio_start: Optional[Callable[[float], None]] = None):
+        super().__init__(label="PacedAudioOutput", capabilities=io.AudioOutputCapabilities(pause=False),
+                         sample_rate=sample_rate)
+        self.on_audio_start = on_audio_start
+        self.audio_starts: List[float] = []
+        self._pushed_duration = 0.0
+        self._capture_start = 0.0
+        self._playout: Optional[asyncio.Task] = None
+        self._interrupted = asyncio.Event()
+
+    async def capture_frame(self, frame: rtc.AudioFrame):
+        await super().capture_frame(frame)
+        if self._playout is not None and not self._playout.done():
+            await self._playout
+        if not self._pushed_duration:
+            self._capture_start = time.perf_counter()
+            self.audio_starts.append(self._capture_start)
+            if self.on_audio_start is not None:
+                self.on_audio_start(self._capture_start)
+        self._pushed_duration += frame.duration
+
+    def flush(self):
+        super().flush()
+        if self._pushed_duration:
+            self._playout = asyncio.create_task(self._play_out())
+
+    def clear_buffer(self):
+        if self._pushed_duration:
+            self._interrupted.set()
+
+    async def _play_out(self):
+        remaining = self._capture_start + self._pushed_duration - time.perf_counter()
+        interrupted = False
+        if remaining > 0:
+            try:
+                await asyncio.wait_for(self._interrupted.wait(), remaining)
+                interrupted = True
+            except asyncio.TimeoutError:
+                pass
+        played = self._pushed_duration
+        if interrupted:
+            played = min(time.perf_counter() - self._capture_start, self._pushed_duration)
+        self._pushed_duration = 0.0
+        self._interrupted.clear()
+        self.on_playback_finished(playback_position=played, interrupted=interrupted)
@@ -0,0 +1,175 @@
+"""
+Pipeline Metrics - Prometheus latency histograms for the voice pipeline
+
+Per-stage latency (STT, LLM time to first token, TTS time to first byte,
+end-of-utterance delay and function tool calls) labelled by agent, served in
+Prometheus text format on the worker at /metrics, with provider attempts and
+their first-response time when provider_failover.py is in use:
+
+    METRICS_PORT=9100 python src/agent.py start
+
+Jobs run in their own processes, so observations use prometheus_client's
+multiprocess mode: every job process writes its samples to files under
+PROMETHEUS_MULTIPROC_DIR, and the worker's scrape endpoint adds them up.
+`start_metrics_server` sets that directory up; it must run in the worker
+before any job process starts. p50/p95/p99 come from the buckets, e.g.
+histogram_quantile(0.95, sum by (le) (rate(voice_llm_ttft_seconds_bucket[5m]))).
+
+Each session's own latencies are also kept for its usage record
+(Database.add_session_usage), see `PipelineMetrics.session_usage`. The room
+is only recorded there: as a Prometheus label it would add series for every
+call without bound.
+"""
+
+import glob
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from livekit.agents import metrics
+from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess, start_http_server
+
+from database import SessionUsage, add_latency_sample
+
+logger = logging.getLogger("pipeline_metrics")
+
+# Stage latencies sit between tens of milliseconds and a few seconds
+STAGE_BUCKETS = (0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+# Tools are expected to return well inside the LLM's own TTFT
+TOOL_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Kept off prometheus_client's default registry, which the worker exposes with
+# its own metrics when WorkerOptions.prometheus_port is set
+REGISTRY = CollectorRegistry()
+
+STT_DURATION = Histogram(
+    "voice_stt_duration_seconds", "STT request duration", ["agent"],
+    buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+LLM_TTFT = Histogram(
+    "voice_llm_ttft_seconds", "LLM time to first token", ["agent", "model"],
+    buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+LLM_ROUTES = Counter(
+    "voice_llm_routes", "LLM completions by route (see llm_router.py) and reason", ["agent", "route", "reason"],
+    registry=REGISTRY,
+)
+TTS_TTFB = Histogram(
+    "voice_tts_ttfb_seconds", "TTS time to first audio byte", ["agent"],
+    buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+END_OF_UTTERANCE_DELAY = Histogram(
+    "voice_end_of_utterance_delay_seconds", "End of user speech to end of turn decision", ["agent"],
+    buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+TRANSCRIPTION_DELAY = Histogram(
+    "voice_transcription_delay_seconds", "End of user speech to final transcript", ["agent"],
+    buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+TOOL_CALL_DURATION = Histogram(
+    "voice_tool_call_seconds", "Function tool call duration", ["agent", "tool"],
+    buckets=TOOL_BUCKETS, registry=REGISTRY,
+)
+PROVIDER_ATTEMPTS = Counter(
+    "voice_provider_attempts", "STT, LLM and TTS provider attempts by outcome (see provider_failover.py)",
+    ["agent", "service", "provider", "outcome"], registry=REGISTRY,
+)
+PROVIDER_FIRST_RESPONSE = Histogram(
+    "voice_provider_first_response_seconds", "Provider time to first transcript, token or audio, of attempts used",
+    ["agent", "service", "provider"], buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+
+
+class PipelineMetrics:
+    """Records one session's pipeline metrics under its agent label, and its
+    room in the session's usage record"""
+
+    def __init__(self, room: str, agent: str):
+        self.room = room
+        self.agent = agent
+        self.started_at = datetime.now()
+        self.turns = 0
+        # Per-stage histograms of this session alone, for its usage record
+        self.latency: Dict[str, Dict[str, Any]] = {}
+
+    def observe(self, event: metrics.AgentMetrics):
+        """Record a MetricsCollectedEvent's metrics"""
+        if isinstance(event, metrics.STTMetrics):
+            # Streaming STT reports no per-request duration
+            if not event.streamed:
+                self._observe("stt", STT_DURATION, event.duration)
+        elif isinstance(event, metrics.LLMMetrics):
+            if not event.cancelled and event.ttft >= 0:
+                # Labelled by model, so each route of a RoutingLLM shows separately
+                model = event.metadata.model_name if event.metadata and event.metadata.model_name else event.label
+                self._observe("llm_ttft", LLM_TTFT, event.ttft, model=model)
+        elif isinstance(event, metrics.TTSMetrics):
+            if not event.cancelled and event.ttfb >= 0:
+                self._observe("tts_ttfb", TTS_TTFB, event.ttfb)
+        elif isinstance(event, metrics.EOUMetrics):
+            # One per completed user turn
+            self.turns += 1
+            self._observe("end_of_utterance", END_OF_UTTERANCE_DELAY, event.end_of_utterance_delay)
+            self._observe("transcription", TRANSCRIPTION_DELAY, event.transcription_delay)
+
+    def observe_tool_call(self, tool: str, seconds: float):
+        TOOL_CALL_DURATION.labels(agent=self.agent, tool=tool).observe(seconds)
+        add_latency_sample(self.latency, f"tool:{tool}", seconds * 1000)
+
+    def observe_llm_route(self, decision):
+        """Count a RoutingLLM decision"""
+        LLM_ROUTES.labels(agent=self.agent, route=decision.route, reason=decision.reason).inc()
+
+    def observe_provider_attempt(self, service: str, provider: str, outcome: str, seconds: float):
+        """Count a ProviderPool attempt, and time the ones whose response was used"""
+        PROVIDER_ATTEMPTS.labels(agent=self.agent, service=service, provider=provider,
+                                 outcome=outcome).inc()
+        if outcome == "won":
+            PROVIDER_FIRST_RESPONSE.labels(agent=self.agent, service=service,
+                                           provider=provider).observe(seconds)
+
+    def _observe(self, stage: str, histogram: Histogram, seconds: float, **labels: str):
+        histogram.labels(agent=self.agent, **labels).observe(seconds)
+        add_latency_sample(self.latency, stage, seconds * 1000)
+
+    def session_usage(self, usage: metrics.UsageSummary, escalations: int = 0) -> SessionUsage:
+        """The session's usage record, ending now"""
+        return SessionUsage(
+            id=str(uuid.uuid4()),
+            room=self.room,
+            started_at=self.started_at,
+            ended_at=datetime.now(),
+            llm_prompt_tokens=usage.llm_prompt_tokens,
+            llm_cached_tokens=usage.llm_prompt_cached_tokens,
+            llm_completion_tokens=usage.llm_completion_tokens,
+            stt_audio_seconds=usage.stt_audio_duration,
+            tts_characters=usage.tts_characters_count,
+            tts_audio_seconds=usage.tts_audio_duration,
+            turns=self.turns,
+            escalations=escalations,
+            latency=self.latency,
+        )
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0", multiprocess_dir: Optional[str] = None):
+    """Serve /metrics for this worker and the job processes it starts.
+
+    Uses `multiprocess_dir`, else PROMETHEUS_MULTIPROC_DIR, else a new temporary
+    directory, and exports it so job processes write their samples there.
+    Samples left over from an earlier run are removed. Returns the HTTP
+    server and its thread.
+    """
+    path = multiprocess_dir or os.getenv("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="voice-metrics-")
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    server, thread = start_http_server(port, addr=addr, registry=registry)
+    logger.info(f"Serving pipeline metrics on {addr}:{port}/metrics (samples in {path})")
+    return server, thread
@@ -0,0 +1,519 @@
+"""
+Provider Failover - Latency-aware failover and hedged requests across STT,
+LLM and TTS providers
+
+Each service gets its providers in order of preference, e.g. ElevenLabs then
+OpenAI for TTS. Every request records how long the provider took to its first
+response (final transcript, first token, first audio) and whether it failed,
+over a rolling window per provider:
+
+    failover  a provider whose error rate or p95 goes over its limit is
+              skipped for `cooldown` seconds; requests go to the next one.
+              A request whose provider fails before responding moves on to
+              the next provider.
+    hedging   when a request's provider hasn't responded by its p95 (or
+              `hedge_after` until enough samples exist), the same request is
+              also sent to the next provider and the first response wins;
+              the other request is cancelled
+
+A request is never switched once its response has started. While providers
+are healthy hedging sends about 1 request in 20 twice, which costs tokens and
+characters but keeps a slow provider out of the caller's ear.
+
+The wrappers report metrics as one service: TTFT and TTFB include any hedge
+delay, as the caller hears it. Per-provider latency and outcomes are in
+`stats()` and `on_outcome`.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from livekit import rtc
+from livekit.agents import APIConnectionError, APIConnectOptions, APIError, llm, stt, tts, utils
+from livekit.agents.llm.fallback_adapter import DEFAULT_FALLBACK_API_CONNECT_OPTIONS
+from livekit.agents.llm import ChatContext
+from livekit.agents.types import NOT_GIVEN, USERDATA_TIMED_TRANSCRIPT, NotGivenOr
+
+logger = logging.getLogger("provider_failover")
+
+OUTCOMES = ("won", "failed", "cancelled", "hedged")
+
+
+def provider_name(instance) -> str:
+    """`provider/model` of an STT, LLM or TTS instance"""
+    return f"{instance.provider}/{instance.model}"
+
+
+class ProviderHealth:
+    """Rolling first-response latency and error rate of one provider"""
+
+    def __init__(self, name: str, window: int = 50):
+        self.name = name
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.counts: Counter = Counter()
+        self.degraded_until = 0.0
+        # After a cooldown the next outcome decides alone
+        self.probation = False
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        if len(self.latencies) < max(1, min_samples):
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def degraded(self, now: float) -> bool:
+        if self.degraded_until and now >= self.degraded_until:
+            # Back in rotation with a fresh window
+            self.degraded_until = 0.0
+            self.latencies.clear()
+            self.outcomes.clear()
+            self.probation = True
+            logger.info(f"Provider {self.name} back in rotation after cooldown")
+        return bool(self.degraded_until)
+
+
+class ProviderPool:
+    """Orders, races and keeps score of the providers of one service.
+
+    A provider is degraded when at least `min_samples` recent requests went
+    to it and either more than `max_error_rate` of them failed or their p95
+    is above `max_p95` seconds. Degraded providers are only used when the
+    others have failed, until `cooldown` has passed. With `hedge` on, a
+    request is also sent to the next provider when the first hasn't
+    responded after its p95 first-response time (`hedge_after` seconds
+    until it has `min_samples`). `on_outcome(provider, outcome, seconds)`,
+    when set, sees every attempt, see OUTCOMES.
+    """
+
+    def __init__(self, service: str, names: List[str], hedge: bool = True, hedge_after: Optional[float] = 2.0,
+                 window: int = 50, min_samples: int = 10, max_error_rate: float = 0.5,
+                 max_p95: Optional[float] = None, cooldown: float = 30.0,
+                 on_outcome: Optional[Callable[[str, str, float], None]] = None):
+        if not names:
+            raise ValueError(f"{service} needs at least one provider")
+        self.service = service
+        self.health = [ProviderHealth(name, window) for name in names]
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.max_p95 = max_p95
+        self.cooldown = cooldown
+        self.on_outcome = on_outcome
+        self._requests: Counter = Counter()
+
+    def candidates(self) -> List[int]:
+        """Provider indexes in the order a request tries them: healthy ones by
+        preference, then degraded ones"""
+        now = time.monotonic()
+        degraded = [health.degraded(now) for health in self.health]
+        return sorted(range(len(self.health)), key=lambda i: (degraded[i], i))
+
+    def hedge_delay(self, index: int) -> Optional[float]:
+        """Seconds to wait on provider `index` before hedging, None for never"""
+        if not self.hedge:
+            return None
+        p95 = self.health[index].percentile(95, self.min_samples)
+        return p95 if p95 is not None else self.hedge_after
+
+    async def race(self, first_response: Callable[[int], Awaitable[Any]],
+                   discard: Optional[Callable[[Any], Awaitable[None]]] = None) -> Tuple[int, Any]:
+        """Run `first_response(index)` on providers until one returns, hedging
+        and failing over as configured. Returns (provider index, result).
+
+        `first_response` should clean up after itself when cancelled; results
+        that lose a tie are passed to `discard`. Raises APIConnectionError
+        when every provider has failed.
+        """
+        order = self.candidates()
+        pending: Dict[asyncio.Task, Tuple[int, float]] = {}
+        errors: List[str] = []
+        self._requests["requests"] += 1
+
+        def launch(hedged: bool):
+            index = order.pop(0)
+            if hedged:
+                self._record(index, "hedged")
+            task = asyncio.create_task(first_response(index))
+            pending[task] = (index, time.perf_counter())
+
+        primary = order[0]
+        launch(hedged=False)
+        hedged_request = False
+        winner = None
+        try:
+            while pending:
+                timeout = None
+                if order:
+                    newest, started = list(pending.values())[-1]
+                    delay = self.hedge_delay(newest)
+                    if delay is not None:
+                        timeout = max(0.0, started + delay - time.perf_counter())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged_request = True
+                    launch(hedged=True)
+                    continue
+
+                for task in done:
+                    index, started = pending.pop(task)
+                    elapsed = time.perf_counter() - started
+                    if task.exception() is not None:
+                        errors.append(f"{self.health[index].name}: {task.exception()}")
+                        logger.warning(f"{self.service} provider {self.health[index].name} failed: "
+                                       f"{str(task.exception())}")
+                        self._record(index, "failed", elapsed)
+                    elif winner is None:
+                        winner = (index, task.result())
+                        self._record(index, "won", elapsed)
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    if hedged_request:
+                        self._requests["hedged"] += 1
+                        if winner[0] != primary:
+                            self._requests["hedge_won"] += 1
+                    return winner
+                if not pending and order:
+                    self._requests["failed_over"] += 1
+                    launch(hedged=False)
+        finally:
+            if pending:
+                now = time.perf_counter()
+                for task, (index, started) in pending.items():
+                    # Only an attempt beaten by another says something about
+                    # its latency; the whole request may just be interrupted
+                    self._record(index, "cancelled", now - started, beaten=winner is not None)
+                await utils.aio.cancel_and_wait(*pending)
+
+        self._requests["failed"] += 1
+        raise APIConnectionError(f"all {self.service} providers failed: {'; '.join(errors)}")
+
+    def _record(self, index: int, outcome: str, seconds: float = 0.0, beaten: bool = False):
+        health = self.health[index]
+        health.counts[outcome] += 1
+        if outcome == "won":
+            health.latencies.append(seconds)
+            health.outcomes.append(True)
+            health.probation = False
+        elif outcome == "failed":
+            health.outcomes.append(False)
+        elif outcome == "cancelled" and beaten:
+            # It would have taken at least this long, which only says
+            # something once that's past its usual p95
+            p95 = health.percentile(95, self.min_samples)
+            if p95 is not None and seconds > p95:
+                health.latencies.append(seconds)
+        if self.on_outcome is not None:
+            self.on_outcome(health.name, outcome, seconds)
+        if outcome in ("won", "failed", "cancelled"):
+            self._check_health(health, failed=outcome == "failed")
+
+    def _check_health(self, health: ProviderHealth, failed: bool):
+        if health.degraded_until:
+            return
+        reason = None
+        if failed and health.probation:
+            reason = "failed again after cooldown"
+        elif len(health.outcomes) >= self.min_samples and health.error_rate() > self.max_error_rate:
+            reason = f"error rate {health.error_rate():.0%}"
+        elif self.max_p95 is not None:
+            p95 = health.percentile(95, self.min_samples)
+            if p95 is not None and p95 > self.max_p95:
+                reason = f"p95 {p95 * 1000:.0f}ms"
+        if reason is None:
+            return
+        health.probation = False
+        if sum(1 for other in self.health if not other.degraded_until) <= 1:
+            # Never degrade the last provider standing, it's all there is
+            return
+        health.degraded_until = time.monotonic() + self.cooldown
+        logger.warning(f"{self.service} provider {health.name} degraded ({reason}), "
+                       f"skipping it for {self.cooldown:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests hedged, failed over and failed, and each provider's
+        outcomes, p50/p95 first-response time and error rate"""
+        providers = {}
+        for health in self.health:
+            p50, p95 = health.percentile(50), health.percentile(95)
+            providers[health.name] = {
+                **{outcome: health.counts[outcome] for outcome in OUTCOMES},
+                "p50_ms": p50 * 1000 if p50 is not None else None,
+                "p95_ms": p95 * 1000 if p95 is not None else None,
+                "error_rate": health.error_rate(),
+                "degraded": bool(health.degraded_until),
+            }
+        return {
+            **{key: self._requests[key] for key in ("requests", "hedged", "hedge_won", "failed_over", "failed")},
+            "providers": providers,
+        }
+
+
+def _attempt_options(conn_options: APIConnectOptions) -> APIConnectOptions:
+    # Retrying one provider would hold the request back from the next one
+    return dataclasses.replace(conn_options, max_retry=0)
+
+
+class _FailoverLLMStream(llm.LLMStream):
+    def __init__(self, llm_: "FailoverLLM", *, chat_ctx: ChatContext, tools: list,
+                 conn_options: APIConnectOptions, chat_kwargs: Dict[str, Any]):
+        super().__init__(llm_, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._chat_kwargs = chat_kwargs
+
+    async def _first_chunk(self, index: int):
+        stream = self._llm.providers[index].chat(chat_ctx=self._chat_ctx, tools=self._tools,
+                                                 conn_options=_attempt_options(self._conn_options),
+                                                 **self._chat_kwargs)
+        try:
+            async for chunk in stream:
+                return stream, chunk
+        except BaseException:
+            await stream.aclose()
+            raise
+        return stream, None
+
+    async def _run(self):
+        _, (stream, chunk) = await self._llm.pool.race(self._first_chunk, discard=lambda result: result[0].aclose())
+        async with stream:
+            if chunk is not None:
+                self._event_ch.send_nowait(chunk)
+                async for chunk in stream:
+                    self._event_ch.send_nowait(chunk)
+
+
+class FailoverLLM(llm.LLM):
+    """LLM over several providers, see ProviderPool for the options"""
+
+    def __init__(self, providers: List[llm.LLM], **pool_options):
+        super().__init__()
+        self.providers = providers
+        self.pool = ProviderPool("llm", [provider_name(p) for p in providers], **pool_options)
+
+    @property
+    def model(self) -> str:
+        return f"FailoverLLM({', '.join(p.model for p in self.providers)})"
+
+    def chat(self, *, chat_ctx: ChatContext, tools: Optional[list] = None,
+             conn_options: APIConnectOptions = DEFAULT_FALLBACK_API_CONNECT_OPTIONS,
+             parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN, tool_choice=NOT_GIVEN,
+             extra_kwargs=NOT_GIVEN) -> llm.LLMStream:
+        return _FailoverLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options,
+                                  chat_kwargs={"parallel_tool_calls": parallel_tool_calls,
+                                               "tool_choice": tool_choice, "extra_kwargs": extra_kwargs})
+
+    def prewarm(self):
+        # A hedge is only quick if the next provider's connection is warm too
+        for provider in self.providers:
+            provider.prewarm()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
+
+
+class FailoverSTT(stt.STT):
+    """Non-streaming STT over several providers, see ProviderPool for the
+    options. AgentSession runs it behind its VAD like any batch STT."""
+
+    def __init__(self, providers: List[stt.STT], **pool_options):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self.providers = providers
+        self.pool = ProviderPool("stt", [provider_name(p) for p in providers], **pool_options)
+
+    @property
+    def model(self) -> str:
+        return f"FailoverSTT({', '.join(p.model for p in self.providers)})"
+
+    async def _recognize_impl(self, buffer, *, language: NotGivenOr[str] = NOT_GIVEN,
+                              conn_options: APIConnectOptions = DEFAULT_FALLBACK_API_CONNECT_OPTIONS) -> stt.SpeechEvent:
+        async def recognize(index: int) -> stt.SpeechEvent:
+            return await self.providers[index].recognize(buffer, language=language,
+                                                         conn_options=_attempt_options(conn_options))
+
+        _, event = await self.pool.race(recognize)
+        return event
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
+
+
+class _AudioForwarder:
+    """Pushes a provider's audio to the output, at the output's sample rate"""
+
+    def __init__(self, output_emitter: tts.AudioEmitter, input_rate: int, output_rate: int):
+        self.output_emitter = output_emitter
+        self.resampler = rtc.AudioResampler(input_rate, output_rate) if input_rate != output_rate else None
+
+    def push(self, audio: tts.SynthesizedAudio):
+        if texts := audio.frame.userdata.get(USERDATA_TIMED_TRANSCRIPT):
+            self.output_emitter.push_timed_transcript(texts)
+        frames = self.resampler.push(audio.frame) if self.resampler is not None else [audio.frame]
+        for frame in frames:
+            self.output_emitter.push(frame.data.tobytes())
+
+    def flush(self):
+        if self.resampler is not None:
+            for frame in self.resampler.flush():
+                self.output_emitter.push(frame.data.tobytes())
+
+
+async def _first_audio(stream, name: str):
+    # The provider's stream with its first audio, or closed on failure
+    try:
+        async for audio in stream:
+            return stream, audio
+        raise APIError(f"{name} returned no audio")
+    except BaseException:
+        await stream.aclose()
+        raise
+
+
+class _FailoverChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter):
+        output_emitter.initialize(request_id=utils.shortuuid(), sample_rate=self._tts.sample_rate,
+                                  num_channels=self._tts.num_channels, mime_type="audio/pcm")
+
+        async def synthesize(index: int):
+            provider = self._tts.providers[index]
+            stream = provider.synthesize(self._input_text, conn_options=_attempt_options(self._conn_options))
+            return await _first_audio(stream, provider_name(provider))
+
+        index, (stream, audio) = await self._tts.pool.race(synthesize, discard=lambda result: result[0].aclose())
+        forwarder = _AudioForwarder(output_emitter, self._tts.providers[index].sample_rate, self._tts.sample_rate)
+        async with stream:
+            forwarder.push(audio)
+            async for audio in stream:
+                forwarder.push(audio)
+        forwarder.flush()
+        output_emitter.flush()
+
+
+class _FailoverSynthesizeStream(tts.SynthesizeStream):
+    def __init__(self, *, tts: "FailoverTTS", conn_options: APIConnectOptions):
+        super().__init__(tts=tts, conn_options=conn_options)
+        # Text and flushes so far, replayed to a hedge or failover
+        self._pushed: list = []
+        self._input_ended = False
+        self._attempts: list = []
+
+    async def _forward_input(self, has_text: asyncio.Event):
+        async for data in self._input_ch:
+            self._pushed.append(data)
+            for stream in self._attempts:
+                self._push(stream, data)
+            if isinstance(data, str) and data:
+                has_text.set()
+        self._input_ended = True
+        for stream in self._attempts:
+            stream.end_input()
+        has_text.set()
+
+    def _push(self, stream: tts.SynthesizeStream, data):
+        if isinstance(data, self._FlushSentinel):
+            stream.flush()
+        else:
+            stream.push_text(data)
+
+    async def _synthesize(self, index: int):
+        stream = self._tts.streaming_provider(index).stream(conn_options=_attempt_options(self._conn_options))
+        for data in self._pushed:
+            self._push(stream, data)
+        if self._input_ended:
+            stream.end_input()
+        self._attempts.append(stream)
+        try:
+            return await _first_audio(stream, provider_name(self._tts.providers[index]))
+        except BaseException:
+            self._attempts.remove(stream)
+            raise
+
+    async def _discard(self, result):
+        stream, _ = result
+        self._attempts.remove(stream)
+        await stream.aclose()
+
+    async def _run(self, output_emitter: tts.AudioEmitter):
+        output_emitter.initialize(request_id=utils.shortuuid(), sample_rate=self._tts.sample_rate,
+                                  num_channels=self._tts.num_channels, mime_type="audio/pcm", stream=True)
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        has_text = asyncio.Event()
+        input_task = asyncio.create_task(self._forward_input(has_text))
+        try:
+            # Nothing to race for until there's text to speak
+            await has_text.wait()
+            if any(isinstance(data, str) and data for data in self._pushed):
+                self._mark_started()
+                index, (stream, audio) = await self._tts.pool.race(self._synthesize, discard=self._discard)
+                forwarder = _AudioForwarder(output_emitter, self._tts.providers[index].sample_rate,
+                                            self._tts.sample_rate)
+                async with stream:
+                    forwarder.push(audio)
+                    async for audio in stream:
+                        forwarder.push(audio)
+                forwarder.flush()
+        finally:
+            await utils.aio.cancel_and_wait(input_task)
+        output_emitter.end_segment()
+
+
+class FailoverTTS(tts.TTS):
+    """TTS over several providers, see ProviderPool for the options.
+
+    Audio comes out at the first provider's sample rate; the others are
+    resampled. When streaming, providers that can't stream speak sentence by
+    sentence (tts.StreamAdapter).
+    """
+
+    def __init__(self, providers: List[tts.TTS], **pool_options):
+        if len({p.num_channels for p in providers}) > 1:
+            raise ValueError("all TTS providers must have the same number of channels")
+        super().__init__(
+            capabilities=tts.TTSCapabilities(
+                streaming=any(p.capabilities.streaming for p in providers),
+                aligned_transcript=all(p.capabilities.aligned_transcript for p in providers),
+            ),
+            sample_rate=providers[0].sample_rate,
+            num_channels=providers[0].num_channels,
+        )
+        self.providers = providers
+        self.pool = ProviderPool("tts", [provider_name(p) for p in providers], **pool_options)
+        self._stream_adapters: Dict[int, tts.TTS] = {}
+
+    @property
+    def model(self) -> str:
+        return f"FailoverTTS({', '.join(p.model for p in self.providers)})"
+
+    def streaming_provider(self, index: int) -> tts.TTS:
+        provider = self.providers[index]
+        if provider.capabilities.streaming:
+            return provider
+        if index not in self._stream_adapters:
+            from livekit.agents import tokenize
+
+            self._stream_adapters[index] = tts.StreamAdapter(
+                tts=provider, sentence_tokenizer=tokenize.blingfire.SentenceTokenizer(retain_format=True)
+            )
+        return self._stream_adapters[index]
+
+    def synthesize(self, text: str, *,
+                   conn_options: APIConnectOptions = DEFAULT_FALLBACK_API_CONNECT_OPTIONS) -> tts.ChunkedStream:
+        return _FailoverChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *,
+               conn_options: APIConnectOptions = DEFAULT_FALLBACK_API_CONNECT_OPTIONS) -> tts.SynthesizeStream:
+        return _FailoverSynthesizeStream(tts=self, conn_options=conn_options)
+
+    def prewarm(self):
+        for provider in self.providers:
+            provider.prewarm()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
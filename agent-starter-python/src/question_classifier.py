@@ -2,6 +2,125 @@
 Question Classifier - Determines if a customer question is about services or just technical/conversational
 """
 
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Words (keeping inner apostrophes, so "what's" stays one token)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower().replace("’", "'"))
+
+
+class PhraseMatcher:
+    """Matches many phrase lists against an utterance in a single pass.
+
+    Phrases are compiled once into a trie keyed by whole words, so "hi" never
+    matches inside "which" and "ok" never matches inside "book". Matching walks
+    the trie from each word of the utterance, which costs
+    O(words x longest phrase) no matter how many phrases are registered.
+    """
+
+    def __init__(self, phrases_by_category: Dict[str, Iterable[str]]):
+        self._root: dict = {}
+        self._depth = 0
+        for category, phrases in phrases_by_category.items():
+            for phrase in phrases:
+                tokens = _tokenize(phrase)
+                if not tokens:
+                    continue
+                node = self._root
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                # The None key holds the categories of the phrase ending here
+                node[None] = node.get(None, frozenset()) | {category}
+                self._depth = max(self._depth, len(tokens))
+
+    def match(self, text: str) -> Dict[str, int]:
+        """Map every matched category to the word index of its first match"""
+        found: Dict[str, int] = {}
+        for start, _, categories in self.spans(_tokenize(text)):
+            for category in categories:
+                found.setdefault(category, start)
+        return found
+
+    def spans(self, tokens: List[str]) -> List[Tuple[int, int, FrozenSet[str]]]:
+        """Every phrase match in already tokenized text, as (start, end, categories)"""
+        found = []
+        for start in range(len(tokens)):
+            node = self._root
+            for end in range(start, min(len(tokens), start + self._depth)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if None in node:
+                    found.append((start, end + 1, node[None]))
+        return found
+
+    def stream(self) -> "PhraseStream":
+        """Incremental matcher for a transcript that grows word by word"""
+        return PhraseStream(self)
+
+
+class PhraseStream:
+    """PhraseMatcher state over a growing transcript, such as STT interim results.
+
+    Each new word advances the partial matches still open (at most the longest
+    phrase length of them), so an update costs O(new words) rather than a
+    rescan. A checkpoint is kept per word, so when the STT revises earlier
+    words the stream rewinds to the last word that is unchanged.
+    """
+
+    def __init__(self, matcher: PhraseMatcher):
+        self._root = matcher._root
+        self.tokens: List[str] = []
+        # (matches, open trie nodes with their start index) before each token
+        self._checkpoints: List[Tuple[Dict[str, int], Tuple[Tuple[int, dict], ...]]] = [({}, ())]
+
+    @property
+    def matches(self) -> Dict[str, int]:
+        return self._checkpoints[-1][0]
+
+    def update(self, text: str) -> Dict[str, int]:
+        """Feed the whole transcript so far; returns every match, as PhraseMatcher.match would"""
+        tokens = _tokenize(text)
+        common = 0
+        while common < min(len(tokens), len(self.tokens)) and tokens[common] == self.tokens[common]:
+            common += 1
+        del self.tokens[common:]
+        del self._checkpoints[common + 1:]
+
+        found, open_nodes = self._checkpoints[-1]
+        for token in tokens[common:]:
+            start_here = ((len(self.tokens), self._root),)
+            next_open = []
+            for start, node in open_nodes + start_here:
+                child = node.get(token)
+                if child is None:
+                    continue
+                for category in child.get(None, ()):
+                    if category not in found:
+                        found = {**found, category: start}
+                if len(child) > (None in child):
+                    next_open.append((start, child))
+            open_nodes = tuple(next_open)
+            self.tokens.append(token)
+            self._checkpoints.append((found, open_nodes))
+        return found
+
+
+@dataclass(frozen=True)
+class Classification:
+    """Result of classifying one utterance; `standard_response` is only set
+    when the whole utterance is small talk"""
+    question: str
+    is_service: bool
+    categories: FrozenSet[str]
+    standard_response: Optional[str] = None
+
+
 class QuestionClassifier:
     """Classifies customer questions to avoid unnecessary escalations"""
     
@@ -42,6 +161,164 @@ class QuestionClassifier:
         "maybe",
     ]
     
+    # Service question indicators
+    SERVICE_INDICATORS = [
+        "do you offer",
+        "how much",
+        "what is the price",
+        "what services",
+        "appointment",
+        "booking",
+        "schedule",
+        "available",
+        "hours",
+        "open",
+        "closed",
+        "location",
+        "address",
+        "phone",
+        "contact",
+        "cost",
+        "price",
+        "expensive",
+        "cheap",
+        "discount",
+        "special",
+        "package",
+        "treatment",
+        "procedure",
+        "facial",
+        "massage",
+        "wax",
+        "nail",
+        "hair",
+        "skin",
+        "makeup",
+        "spa",
+        "salon",
+        "botox",
+        "filler",
+        "laser",
+        "microblading",
+        "tattoo",
+        "piercing",
+    ]
+    
+    # Phrases that pick the standard response, checked in this order
+    STANDARD_RESPONSES = [
+        ("audio_check", ["can you hear", "are you there", "hello", "testing", "one two three"],
+         "Yes, I can hear you perfectly! How can I help you with Glow Beauty Salon today?"),
+        ("greeting", ["hi", "good morning", "good afternoon", "good evening"],
+         "Good day! Welcome to Glow Beauty Salon. How can I assist you?"),
+        ("thanks", ["thank", "thanks"],
+         "You're very welcome! Is there anything else I can help you with today?"),
+        ("goodbye", ["goodbye", "bye", "see you"],
+         "Thank you for calling Glow Beauty Salon! Have a wonderful day!"),
+    ]
+    
+    DEFAULT_RESPONSE = "I'm here to help! What would you like to know about Glow Beauty Salon?"
+    
+    # A standard response replaces the LLM only for short utterances made of
+    # STANDARD_RESPONSES phrases and these words alone, so "Hi, how much is a
+    # brow tint?" still gets an answer. Other conversational phrases never do:
+    # "yes" or "no" may answer the agent's own question, which only the LLM
+    # can follow up on.
+    SMALL_TALK_MAX_WORDS = 8
+    FILLER_WORDS = [
+        "um", "uh", "oh", "hey", "so", "very", "much", "well", "just", "please", "again", "now",
+        "there", "then", "and", "great", "cool", "me", "you", "it", "all", "a", "lot",
+    ]
+    
+    _matcher: Optional[PhraseMatcher] = None
+    
+    # Optional trained model (see intent_model.py) that replaces the keyword
+    # rules for the service/non-service decision
+    intent_model = None
+    
+    @classmethod
+    def compile(cls) -> PhraseMatcher:
+        """(Re)build the phrase matcher; call again after editing the phrase lists"""
+        phrases = {
+            "technical": cls.TECHNICAL_PHRASES,
+            "conversational": cls.CONVERSATIONAL_PHRASES,
+            "service": cls.SERVICE_INDICATORS,
+        }
+        for category, category_phrases, _ in cls.STANDARD_RESPONSES:
+            phrases[category] = category_phrases
+        cls._matcher = PhraseMatcher(phrases)
+        return cls._matcher
+    
+    @classmethod
+    def load_intent_model(cls, path: str):
+        """Use a trained intent model file for `is_service_question`"""
+        from intent_model import IntentModel
+        cls.intent_model = IntentModel.load(path)
+        return cls.intent_model
+    
+    @classmethod
+    def classify(cls, question: str) -> Classification:
+        """
+        Classify a question with one pass over its words
+        
+        Args:
+            question: The customer's question text
+            
+        Returns:
+            The matched categories, whether it is a service question, and the
+            standard response to use when it is not
+        """
+        return cls.classify_batch([question])[0]
+    
+    @classmethod
+    def classify_batch(cls, questions: Iterable[str]) -> List[Classification]:
+        """Classify many questions, e.g. a transcript or an evaluation set"""
+        questions = list(questions)
+        matcher = cls._matcher or cls.compile()
+        all_matches = [matcher.match(question) for question in questions]
+        if cls.intent_model is not None:
+            decisions = cls.intent_model.predict(questions)
+        else:
+            decisions = [cls._heuristic_is_service(q, m) for q, m in zip(questions, all_matches)]
+        
+        return [
+            Classification(question, bool(is_service), frozenset(matches),
+                           None if is_service or not cls.is_small_talk(question, matcher)
+                           else cls._standard_response(matches))
+            for question, matches, is_service in zip(questions, all_matches, decisions)
+        ]
+    
+    @classmethod
+    def is_small_talk(cls, question: str, matcher: Optional[PhraseMatcher] = None) -> bool:
+        """True when the utterance has a phrase with a standard response and
+        nothing is left once those phrases and filler words are taken out"""
+        matcher = matcher or cls._matcher or cls.compile()
+        tokens = _tokenize(question)
+        if not tokens or len(tokens) > cls.SMALL_TALK_MAX_WORDS:
+            return False
+        fillers = frozenset(cls.FILLER_WORDS)
+        answered = {category for category, _, _ in cls.STANDARD_RESPONSES}
+        covered = set()
+        for start, end, categories in matcher.spans(tokens):
+            if "service" in categories:
+                return False
+            if answered.intersection(categories):
+                covered.update(range(start, end))
+        return bool(covered) and all(i in covered or token in fillers for i, token in enumerate(tokens))
+    
+    @staticmethod
+    def _heuristic_is_service(question: str, matches: Dict[str, int]) -> bool:
+        # A greeting or audio check in front of a question doesn't make it small talk
+        if "service" in matches:
+            return True
+        # Technical/audio checks anywhere, or a conversational opener
+        if "technical" in matches or matches.get("conversational") == 0:
+            return False
+        # Very short without a question mark (likely not a real question)
+        if len(question.split()) < 3 and '?' not in question:
+            return False
+        # Service indicators, a longer question, or unsure: better to escalate than miss
+        return True
+    
     @staticmethod
     def is_service_question(question: str) -> bool:
         """
@@ -54,77 +331,7 @@ class QuestionClassifier:
             True if it's a service question that might need escalation
             False if it's just technical/conversational
         """
-        question_lower = question.lower().strip()
-        
-        # Check if it's a technical/audio check
-        for phrase in QuestionClassifier.TECHNICAL_PHRASES:
-            if phrase in question_lower:
-                return False
-        
-        # Check if it's just conversational
-        for phrase in QuestionClassifier.CONVERSATIONAL_PHRASES:
-            if question_lower == phrase or question_lower.startswith(phrase):
-                return False
-        
-        # Check if question is very short (likely not a real question)
-        words = question_lower.split()
-        if len(words) < 3 and '?' not in question:
-            return False
-        
-        # Service question indicators
-        service_indicators = [
-            "do you offer",
-            "how much",
-            "what is the price",
-            "what services",
-            "appointment",
-            "booking",
-            "schedule",
-            "available",
-            "hours",
-            "open",
-            "closed",
-            "location",
-            "address",
-            "phone",
-            "contact",
-            "cost",
-            "price",
-            "expensive",
-            "cheap",
-            "discount",
-            "special",
-            "package",
-            "treatment",
-            "procedure",
-            "facial",
-            "massage",
-            "wax",
-            "nail",
-            "hair",
-            "skin",
-            "makeup",
-            "spa",
-            "salon",
-            "botox",
-            "filler",
-            "laser",
-            "microblading",
-            "tattoo",
-            "piercing",
-        ]
-        
-        # If it contains service indicators, it's likely a service question
-        for indicator in service_indicators:
-            if indicator in question_lower:
-                return True
-        
-        # If it has a question mark and is longer than 3 words, probably a service question
-        if '?' in question and len(words) > 3:
-            return True
-        
-        # Default: if we're unsure, treat as service question (better to escalate than miss)
-        return True
+        return QuestionClassifier.classify(question).is_service
     
     @staticmethod
     def get_standard_response(question: str) -> str:
@@ -137,26 +344,43 @@ class QuestionClassifier:
         Returns:
             A friendly standard response
         """
-        question_lower = question.lower().strip()
-        
-        # Audio/technical checks
-        if any(phrase in question_lower for phrase in ["can you hear", "are you there", "hello", "testing"]):
-            return "Yes, I can hear you perfectly! How can I help you with Glow Beauty Salon today?"
-        
-        # Greetings
-        if any(phrase in question_lower for phrase in ["good morning", "good afternoon", "good evening"]):
-            return "Good day! Welcome to Glow Beauty Salon. How can I assist you?"
-        
-        # Thanks
-        if any(phrase in question_lower for phrase in ["thank", "thanks"]):
-            return "You're very welcome! Is there anything else I can help you with today?"
-        
-        # Goodbyes
-        if any(phrase in question_lower for phrase in ["goodbye", "bye", "see you"]):
-            return "Thank you for calling Glow Beauty Salon! Have a wonderful day!"
-        
-        # Default conversational response
-        return "I'm here to help! What would you like to know about Glow Beauty Salon?"
+        matcher = QuestionClassifier._matcher or QuestionClassifier.compile()
+        return QuestionClassifier._standard_response(matcher.match(question))
+    
+    @classmethod
+    def _standard_response(cls, matches: Dict[str, int]) -> str:
+        for category, _, response in cls.STANDARD_RESPONSES:
+            if category in matches:
+                return response
+        return cls.DEFAULT_RESPONSE
+
+
+class StreamingClassifier:
+    """Classifies a user turn while STT transcripts are still arriving.
+
+    `update` takes the transcript so far and returns a Classification while
+    all of it is small talk (see `QuestionClassifier.is_small_talk`), else
+    None. More words can still turn it into a question, so it is up to the
+    caller to act only once the utterance is over.
+    """
+
+    def __init__(self, classifier=QuestionClassifier):
+        self.classifier = classifier
+        self._stream = (classifier._matcher or classifier.compile()).stream()
+
+    def reset(self):
+        """Start a new turn"""
+        self._stream = (self.classifier._matcher or self.classifier.compile()).stream()
+
+    def update(self, transcript: str) -> Optional[Classification]:
+        """Feed the transcript so far; returns a decision while it is all small talk"""
+        matches = self._stream.update(transcript)
+        # The incremental matches rule most turns out without a rescan
+        if ("service" in matches or not matches
+                or len(self._stream.tokens) > self.classifier.SMALL_TALK_MAX_WORDS
+                or not self.classifier.is_small_talk(transcript)):
+            return None
+        return Classification(transcript, False, frozenset(matches), self.classifier._standard_response(matches))
 
 
 # Quick test function
@@ -0,0 +1,132 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from question_classifier import QuestionClassifier, StreamingClassifier
+
+logger = logging.getLogger("small_talk")
+
+class SmallTalkShortCircuit:
+    """Answers non-service utterances with a canned response instead of the LLM.
+
+    The agent asks `response_for` on each finished user turn; when the
+    classifier says the utterance is small talk ("can you hear me?", "thanks")
+    the standard response is spoken straight away and the LLM round trip is
+    skipped. Per-session counters compare the time spent short-circuiting with
+    the LLM time-to-first-token seen on turns that did go to the LLM, which is
+    the latency each short-circuited turn saved.
+
+    STT transcripts can also be fed in while the turn is still open with
+    `on_transcript`. When a final transcript arrives after the caller stopped
+    speaking and everything said so far is small talk, the response is
+    returned to be spoken right away instead of after end-of-turn detection.
+    Small talk is decided exactly as for finished turns, so answers such as
+    "yes" or "no" are never answered early.
+    The caller may still go on ("Hi, ... how much is a brow tint?"), so the
+    response must stay interruptible; the longer turn then no longer matches
+    in `end_turn` and goes to the LLM. Time to first audio (user stops speaking to agent starts
+    speaking) is tracked per kind of turn: "early", "short_circuit" and "llm".
+    """
+
+    def __init__(self, classifier=QuestionClassifier, respond_early: bool = True):
+        self.classifier = classifier
+        self.respond_early = respond_early
+        self.turns = 0
+        self.short_circuited = 0
+        self.short_circuit_seconds = 0.0
+        self.llm_turns = 0
+        self.llm_ttft_seconds = 0.0
+        self.early_responses = 0
+        self._stream = StreamingClassifier(classifier)
+        self._finals: List[str] = []
+        self._answered_early: Optional[str] = None
+        self.turn_text = ""
+        self._turn_kind: Optional[str] = None
+        self._user_stopped_at: Optional[float] = None
+        self._first_audio: Dict[str, List[float]] = defaultdict(list)
+
+    def response_for(self, transcript: str) -> Optional[str]:
+        """The standard response for a non-service utterance, otherwise None"""
+        if not transcript or not transcript.strip():
+            return None
+        return self.classifier.classify(transcript).standard_response
+
+    def on_transcript(self, transcript: str, is_final: bool, user_speaking: bool = False) -> Optional[str]:
+        """Feed an interim or final STT transcript of the open turn.
+
+        Returns the response to speak now when a final transcript, heard once
+        the user stopped speaking, leaves the turn entirely small talk. The
+        turn is then closed and counted as short circuited; `turn_text` holds
+        what the user said.
+        """
+        text = " ".join(self._finals + [transcript])
+        if is_final:
+            self._finals.append(transcript)
+        decision = self._stream.update(text)
+        if decision is None or not is_final or user_speaking or not self.respond_early:
+            return None
+        self.turn_text = " ".join(self._finals)
+        self._answered_early = " ".join(self.turn_text.split())
+        self._finals = []
+        self._stream.reset()
+        self.turns += 1
+        self.short_circuited += 1
+        self.early_responses += 1
+        self._turn_kind = "early"
+        return decision.standard_response
+
+    def end_turn(self, transcript: str) -> bool:
+        """Close the turn at end-of-turn; True if it was already answered early"""
+        answered = self._answered_early
+        self._answered_early = None
+        self._finals = []
+        self._stream.reset()
+        return answered is not None and answered == " ".join(transcript.split())
+
+    def record_turn(self, short_circuited: bool, elapsed: float = 0.0):
+        """Count a finished user turn and how long a short circuit took"""
+        self.turns += 1
+        if short_circuited:
+            self.short_circuited += 1
+            self.short_circuit_seconds += elapsed
+        if self._turn_kind != "early":
+            self._turn_kind = "short_circuit" if short_circuited else "llm"
+
+    def record_llm_ttft(self, ttft: float):
+        """Record the time to first token of an LLM completion"""
+        if ttft > 0:
+            self.llm_turns += 1
+            self.llm_ttft_seconds += ttft
+
+    def on_user_stopped_speaking(self, at: float):
+        self._user_stopped_at = at
+        self._turn_kind = None
+
+    def on_agent_started_speaking(self, at: float):
+        """Attribute time to first audio to the kind of turn that produced it"""
+        if self._user_stopped_at is None or self._turn_kind is None:
+            return
+        self._first_audio[self._turn_kind].append(at - self._user_stopped_at)
+        self._user_stopped_at = None
+
+    @property
+    def latency_saved(self) -> Optional[float]:
+        """Seconds saved across short-circuited turns, once an LLM TTFT has been seen"""
+        if not self.llm_turns:
+            return None
+        mean_ttft = self.llm_ttft_seconds / self.llm_turns
+        return max(0.0, self.short_circuited * mean_ttft - self.short_circuit_seconds)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Per-session counters for the usage log"""
+        return {
+            "turns": self.turns,
+            "short_circuited": self.short_circuited,
+            "early_responses": self.early_responses,
+            "mean_short_circuit_ms": (self.short_circuit_seconds / self.short_circuited * 1000
+                                      if self.short_circuited else None),
+            "mean_llm_ttft_ms": self.llm_ttft_seconds / self.llm_turns * 1000 if self.llm_turns else None,
+            "latency_saved_ms": self.latency_saved * 1000 if self.latency_saved is not None else None,
+            "mean_first_audio_ms": {kind: sum(delays) / len(delays) * 1000
+                                    for kind, delays in self._first_audio.items()},
+        }
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from answer_index import LearnedAnswerIndex
+from database import LearnedAnswer
+
+logger = logging.getLogger("speculative_lookup")
+
+MODES = ("off", "inject", "answer")
+
+
+class SpeculativeLookup:
+    """Searches learned answers while the caller is still speaking.
+
+    Every final STT transcript of the open turn starts a nearest-neighbour
+    search in the background, so by end of turn the result is usually ready.
+    Both the turn so far and its latest sentence are searched, since callers
+    often lead with a preamble ("Hi, quick question.").
+    A match at or above `threshold` (cosine similarity, stricter than the
+    index's own threshold) is a hit. Depending on `mode`, the agent then puts
+    the answer in the turn's chat context ("inject") or speaks it without the
+    LLM ("answer"). Either way the LLM -> check_learned_answers -> LLM round
+    trip is skipped.
+    """
+
+    def __init__(self, answer_index: LearnedAnswerIndex, mode: str = "inject", threshold: float = 0.8):
+        if mode not in MODES:
+            raise ValueError(f"Unknown speculative lookup mode: {mode!r}, expected one of {MODES}")
+        self.answer_index = answer_index
+        self.mode = mode
+        self.threshold = threshold
+        self.lookups = 0
+        self.hits = 0
+        self.wait_seconds = 0.0
+        self._finals: List[str] = []
+        self._text: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def on_transcript(self, transcript: str, is_final: bool):
+        """Start a search for the turn so far on each final transcript"""
+        if not self.enabled or not is_final or not transcript.strip():
+            return
+        self._finals.append(transcript)
+        self._text = " ".join(" ".join(self._finals).split())
+        if self._task is not None:
+            self._task.cancel()
+        self._task = asyncio.create_task(self._search(self._text, transcript))
+
+    async def _search(self, *texts: str) -> Optional[LearnedAnswer]:
+        best = None
+        for text in dict.fromkeys(" ".join(t.split()) for t in texts):
+            try:
+                answers = await self.answer_index.search(text, k=1)
+            except Exception as e:
+                logger.error(f"Speculative learned-answer lookup failed: {str(e)}")
+                return None
+            if answers and (best is None or answers[0].score > best.score):
+                best = answers[0]
+        return best if best is not None and best.score >= self.threshold else None
+
+    async def match(self, transcript: str) -> Optional[LearnedAnswer]:
+        """The learned answer for the finished turn, if confident enough.
+
+        Reuses the speculative search when it covered exactly this transcript,
+        otherwise searches now. Closes the turn.
+        """
+        text = " ".join(transcript.split())
+        task, searched, latest = self._task, self._text, self._finals[-1] if self._finals else text
+        self._finals, self._text, self._task = [], None, None
+        if not self.enabled or not text:
+            return None
+        start = time.perf_counter()
+        if task is not None and searched == text:
+            answer = await task
+        else:
+            if task is not None:
+                task.cancel()
+            answer = await self._search(text, latest)
+        self.lookups += 1
+        self.wait_seconds += time.perf_counter() - start
+        if answer is not None:
+            self.hits += 1
+        return answer
+
+    def reset(self):
+        """Drop the open turn, e.g. when it was answered as small talk"""
+        if self._task is not None:
+            self._task.cancel()
+        self._finals, self._text, self._task = [], None, None
+
+    def stats(self, mean_llm_ttft_ms: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """Per-session counters. Each hit skips at least one LLM completion, so
+        with the session's mean LLM time to first token the latency saved is
+        estimated as hits * mean TTFT."""
+        return {
+            "mode": self.mode,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else None,
+            # Time end of turn still waited on the search; ~0 when it ran ahead
+            "mean_wait_ms": self.wait_seconds / self.lookups * 1000 if self.lookups else None,
+            "latency_saved_ms": self.hits * mean_llm_ttft_ms if mean_llm_ttft_ms is not None else None,
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger("supervisor_alerts")
+
+
+@dataclass
+class SupervisorAlert:
+    request_id: str
+    question: str
+    customer_phone: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+async def print_alerts(alerts: List[SupervisorAlert]):
+    """Simulate supervisor notification (in a real deployment, a webhook or SMS)"""
+    print(f"\n{'='*50}")
+    for alert in alerts:
+        message = (f"🆘 SUPERVISOR ALERT: Need help answering customer question: '{alert.question}' "
+                   f"from {alert.customer_phone}. Request ID: {alert.request_id}")
+        print(f"SUPERVISOR NOTIFICATION: {message}")
+    print(f"{'='*50}\n")
+
+
+class SupervisorAlertDispatcher:
+    """Delivers supervisor alerts in the background, off the tool-call path.
+
+    `enqueue` only appends to an in-memory queue; the help request itself is
+    already committed, so an alert that is never delivered still shows on the
+    dashboard. A worker task sends alerts in batches of up to `max_batch`,
+    waiting at most `batch_interval` seconds for a batch to fill. A failed batch
+    is retried with exponential backoff, up to `max_attempts` per alert.
+    """
+
+    def __init__(self, send: Callable[[List[SupervisorAlert]], Awaitable[None]] = print_alerts,
+                 max_batch: int = 20, batch_interval: float = 0.2, max_attempts: int = 5,
+                 retry_delay: float = 0.5):
+        self.send = send
+        self.max_batch = max_batch
+        self.batch_interval = batch_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self._delivery_seconds = 0.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._outstanding = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._retry_handles: Set[asyncio.TimerHandle] = set()
+
+    def enqueue(self, alert: SupervisorAlert):
+        """Queue an alert for delivery; never blocks. Must be called on the event loop."""
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._idle = self._idle or asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+        self._outstanding += 1
+        self._idle.clear()
+        self._queue.put_nowait(alert)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._deliver(batch)
+
+    async def _deliver(self, batch: List[SupervisorAlert]):
+        try:
+            await self.send(batch)
+        except Exception as e:
+            logger.warning(f"Supervisor alert batch of {len(batch)} failed: {str(e)}")
+            for alert in batch:
+                alert.attempts += 1
+                if alert.attempts >= self.max_attempts:
+                    # The request stays pending on the dashboard
+                    logger.error(f"Giving up on supervisor alert for request {alert.request_id} "
+                                 f"after {alert.attempts} attempts")
+                    self.failed += 1
+                    self._done(1)
+                else:
+                    self.retries += 1
+                    self._schedule_retry(alert, self.retry_delay * 2 ** (alert.attempts - 1))
+            return
+        now = time.monotonic()
+        self.sent += len(batch)
+        self.batches += 1
+        self._delivery_seconds += sum(now - alert.enqueued_at for alert in batch)
+        self._done(len(batch))
+
+    def _schedule_retry(self, alert: SupervisorAlert, delay: float):
+        def retry():
+            self._retry_handles.discard(handle)
+            self._queue.put_nowait(alert)
+
+        handle = asyncio.get_running_loop().call_later(delay, retry)
+        self._retry_handles.add(handle)
+
+    def _done(self, count: int):
+        self._outstanding -= count
+        if self._outstanding == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued alert is delivered or given up on; False on timeout"""
+        if self._idle is None or self._outstanding == 0:
+            return True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def aclose(self, timeout: float = 5.0):
+        """Deliver what is queued, then stop the worker"""
+        if not await self.drain(timeout):
+            logger.warning(f"Dropped {self._outstanding} undelivered supervisor alert(s) at shutdown")
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "sent": self.sent,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+            "mean_delivery_ms": self._delivery_seconds / self.sent * 1000 if self.sent else None,
+        }
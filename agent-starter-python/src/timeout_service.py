@@ -1,30 +1,157 @@
 import asyncio
+import heapq
 import logging
+import time
 from datetime import datetime, timedelta
-from database import Database  
+from typing import Dict, List, Optional, Tuple
+from database import Database
 
 logger = logging.getLogger("timeout_service")
 
 class TimeoutService:
-    def __init__(self, database: Database, timeout_hours: int = 24):
+    """Expires pending help requests exactly at their deadline.
+
+    Deadlines live in an in-process min-heap that is rebuilt from the database on
+    startup. Requests created or resolved through the same Database are tracked
+    immediately through its listener hook; requests written by other processes
+    (the agent worker, another dashboard) are picked up by a cheap
+    `PRAGMA data_version` check every `sync_interval` seconds, which only queries
+    the table when something actually changed. Due requests are expired with one
+    targeted, batched UPDATE, so the database sees no work while nothing is due.
+    """
+
+    def __init__(self, database: Database, timeout_hours: float = 24, sync_interval: float = 5.0,
+                 sync_overlap: float = 60.0, retry_interval: float = 60.0):
         self.db = database
         self.timeout_hours = timeout_hours
+        self.sync_interval = sync_interval
+        self.retry_interval = retry_interval
+        # Re-read this far behind the newest request seen, so rows committed late
+        # by another process are not missed
+        self.sync_overlap = sync_overlap
         self.running = False
-    
+        self._heap: List[Tuple[int, str]] = []
+        self._deadlines: Dict[str, int] = {}
+        self._newest_created_ms: Optional[int] = None
+        self._data_version: Optional[int] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def timeout_ms(self) -> int:
+        return int(self.timeout_hours * 3600 * 1000)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of pending requests currently being tracked"""
+        return len(self._deadlines)
+
     async def start_monitoring(self):
         """Start the timeout monitoring service"""
         self.running = True
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.db.add_listener(self._on_request_changed)
         logger.info(f"Started timeout monitoring service (timeout: {self.timeout_hours} hours)")
-        
-        while self.running:
-            try:
-                await self.db.mark_timeout_requests(self.timeout_hours)
-                await asyncio.sleep(300)  # Check every 5 minutes
-            except Exception as e:
-                logger.error(f"Error in timeout monitoring: {str(e)}")
-                await asyncio.sleep(60)  # Wait 1 minute before retrying
-    
+
+        try:
+            # The first sync rebuilds the heap; it is retried like any other
+            next_sync = time.monotonic()
+            while self.running:
+                try:
+                    if time.monotonic() >= next_sync:
+                        await self._sync()
+                        next_sync = time.monotonic() + self.sync_interval
+                    await self._expire_due()
+                    await self._sleep_until_next(next_sync)
+                except Exception as e:
+                    logger.error(f"Error in timeout monitoring: {str(e)}")
+                    await asyncio.sleep(self.retry_interval)
+        finally:
+            self.db.remove_listener(self._on_request_changed)
+
     def stop_monitoring(self):
         """Stop the timeout monitoring service"""
         self.running = False
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
         logger.info("Stopped timeout monitoring service")
+
+    def track(self, request_id: str, created_at: datetime):
+        """Schedule a pending request for expiry; safe to call from any thread"""
+        self._call_in_loop(self._track, request_id, int(created_at.timestamp() * 1000))
+
+    def untrack(self, request_id: str):
+        """Forget a request that is no longer pending; safe to call from any thread"""
+        self._call_in_loop(self._untrack, request_id)
+
+    def _call_in_loop(self, fn, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is None or running is self._loop:
+            fn(*args)
+        else:
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def _on_request_changed(self, event: str, request_id: str, created_at_ms: Optional[int]):
+        if event == "created" and created_at_ms is not None:
+            self._call_in_loop(self._track, request_id, created_at_ms)
+        elif event == "resolved":
+            self._call_in_loop(self._untrack, request_id)
+
+    def _track(self, request_id: str, created_at_ms: int):
+        if request_id in self._deadlines:
+            return
+        deadline = created_at_ms + self.timeout_ms
+        self._deadlines[request_id] = deadline
+        heapq.heappush(self._heap, (deadline, request_id))
+        if self._newest_created_ms is None or created_at_ms > self._newest_created_ms:
+            self._newest_created_ms = created_at_ms
+        if self._wakeup is not None and self._heap[0][1] == request_id:
+            # New earliest deadline: re-arm the sleep
+            self._wakeup.set()
+
+    def _untrack(self, request_id: str):
+        # The heap entry is dropped lazily when it reaches the top
+        self._deadlines.pop(request_id, None)
+
+    async def _sync(self):
+        """Pick up pending requests written by other connections or processes"""
+        version = await self.db.get_data_version()
+        if version == self._data_version:
+            return
+        since = None
+        if self._newest_created_ms is not None:
+            since = datetime.fromtimestamp(self._newest_created_ms / 1000) - timedelta(seconds=self.sync_overlap)
+        for created_at_ms, request_id in await self.db.get_pending_deadlines(since):
+            self._track(request_id, created_at_ms)
+        # Only now, so a failed sync is redone in full
+        self._data_version = version
+
+    async def _expire_due(self) -> int:
+        now_ms = int(time.time() * 1000)
+        due = []
+        while self._heap and self._heap[0][0] <= now_ms:
+            deadline, request_id = heapq.heappop(self._heap)
+            if self._deadlines.get(request_id) == deadline:
+                del self._deadlines[request_id]
+                due.append(request_id)
+        if not due:
+            return 0
+        expired = await self.db.expire_requests(due)
+        logger.info(f"Marked {expired} help request(s) unresolved after {self.timeout_hours} hours")
+        return expired
+
+    async def _sleep_until_next(self, next_sync: float):
+        delay = next_sync - time.monotonic()
+        if self._heap:
+            delay = min(delay, self._heap[0][0] / 1000 - time.time())
+        self._wakeup.clear()
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,50 @@
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("tool_metrics")
+
+
+class ToolCallMetrics:
+    """Per-call latency of function tools.
+
+    The LLM's spoken reply waits on every tool call it makes, so tools should
+    return well within the LLM's own time to first token. Calls slower than
+    `target_ms` are logged as they happen. `on_record(tool, seconds)`, when set,
+    sees every call too, e.g. to feed a Prometheus histogram.
+    """
+
+    def __init__(self, target_ms: float = 50.0, on_record: Optional[Callable[[str, float], None]] = None):
+        self.target_ms = target_ms
+        self.on_record = on_record
+        self._seconds: Dict[str, List[float]] = defaultdict(list)
+
+    @contextmanager
+    def measure(self, tool: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(tool, time.perf_counter() - start)
+
+    def record(self, tool: str, seconds: float):
+        self._seconds[tool].append(seconds)
+        if self.on_record is not None:
+            self.on_record(tool, seconds)
+        if seconds * 1000 > self.target_ms:
+            logger.warning(f"Tool call {tool} took {seconds * 1000:.1f} ms (target {self.target_ms:.0f} ms)")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-tool call count and mean, p95 and max latency in milliseconds"""
+        summary = {}
+        for tool, seconds in self._seconds.items():
+            ordered = sorted(seconds)
+            summary[tool] = {
+                "calls": len(ordered),
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return summary
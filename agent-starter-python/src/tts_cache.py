@@ -0,0 +1,299 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import AsyncIterable, Dict, Iterable, Iterator, List, Optional
+
+from livekit import rtc
+
+logger = logging.getLogger("tts_cache")
+
+_MAGIC = b"TTS1"
+# Magic followed by the length of the JSON header
+_PREFIX = struct.Struct("<4sI")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different spellings share one cache entry"""
+    text = unicodedata.normalize("NFKC", text).replace("’", "'")
+    return " ".join(text.split())
+
+
+@dataclass
+class _Entry:
+    path: str
+    sample_rate: int
+    num_channels: int
+    offset: int
+    size: int = 0
+    learned: bool = False
+    mapped: Optional[mmap.mmap] = None
+
+
+class TTSCache:
+    """On-disk cache of synthesized speech for one voice and model.
+
+    Each entry is a file holding a small JSON header (voice, model, text, audio
+    format) followed by raw 16-bit PCM. Files are memory-mapped on first use
+    and sliced into frames, so a hit costs no provider request and no read of
+    the whole file up front. Entries are written to a temporary file and
+    renamed into place, so several worker processes can share one cache
+    directory.
+
+    Canned responses are synthesized ahead of time with `prewarm`. Any other
+    text spoken at least `learn_after` times is stored as it streams from the
+    provider, so frequent lines like the opening hours get cached too. Learned
+    entries share a budget of `max_learned_bytes` on disk; past it the least
+    recently played are deleted.
+    """
+
+    def __init__(self, cache_dir: str, voice_id: str, model: str, frame_ms: int = 20,
+                 learn_after: int = 3, max_learned_chars: int = 300,
+                 max_learned_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.voice_id = voice_id
+        self.model = model
+        self.frame_ms = frame_ms
+        self.learn_after = learn_after
+        self.max_learned_chars = max_learned_chars
+        self.max_learned_bytes = max_learned_bytes
+        self.hits = 0
+        self.misses = 0
+        self.learned = 0
+        self.evicted = 0
+        self._entries: Dict[str, _Entry] = {}
+        # Learned texts, least recently played first
+        self._learned: "OrderedDict[str, None]" = OrderedDict()
+        self._learned_bytes = 0
+        self._texts: List[str] = []
+        self._seen: Counter = Counter()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, text: str) -> str:
+        digest = hashlib.sha256(f"{self.voice_id}\0{self.model}\0{text}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pcm")
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pcm"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                files.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+        # Oldest first, so the least recently written learned entries go first
+        for _, path in sorted(files):
+            try:
+                with open(path, "rb") as f:
+                    magic, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+                    if magic != _MAGIC:
+                        continue
+                    header = json.loads(f.read(header_len))
+                size = os.path.getsize(path)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Skipping unreadable TTS cache file {os.path.basename(path)}: {str(e)}")
+                continue
+            if header["voice_id"] == self.voice_id and header["model"] == self.model:
+                # Files written before entries were marked count as learned
+                self._add_entry(header["text"], _Entry(path, header["sample_rate"], header["num_channels"],
+                                                       _PREFIX.size + header_len, size,
+                                                       header.get("learned", True)))
+
+    def _add_entry(self, text: str, entry: _Entry):
+        with self._lock:
+            previous = self._entries.get(text)
+            if previous is None:
+                bisect.insort(self._texts, text)
+            elif previous.learned:
+                self._learned.pop(text, None)
+                self._learned_bytes -= previous.size
+            self._entries[text] = entry
+            if entry.learned:
+                self._learned[text] = None
+                self._learned_bytes += entry.size
+                self._evict_locked()
+
+    def _evict_locked(self):
+        while self._learned_bytes > self.max_learned_bytes and self._learned:
+            text, _ = self._learned.popitem(last=False)
+            entry = self._entries.pop(text)
+            del self._texts[bisect.bisect_left(self._texts, text)]
+            self._learned_bytes -= entry.size
+            self.evicted += 1
+            # Frames already handed out keep their mapping alive until released
+            try:
+                os.unlink(entry.path)
+            except OSError as e:
+                logger.warning(f"Failed to delete evicted TTS cache file {entry.path}: {str(e)}")
+
+    def __contains__(self, text: str) -> bool:
+        return normalize_text(text) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def could_match(self, partial_text: str) -> bool:
+        """Whether streamed text so far is the start of some cached entry"""
+        prefix = normalize_text(partial_text)
+        i = bisect.bisect_left(self._texts, prefix)
+        return i < len(self._texts) and self._texts[i].startswith(prefix)
+
+    def get(self, text: str) -> Optional[List[rtc.AudioFrame]]:
+        """Cached frames for `text`, or None on a miss"""
+        text = normalize_text(text)
+        entry = self._entries.get(text)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            frames = list(self._frames(entry))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable TTS cache entry {entry.path}: {str(e)}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry.learned:
+            with self._lock:
+                if text in self._learned:
+                    self._learned.move_to_end(text)
+        return frames
+
+    def _frames(self, entry: _Entry) -> Iterator[rtc.AudioFrame]:
+        if entry.mapped is None:
+            with open(entry.path, "rb") as f:
+                entry.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        pcm = memoryview(entry.mapped)[entry.offset:]
+        samples_per_frame = entry.sample_rate * self.frame_ms // 1000
+        frame_bytes = samples_per_frame * entry.num_channels * 2
+        for start in range(0, len(pcm), frame_bytes):
+            chunk = pcm[start:start + frame_bytes]
+            yield rtc.AudioFrame(chunk, entry.sample_rate, entry.num_channels,
+                                 len(chunk) // (2 * entry.num_channels))
+
+    def put(self, text: str, frames: Iterable[rtc.AudioFrame], learned: bool = False):
+        """Store synthesized frames for `text`; `learned` entries count against
+        `max_learned_bytes` and may be evicted"""
+        text = normalize_text(text)
+        frames = list(frames)
+        if not text or not frames:
+            return
+        header = json.dumps({
+            "voice_id": self.voice_id,
+            "model": self.model,
+            "text": text,
+            "sample_rate": frames[0].sample_rate,
+            "num_channels": frames[0].num_channels,
+            "learned": learned,
+        }).encode()
+        path = self._path(text)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_PREFIX.pack(_MAGIC, len(header)))
+                f.write(header)
+                for frame in frames:
+                    f.write(frame.data.cast("B"))
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+        self._add_entry(text, _Entry(path, frames[0].sample_rate, frames[0].num_channels,
+                                     _PREFIX.size + len(header), size, learned))
+
+    def should_learn(self, text: str) -> bool:
+        """Count a spoken text and decide whether it is frequent enough to store"""
+        text = normalize_text(text)
+        if not text or len(text) > self.max_learned_chars or text in self._entries:
+            return False
+        self._seen[text] += 1
+        return self._seen[text] >= self.learn_after
+
+    async def synthesize(self, tts, text: str):
+        """Synthesize `text` with a livekit TTS and store it"""
+        frames = []
+        async with tts.synthesize(normalize_text(text)) as stream:
+            async for audio in stream:
+                frames.append(audio.frame)
+        self.put(text, frames)
+
+    async def prewarm(self, tts, texts: Iterable[str], concurrency: int = 4) -> int:
+        """Synthesize every text that is not cached yet, `concurrency` at a time;
+        returns how many were added. A text that fails is left to live TTS."""
+        missing = [text for text in dict.fromkeys(normalize_text(t) for t in texts)
+                   if text and text not in self._entries]
+        slots = asyncio.Semaphore(concurrency)
+
+        async def warm(text: str) -> bool:
+            async with slots:
+                try:
+                    await self.synthesize(tts, text)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Failed to prewarm TTS for {text!r}: {str(e)}")
+                    return False
+
+        return sum(await asyncio.gather(*(warm(text) for text in missing)))
+
+    async def speak(self, text: AsyncIterable[str], synthesize):
+        """Play streamed text from the cache, or through `synthesize` on a miss.
+
+        Text is buffered only while it can still be the start of a cached entry,
+        so a miss adds no latency beyond the first diverging chunk.
+        """
+        buffered: List[str] = []
+        chunks = text.__aiter__()
+        async for chunk in chunks:
+            buffered.append(chunk)
+            if not self.could_match("".join(buffered)):
+                self.misses += 1
+                break
+        else:
+            frames = self.get("".join(buffered))
+            if frames is not None:
+                for frame in frames:
+                    yield frame
+                return
+
+        spoken: List[str] = []
+
+        async def replay():
+            for chunk in buffered:
+                spoken.append(chunk)
+                yield chunk
+            async for chunk in chunks:
+                spoken.append(chunk)
+                yield chunk
+
+        synthesized = []
+        async for frame in synthesize(replay()):
+            synthesized.append(frame)
+            yield frame
+        if self.should_learn("".join(spoken)):
+            self.put("".join(spoken), synthesized, learned=True)
+            self.learned += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for the usage log"""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "learned": self.learned, "evicted": self.evicted}
+
+    def close(self):
+        """Unmap cached files"""
+        for entry in self._entries.values():
+            if entry.mapped is not None:
+                entry.mapped.close()
+                entry.mapped = None
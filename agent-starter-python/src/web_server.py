@@ -11,6 +11,7 @@ from datetime import datetime
 
 from database import Database, RequestStatus
 from customer_followup import CustomerFollowupService
+from timeout_service import TimeoutService
 from api_token import router as token_router
 
 app = FastAPI(title="Glow Beauty Salon - Supervisor Dashboard")
@@ -34,40 +35,53 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
 db = Database()
 followup_service = CustomerFollowupService(db)
+# Expires pending requests after 24 hours at their exact deadline
+timeout_service = TimeoutService(db, timeout_hours=24)
+
+@app.on_event("startup")
+async def start_timeout_service():
+    app.state.timeout_task = asyncio.create_task(timeout_service.start_monitoring())
+
+@app.on_event("shutdown")
+async def stop_timeout_service():
+    timeout_service.stop_monitoring()
+    await app.state.timeout_task
+
+DASHBOARD_PAGE_SIZE = 50
 
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request):
+async def dashboard(request: Request, history_cursor: Optional[str] = None, answers_cursor: Optional[str] = None):
     """Main supervisor dashboard showing pending and resolved requests"""
-    pending_requests = await db.get_pending_requests()
-    all_requests = await db.get_all_requests()
-    learned_answers = await db.get_learned_answers()
-    
-    # Check for timeout requests (older than 24 hours)
-    await db.mark_timeout_requests(timeout_hours=24)
+    try:
+        pending_page = await db.get_requests_page(RequestStatus.PENDING, DASHBOARD_PAGE_SIZE, oldest_first=True)
+        history_page = await db.get_requests_page(limit=DASHBOARD_PAGE_SIZE, cursor=history_cursor)
+        answers_page = await db.get_learned_answers_page(DASHBOARD_PAGE_SIZE, answers_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    pending_count = await db.count_requests(RequestStatus.PENDING)
+    waiting_callers = await db.count_request_callers([r.id for r in pending_page.items])
     
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
-        "pending_requests": pending_requests,
-        "all_requests": all_requests,
-        "learned_answers": learned_answers,
-        "pending_count": len(pending_requests)
+        "pending_requests": pending_page.items,
+        "all_requests": history_page.items,
+        "learned_answers": answers_page.items,
+        "pending_count": pending_count,
+        "waiting_callers": waiting_callers,
+        "history_next": history_page.next_cursor,
+        "answers_next": answers_page.next_cursor,
     })
 
 @app.post("/respond/{request_id}")
 async def respond_to_request(request_id: str, response: str = Form(...)):
-    """Handle supervisor response to a help request"""
+    """Handle supervisor response to a help request and every caller waiting on it"""
     success = await db.resolve_help_request(request_id, response)
     
     if not success:
         raise HTTPException(status_code=404, detail="Request not found")
     
     # Get the request details for customer follow-up
-    all_requests = await db.get_all_requests()
-    target_request = None
-    for req in all_requests:
-        if req.id == request_id:
-            target_request = req
-            break
+    target_request = await db.get_request(request_id)
     
     # Send customer follow-up
     if target_request:
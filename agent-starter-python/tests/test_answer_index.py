@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from agent import Assistant, _open_answer_index
+from answer_index import LearnedAnswerIndex, embed
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "help_requests.db"))
+    yield database
+    database.close()
+
+
+def test_paraphrases_embed_close_together():
+    brow, paraphrase, unrelated = embed(["How much is a brow tint?", "price for eyebrow tinting",
+                                         "Do you offer hair extensions?"])
+    assert brow.dtype == np.float32
+    assert np.linalg.norm(brow) == pytest.approx(1.0, abs=1e-5)
+    assert brow @ paraphrase > 0.6 > brow @ unrelated
+
+
+async def test_search_picks_up_new_answers_incrementally(db):
+    await db.add_learned_answer("How much is a brow tint?", "Brow tints are $20.")
+    index = LearnedAnswerIndex(db, revalidate_interval=0)
+
+    (match,) = await index.search("price for eyebrow tinting")
+    assert match.answer == "Brow tints are $20."
+    assert match.score > index.threshold
+    assert await index.search("Do you offer hair extensions?") == []
+
+    # Written by another process, e.g. the supervisor dashboard
+    other = Database(db.db_path)
+    try:
+        await other.add_learned_answer("Do you offer hair extensions?", "Yes, tape-in and clip-in.")
+    finally:
+        other.close()
+    (match,) = await index.search("hair extensions offered?")
+    assert match.answer == "Yes, tape-in and clip-in."
+    assert len(index) == 2
+
+
+async def test_saved_index_is_memory_mapped_and_keeps_syncing(db, tmp_path):
+    await db.add_learned_answer("Is parking free?", "Free after 6pm.")
+    index = LearnedAnswerIndex(db)
+    await index.sync(force=True)
+    index.save(str(tmp_path / "answer_index"))
+
+    await db.add_learned_answer("Do you do perms?", "Yes, from $80.")
+    loaded = LearnedAnswerIndex.load(str(tmp_path / "answer_index"), db)
+    assert isinstance(loaded._base, np.memmap)
+    await loaded.sync(force=True)
+    assert len(loaded) == 2
+    assert [id for id, _ in loaded.nearest("free parking?", k=2)][0] == (await db.search_learned_answers("parking"))[0].id
+
+
+async def test_workers_start_from_the_index_an_earlier_worker_saved(db, tmp_path):
+    path = str(tmp_path / "answer_index")
+    await db.add_learned_answer("Is parking free?", "Free after 6pm.")
+    first = await _open_answer_index(db, path)
+    assert len(first) == 1
+
+    await db.add_learned_answer("Do you do perms?", "Yes, from $80.")
+    second = await _open_answer_index(db, path)
+    assert isinstance(second._base, np.memmap) and len(second._base_ids) == 1
+    assert len(second) == 2
+    # The second worker saved the answer it embedded, so a third embeds nothing
+    third = await _open_answer_index(db, path)
+    assert len(third._base_ids) == 2 and not third._tail_ids
+
+
+async def test_an_index_saved_from_another_database_is_rebuilt(db, tmp_path):
+    path = str(tmp_path / "answer_index")
+    await db.add_learned_answer("Is parking free?", "Free after 6pm.")
+    await db.add_learned_answer("Do you do perms?", "Yes, from $80.")
+    assert len(await _open_answer_index(db, path)) == 2
+
+    # help_requests.db recreated with the saved index left behind
+    fresh = Database(str(tmp_path / "fresh.db"))
+    try:
+        for question in ("Do you sell gift cards?", "Is there a student discount?", "Do you do brow lamination?"):
+            await fresh.add_learned_answer(question, "Yes.")
+        stale = LearnedAnswerIndex.load(path, fresh)
+        assert not await stale.matches_database()
+
+        index = await _open_answer_index(fresh, path)
+        assert len(index) == 3
+        assert [answer.question for answer in await index.search("do you sell gift cards")] == [
+            "Do you sell gift cards?"]
+        assert await LearnedAnswerIndex.load(path, fresh).matches_database()
+    finally:
+        fresh.close()
+
+
+@pytest.mark.parametrize("question", [
+    "Is botox safe during pregnancy?",
+    "How much is a brow wax?",
+    "Do you offer nail extensions?",
+    "Do you offer lash extensions?",
+    "Do you do perm treatments?",
+])
+async def test_near_miss_questions_still_escalate(db, question):
+    for learned, answer in [("Is microblading safe during pregnancy?", "Not during pregnancy, sorry."),
+                            ("How much is a brow tint?", "$25."),
+                            ("Do you offer hair extensions?", "Yes, tape-in and clip-in."),
+                            ("Do you do keratin treatments?", "Yes, from $150.")]:
+        await db.add_learned_answer(learned, answer)
+    index = LearnedAnswerIndex(db, revalidate_interval=0)
+
+    assert await index.search(question) == []
+    # Neither the index nor keyword search answers it, so request_help escalates
+    assert await Assistant(db=db, answer_index=index)._check_learned_answers(question) is None
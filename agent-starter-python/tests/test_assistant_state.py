@@ -0,0 +1,22 @@
+from agent import Assistant
+from answer_index import LearnedAnswerIndex
+from database import Database
+from learned_answer_cache import LearnedAnswerCache
+
+
+def test_assistants_share_prewarmed_state(tmp_path):
+    db = Database(str(tmp_path / "help_requests.db"))
+    answers = LearnedAnswerCache(db)
+    # Still empty, as on a fresh install
+    index = LearnedAnswerIndex(db)
+    try:
+        first = Assistant(db=db, learned_answers=answers, answer_index=index)
+        second = Assistant(db=db, learned_answers=answers, answer_index=index)
+        assert first.db is second.db is db
+        assert first.learned_answers is second.learned_answers is answers
+        assert len(index) == 0
+        assert first.answer_index is second.answer_index is index
+        assert first.speculative.answer_index is index
+        assert first.small_talk is not second.small_talk
+    finally:
+        db.close()
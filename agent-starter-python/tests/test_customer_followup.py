@@ -0,0 +1,59 @@
+import pytest
+
+from customer_followup import CustomerFollowupService
+from database import UNKNOWN_PHONE, Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "help_requests.db"))
+    yield database
+    database.close()
+
+
+async def test_one_answer_reaches_every_waiting_caller_once(db, monkeypatch):
+    sent = []
+
+    async def notify(self, phone, message, question):
+        sent.append((phone, question))
+        return phone != "+15550000003"
+
+    monkeypatch.setattr(CustomerFollowupService, "_simulate_customer_notification", notify)
+    service = CustomerFollowupService(db)
+
+    for phone, question in (("+15550000001", "Do you offer lash lifts?"),
+                            ("+15550000002", "do you offer lash lifts"),
+                            ("+15550000001", "Do you offer lash lifts?"),
+                            ("+15550000003", "Do you offer lash lifts")):
+        request, _ = await db.create_or_join_help_request(f"id-{len(sent)}-{phone}", phone, question)
+    await db.resolve_help_request(request.id, "Yes, $65.")
+
+    # The failed number stays waiting and is retried; the others hear back once
+    assert not await service.send_customer_response(request.id)
+    assert sent == [("+15550000001", "Do you offer lash lifts?"),
+                    ("+15550000002", "do you offer lash lifts"),
+                    ("+15550000003", "Do you offer lash lifts")]
+    sent.clear()
+    assert not await service.send_customer_response(request.id)
+    assert sent == [("+15550000003", "Do you offer lash lifts")]
+
+
+async def test_callers_without_a_number_each_hear_back(db, monkeypatch):
+    sent = []
+
+    async def notify(self, phone, message, question):
+        sent.append(question)
+        return question != "DO YOU OFFER LASH LIFTS?!"
+
+    monkeypatch.setattr(CustomerFollowupService, "_simulate_customer_notification", notify)
+    service = CustomerFollowupService(db)
+
+    for id, question in (("a", "Do you offer lash lifts?"), ("b", "do you offer lash lifts"),
+                         ("c", "DO YOU OFFER LASH LIFTS?!")):
+        request, _ = await db.create_or_join_help_request(id, UNKNOWN_PHONE, question)
+    await db.resolve_help_request(request.id, "Yes, $65.")
+
+    assert not await service.send_customer_response(request.id)
+    assert sent == ["Do you offer lash lifts?", "do you offer lash lifts", "DO YOU OFFER LASH LIFTS?!"]
+    waiting = await db.get_request_callers(request.id, waiting_only=True)
+    assert [caller.caller_request_id for caller in waiting] == ["c"]
@@ -0,0 +1,443 @@
+import asyncio
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database, RequestStatus, SessionUsage, add_latency_sample, latency_percentile
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "help_requests.db"))
+    yield database
+    database.close()
+
+
+def test_connections_use_wal_and_are_reused_per_thread(db):
+    conn = db.connections.get()
+    assert conn is db.connections.get()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.connections.get()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+async def test_request_lifecycle(db):
+    request_id = str(uuid.uuid4())
+    await db.create_help_request(request_id, "+15551234567", "Do you offer lash lifts?")
+
+    pending = await db.get_pending_requests()
+    assert [r.id for r in pending] == [request_id]
+
+    assert await db.resolve_help_request(request_id, "Yes, $65.")
+    assert not await db.resolve_help_request("missing", "nope")
+
+    (request,) = await db.get_all_requests()
+    assert request.status == RequestStatus.RESOLVED
+    assert request.supervisor_response == "Yes, $65."
+    assert request.responded_at is not None
+
+
+def test_concurrent_writers_do_not_lock(db):
+    errors = []
+
+    def writer():
+        async def run():
+            for i in range(50):
+                await db.create_help_request(str(uuid.uuid4()), "+15550000000", f"q{i}")
+
+        try:
+            asyncio.run(run())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(asyncio.run(db.get_pending_requests())) == 200
+
+
+async def test_writes_wait_off_the_event_loop(db):
+    # Hold the write lock from another connection so the insert has to wait
+    other = Database(db.db_path)
+    blocker = other.connections.get()
+    blocker.execute("BEGIN IMMEDIATE")
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    tick_task = asyncio.create_task(ticker())
+    insert = asyncio.create_task(db.create_help_request("r1", "+15550000000", "Do you do perms?"))
+    await asyncio.sleep(0.2)
+    assert not insert.done()
+    assert ticks >= 10
+
+    blocker.rollback()
+    other.close()
+    await insert
+    tick_task.cancel()
+
+    assert [r.id for r in await db.get_pending_requests()] == ["r1"]
+
+
+async def test_writes_run_on_single_writer_thread(db):
+    threads = await asyncio.gather(*(
+        db._write(lambda cursor: threading.get_ident()) for _ in range(20)
+    ))
+    assert len(set(threads)) == 1
+    assert threads[0] != threading.get_ident()
+
+
+async def test_point_and_filtered_lookups(db):
+    for id, phone, question in (("a", "+15550000001", "Do you do perms?"),
+                                 ("b", "+15550000002", "Do you sell gift cards?"),
+                                 ("c", "+15550000001", "Is parking free?")):
+        await db.create_help_request(id, phone, question)
+        await asyncio.sleep(0.002)
+    await db.resolve_help_request("b", "Yes, any amount.")
+
+    assert (await db.get_request("b")).supervisor_response == "Yes, any amount."
+    assert await db.get_request("missing") is None
+    assert [r.id for r in await db.get_requests_by_status(RequestStatus.RESOLVED)] == ["b"]
+    assert [r.id for r in await db.get_requests_by_phone("+15550000001")] == ["c", "a"]
+
+
+def test_status_and_phone_queries_use_indexes(db):
+    conn = db.connections.get()
+
+    def plan(sql, *params):
+        return " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+    assert "idx_help_requests_status_created" in plan(
+        "SELECT * FROM help_requests WHERE status = ? ORDER BY created_at", "pending")
+    assert "idx_help_requests_customer_phone" in plan(
+        "SELECT * FROM help_requests WHERE customer_phone = ?", "+15550000001")
+    assert "sqlite_autoindex_help_requests_1" in plan(
+        "SELECT * FROM help_requests WHERE id = ?", "a")
+
+
+async def test_learned_answer_search_is_ranked(db):
+    await db.add_learned_answer("Do you offer hair extensions?", "Yes, tape-in and clip-in.")
+    await db.add_learned_answer("What brands of hair color do you use?", "Redken and Wella.")
+    await db.add_learned_answer("Do you offer eyebrow threading?", "Yes, $15 for brows.")
+
+    results = await db.search_learned_answers("Do you offer hair extensions?")
+    assert [r.answer for r in results] == ["Yes, tape-in and clip-in."]
+    assert results[0].score > 0
+
+    hair = await db.search_learned_answers("hair")
+    assert len(hair) == 2
+    assert hair[0].score >= hair[1].score
+
+    assert len(await db.search_learned_answers("offer", limit=1)) == 1
+    assert await db.search_learned_answers('"; DROP TABLE learned_answers; --') == []
+    assert await db.search_learned_answers("?") == []
+
+
+async def test_existing_learned_answers_are_indexed(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE learned_answers (id TEXT PRIMARY KEY, question TEXT NOT NULL, "
+                 "answer TEXT NOT NULL, learned_at TIMESTAMP NOT NULL)")
+    conn.execute("INSERT INTO learned_answers VALUES ('1', 'laser hair removal', 'From $99.', "
+                 "'2025-10-23 14:00:00')")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    try:
+        (match,) = await db.search_learned_answers("laser")
+        assert match.answer == "From $99."
+    finally:
+        db.close()
+
+
+async def test_keyset_pages_cover_every_row_once(db):
+    # Shared timestamps force the id tiebreak to keep pages stable
+    same_time = 1761228000000
+    with db.connections.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO help_requests (id, customer_phone, question, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(f"r{i:02d}", "+15550000000", f"q{i}", "pending" if i % 3 else "resolved", same_time)
+             for i in range(25)],
+        )
+
+    seen, cursor = [], None
+    while True:
+        page = await db.get_requests_page(limit=10, cursor=cursor)
+        seen.extend(r.id for r in page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert seen == [f"r{i:02d}" for i in reversed(range(25))]
+
+    pending = [r.id async for r in db.iter_requests(RequestStatus.PENDING, batch_size=4, oldest_first=True)]
+    assert pending == [f"r{i:02d}" for i in range(25) if i % 3]
+    assert await db.count_requests(RequestStatus.PENDING) == len(pending)
+
+    with pytest.raises(ValueError):
+        await db.get_requests_page(cursor="not-a-cursor")
+
+
+async def test_learned_answer_pages(db):
+    for i in range(5):
+        await db.add_learned_answer(f"question {i}", f"answer {i}")
+        # Timestamps have millisecond precision
+        await asyncio.sleep(0.002)
+
+    first = await db.get_learned_answers_page(limit=3)
+    assert [a.question for a in first.items] == ["question 4", "question 3", "question 2"]
+    second = await db.get_learned_answers_page(limit=3, cursor=first.next_cursor)
+    assert [a.question for a in second.items] == ["question 1", "question 0"]
+    assert second.next_cursor is None
+    assert len([a async for a in db.iter_learned_answers(batch_size=2)]) == 5
+
+
+async def test_write_behind_group_commits(tmp_path):
+    db = Database(str(tmp_path / "buffered.db"), write_behind=True,
+                  write_behind_max_batch=5, write_behind_interval=60)
+    try:
+        for i in range(3):
+            await db.create_help_request(f"r{i}", "+15550000000", f"q{i}")
+        await db.add_learned_answer("parking", "Free after 6pm.")
+        # Below the batch size and inside the durability window: nothing committed yet
+        assert await db.count_requests() == 0
+
+        await db.flush()
+        assert await db.count_requests() == 3
+        assert len(await db.get_learned_answers()) == 1
+
+        for i in range(3, 8):
+            await db.create_help_request(f"r{i}", "+15550000000", f"q{i}")
+        # The fifth buffered row filled the batch and triggered a flush
+        await asyncio.wrap_future(db.executor.submit_write(lambda cursor: None))
+        assert await db.count_requests() == 8
+
+        # Updates are ordered after buffered inserts they refer to
+        await db.create_help_request("late", "+15550000000", "Do you do perms?")
+        assert await db.resolve_help_request("late", "Yes.")
+    finally:
+        db.close()
+
+
+async def test_write_behind_group_commits_joins(tmp_path):
+    import sqlite3
+
+    db = Database(str(tmp_path / "buffered.db"), write_behind=True,
+                  write_behind_max_batch=4, write_behind_interval=60)
+    try:
+        results = await asyncio.gather(
+            db.create_or_join_help_request("a", "+15550000001", "Do you offer lash lifts?"),
+            db.create_or_join_help_request("b", "+15550000002", "do you offer lash lifts"),
+            # Reuses an id for a different question, so only this one fails
+            db.create_or_join_help_request("a", "+15550000003", "Do you offer brow lamination?"),
+            db.create_help_request("r1", "+15550000004", "Is parking free?"),
+            return_exceptions=True,
+        )
+        # The fourth record filled the batch; all were committed together
+        (first, created), (joined, joined_created), failed, _ = results
+        assert created and not joined_created and joined.id == first.id == "a"
+        assert isinstance(failed, sqlite3.IntegrityError)
+        assert await db.count_requests() == 2
+        assert [c.customer_phone for c in await db.get_request_callers("a")] == ["+15550000001", "+15550000002"]
+    finally:
+        db.close()
+
+
+async def test_write_behind_flushes_on_interval(tmp_path):
+    db = Database(str(tmp_path / "buffered.db"), write_behind=True, write_behind_interval=0.02)
+    try:
+        await db.create_help_request("r1", "+15550000000", "q1")
+        await asyncio.sleep(0.2)
+        assert (await db.get_request("r1")) is not None
+    finally:
+        db.close()
+
+
+async def test_rows_are_compact_and_decode_timestamps_lazily(db):
+    from datetime import datetime
+
+    created = await db.create_help_request("r1", "+15550000000", "Do you do perms?")
+    (fetched,) = await db.get_all_requests()
+
+    assert not hasattr(fetched, "__dict__")
+    assert isinstance(fetched._created_at, int)
+    # Stored with millisecond precision
+    assert abs(fetched.created_at - created.created_at).total_seconds() < 0.001
+    fetched.created_at = created.created_at
+    assert isinstance(fetched._created_at, datetime)
+    assert fetched == created
+    assert "question='Do you do perms?'" in repr(fetched)
+    assert fetched.status is RequestStatus.PENDING
+    assert fetched.responded_at is None
+
+
+async def test_legacy_text_timestamps_are_migrated_in_batches(tmp_path):
+    import sqlite3
+    from datetime import datetime
+
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE help_requests (id TEXT PRIMARY KEY, customer_phone TEXT NOT NULL, "
+                 "question TEXT NOT NULL, status TEXT NOT NULL, created_at TIMESTAMP NOT NULL, "
+                 "supervisor_response TEXT, responded_at TIMESTAMP)")
+    conn.execute("CREATE TABLE learned_answers (id TEXT PRIMARY KEY, question TEXT NOT NULL, "
+                 "answer TEXT NOT NULL, learned_at TIMESTAMP NOT NULL)")
+    conn.executemany("INSERT INTO help_requests VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        (f"r{i}", "+15550000000", f"q{i}", "resolved" if i % 2 else "pending",
+         f"2025-10-23 14:00:0{i}.250000", "Yes." if i % 2 else None,
+         f"2025-10-23 15:00:0{i}" if i % 2 else None)
+        for i in range(5)
+    ])
+    conn.execute("INSERT INTO learned_answers VALUES ('a1', 'laser hair removal', 'From $99.', "
+                 "'2025-10-23 14:00:00')")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    try:
+        db.migration_thread.join()
+        conn = db.connections.get()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+        assert {row[0] for row in conn.execute(
+            "SELECT typeof(created_at) FROM help_requests UNION SELECT typeof(learned_at) FROM learned_answers"
+        )} == {"integer"}
+
+        request = await db.get_request("r3")
+        assert request.created_at == datetime(2025, 10, 23, 14, 0, 3, 250000)
+        assert request.responded_at == datetime(2025, 10, 23, 15, 0, 3)
+        (answer,) = await db.search_learned_answers("laser")
+        assert answer.learned_at == datetime(2025, 10, 23, 14, 0, 0)
+
+        # Re-running is a no-op
+        await db.migrate_timestamps(batch_size=2)
+        assert (await db.get_request("r3")).created_at == request.created_at
+    finally:
+        db.close()
+
+
+async def test_resolved_since_is_a_range_query(db):
+    from datetime import datetime, timedelta
+
+    await db.create_help_request("r1", "+15550000000", "q1")
+    await db.create_help_request("r2", "+15550000000", "q2")
+    await db.resolve_help_request("r2", "Yes.")
+
+    assert [r.id for r in await db.get_requests_resolved_since(datetime.now() - timedelta(minutes=1))] == ["r2"]
+    assert await db.get_requests_resolved_since(datetime.now() + timedelta(minutes=1)) == []
+
+
+async def test_identical_escalations_share_one_ticket(tmp_path):
+    db = Database(str(tmp_path / "help_requests.db"))
+    # A second Database stands in for another worker process on the same file
+    other = Database(str(tmp_path / "help_requests.db"))
+    try:
+        results = await asyncio.gather(
+            db.create_or_join_help_request("a", "+15550000001", "Do you offer lash lifts?"),
+            other.create_or_join_help_request("b", "+15550000002", "do you OFFER lash lifts"),
+            db.create_or_join_help_request("c", "+15550000003", "Do you offer lash lifts?!"),
+            db.create_or_join_help_request("d", "+15550000004", "Do you offer brow lamination?"),
+        )
+        assert sum(created for _, created in results) == 2
+        ticket = {request.id for request, _ in results[:3]}
+        assert len(ticket) == 1
+        (ticket,) = ticket
+
+        callers = await db.get_request_callers(ticket)
+        assert sorted(c.customer_phone for c in callers) == ["+15550000001", "+15550000002", "+15550000003"]
+        assert await db.count_requests(RequestStatus.PENDING) == 2
+        assert (await db.count_request_callers([ticket, "missing"])) == {ticket: 3}
+
+        # Once answered, the same question opens a fresh ticket
+        await db.resolve_help_request(ticket, "Yes, $65.")
+        request, created = await db.create_or_join_help_request("e", "+15550000005", "Do you offer lash lifts?")
+        assert created and request.id == "e"
+
+        assert await db.mark_callers_notified(ticket, ["+15550000001", "+15550000002"]) == 2
+        waiting = await db.get_request_callers(ticket, waiting_only=True)
+        assert [c.customer_phone for c in waiting] == ["+15550000003"]
+    finally:
+        other.close()
+        db.close()
+
+
+@pytest.mark.parametrize("first, second", [
+    ("When can I get a perm?", "Where can I get a perm?"),
+    ("Who does microblading?", "Do you do microblading?"),
+    ("Can I get a facial?", "Who can I get a facial from?"),
+])
+async def test_different_questions_get_separate_tickets(db, first, second):
+    (a, _), (b, created) = [await db.create_or_join_help_request(id, "+15550000000", question)
+                            for id, question in (("a", first), ("b", second))]
+    assert created and a.id != b.id
+
+
+async def test_callers_table_gains_caller_request_ids(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "help_requests.db")
+    Database(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE help_request_callers")
+    conn.execute("CREATE TABLE help_request_callers (request_id TEXT NOT NULL, customer_phone TEXT NOT NULL, "
+                 "question TEXT NOT NULL, joined_at INTEGER NOT NULL, notified_at INTEGER)")
+    conn.execute("INSERT INTO help_request_callers VALUES ('r1', 'unknown', 'Do you do perms?', 0, NULL)")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    try:
+        (caller,) = await db.get_request_callers("r1")
+        assert caller.caller_request_id == "r1"
+        assert await db.mark_callers_notified("r1", [], ["r1"]) == 1
+    finally:
+        db.close()
+
+
+def _session(started_at: datetime, ttft_ms: list, tokens: int = 100) -> SessionUsage:
+    usage = SessionUsage(str(uuid.uuid4()), "room", started_at, started_at + timedelta(minutes=2),
+                         llm_prompt_tokens=tokens, tts_characters=50, turns=len(ttft_ms), escalations=1)
+    for ms in ttft_ms:
+        add_latency_sample(usage.latency, "llm_ttft", ms)
+    return usage
+
+
+async def test_usage_rollups_fold_in_only_new_sessions(db):
+    day = datetime(2025, 10, 20)
+    await db.add_session_usage(_session(day.replace(hour=9, minute=5), [120, 180]))
+    await db.add_session_usage(_session(day.replace(hour=9, minute=50), [400]))
+    await db.add_session_usage(_session(day.replace(hour=14), [900]))
+    assert await db.roll_up_usage() == 3
+    assert await db.roll_up_usage() == 0
+
+    nine, two = await db.get_usage_rollups("hour")
+    assert (nine.period_start, nine.sessions, nine.turns, nine.llm_prompt_tokens) == (day.replace(hour=9), 2, 3, 200)
+    assert nine.duration_seconds == 240
+    # Percentiles come from merged histograms: bucket bounds capped at the max
+    assert (latency_percentile(nine.latency["llm_ttft"], 50), latency_percentile(nine.latency["llm_ttft"], 95)) == (200, 400)
+
+    # A later session is added to its existing hour and day
+    await db.add_session_usage(_session(day.replace(hour=14, minute=30), [50], tokens=10))
+    assert await db.roll_up_usage(batch_size=1) == 1
+    (daily,) = await db.get_usage_rollups("day", since=day)
+    assert (daily.sessions, daily.escalations, daily.llm_prompt_tokens, daily.tts_characters) == (4, 4, 310, 200)
+    assert daily.latency["llm_ttft"]["count"] == 5
+    assert daily.latency["llm_ttft"]["max_ms"] == 900
+    assert [r.sessions for r in await db.get_usage_rollups("hour", since=day.replace(hour=10))] == [2]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from database import Database
+from intent_model import IntentModel, load_history, seed_examples
+from question_classifier import QuestionClassifier
+
+SERVICE = [
+    "Do you offer hair extensions?",
+    "How much is a balayage?",
+    "Can I book a facial for Friday?",
+    "Do you do scalp micropigmentation?",
+    "What does a keratin treatment cost?",
+    "Are walk-ins available for waxing today?",
+]
+
+
+def _train():
+    texts, labels = seed_examples()
+    return IntentModel.train(texts + SERVICE * 3, labels + [True] * len(SERVICE) * 3, n_features=2 ** 14)
+
+
+def test_model_separates_small_talk_from_service_questions(tmp_path):
+    model = _train()
+    assert model.predict(["Do you offer eyelash extensions?", "thanks, bye", "can you hear me"]).tolist() == \
+        [True, False, False]
+
+    path = str(tmp_path / "intent_model.npz")
+    model.save(path)
+    loaded = IntentModel.load(path)
+    assert loaded.ngram_range == model.ngram_range
+    np.testing.assert_allclose(loaded.predict_proba(SERVICE), model.predict_proba(SERVICE), rtol=1e-5)
+
+
+def test_model_is_a_drop_in_for_is_service_question(tmp_path):
+    path = str(tmp_path / "intent_model.npz")
+    _train().save(path)
+    try:
+        QuestionClassifier.load_intent_model(path)
+        # The keyword rules treat any longer question as a service question
+        assert not QuestionClassifier.is_service_question("Can you hear me okay right now?")
+        assert QuestionClassifier.is_service_question("How much is a keratin treatment?")
+        (small_talk,) = QuestionClassifier.classify_batch(["thank you so much"])
+        assert small_talk.standard_response.startswith("You're very welcome")
+    finally:
+        QuestionClassifier.intent_model = None
+
+
+def test_training_needs_both_classes():
+    with pytest.raises(ValueError):
+        IntentModel.train(SERVICE, [True] * len(SERVICE))
+
+
+async def test_history_labels_come_from_supervisor_responses(tmp_path):
+    path = str(tmp_path / "help_requests.db")
+    db = Database(path)
+    try:
+        for id, question, response in (("a", "Do you offer perms?", "Yes, from $80."),
+                                       ("b", "Can you hear me?", "Auto-resolved: Audio check or greeting handled by system"),
+                                       ("c", "Do you do henna?", None)):
+            await db.create_help_request(id, "+15550000000", question)
+            if response:
+                await db.resolve_help_request(id, response)
+        await db.add_learned_answer("laser hair removal", "From $150.")
+    finally:
+        db.close()
+
+    texts, labels = load_history(path)
+    assert dict(zip(texts, labels)) == {
+        "Do you offer perms?": True,
+        "Can you hear me?": False,
+        "laser hair removal": True,
+    }
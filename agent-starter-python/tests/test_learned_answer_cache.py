@@ -0,0 +1,61 @@
+import pytest
+
+from database import Database
+from learned_answer_cache import LearnedAnswerCache
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "help_requests.db"))
+    yield database
+    database.close()
+
+
+async def test_repeated_lookups_are_served_from_memory(db):
+    await db.add_learned_answer("Do you offer hair extensions?", "Yes, tape-in and clip-in.")
+    cache = LearnedAnswerCache(db)
+
+    first = await cache.search_learned_answers("Do you offer hair extensions?")
+    again = await cache.search_learned_answers("  do you OFFER hair extensions? ")
+    assert [a.answer for a in again] == [a.answer for a in first] == ["Yes, tape-in and clip-in."]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+async def test_writes_in_this_process_invalidate(db):
+    cache = LearnedAnswerCache(db, revalidate_interval=60)
+    assert await cache.search_learned_answers("parking") == []
+
+    await db.add_learned_answer("Is parking free?", "Free after 6pm.")
+    (answer,) = await cache.search_learned_answers("parking")
+    assert answer.answer == "Free after 6pm."
+    assert cache.stats()["invalidations"] == 1
+
+
+async def test_writes_from_another_process_invalidate(db):
+    cache = LearnedAnswerCache(db, revalidate_interval=0)
+    assert await cache.get_learned_answers() == []
+
+    # A second Database has its own listeners, like the dashboard process
+    other = Database(db.db_path)
+    try:
+        await other.add_learned_answer("Do you do perms?", "Yes, from $80.")
+    finally:
+        other.close()
+
+    assert len(await cache.get_learned_answers()) == 1
+    assert cache.stats()["invalidations"] == 1
+
+
+async def test_least_recently_used_entries_are_evicted(db):
+    cache = LearnedAnswerCache(db, max_entries=2)
+    await cache.search_learned_answers("perms")
+    await cache.search_learned_answers("parking")
+    await cache.search_learned_answers("perms")
+    await cache.search_learned_answers("lashes")
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    await cache.search_learned_answers("perms")
+    assert cache.stats()["hits"] == 2
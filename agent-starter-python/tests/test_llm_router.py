@@ -0,0 +1,85 @@
+import pytest
+from livekit.agents.llm import ChatContext, FunctionCall, FunctionCallOutput
+
+from agent import Assistant
+from database import Database
+from llm_router import RouteDecision, RoutingLLM
+from offline_plugins import RuleBasedLLM
+
+
+def _conversation(*questions: str) -> ChatContext:
+    chat_ctx = ChatContext()
+    chat_ctx.add_message(role="system", content="You are a salon receptionist.")
+    for question in questions:
+        chat_ctx.add_message(role="user", content=question)
+    return chat_ctx
+
+
+def _with_tool_output(output: str) -> ChatContext:
+    chat_ctx = _conversation("Do you offer hair extensions?")
+    chat_ctx.items.append(FunctionCall(call_id="call_1", name="check_learned_answers", arguments="{}"))
+    chat_ctx.items.append(FunctionCallOutput(call_id="call_1", name="check_learned_answers", output=output,
+                                             is_error=False))
+    return chat_ctx
+
+
+@pytest.fixture
+def router():
+    return RoutingLLM(fast=RuleBasedLLM(ttft=0), large=RuleBasedLLM(ttft=0))
+
+
+@pytest.mark.parametrize("question, decision", [
+    ("Can you hear me?", RouteDecision("fast", "small_talk")),
+    ("What are your hours on Saturday?", RouteDecision("fast", "listed_info")),
+    ("How much is a manicure?", RouteDecision("fast", "listed_info")),
+    ("Do you offer hair extensions?", RouteDecision("large", "tool_likely")),
+    ("Is microblading safe during pregnancy?", RouteDecision("large", "tool_likely")),
+    # A listed service asked about in an unlisted way still goes large
+    ("Do you do hair coloring for kids with green dye?", RouteDecision("large", "tool_likely")),
+])
+def test_questions_are_routed_by_what_the_instructions_cover(router, question, decision):
+    assert router.route(_conversation(question)) == decision
+
+
+def test_context_signals(router):
+    assert router.route(_with_tool_output("Based on previous learning: Yes, from $250.")) == \
+        RouteDecision("fast", "tool_result")
+    # Nothing learned: the next step may be request_help, which the large model decides
+    assert router.route(_with_tool_output("None")) == RouteDecision("large", "empty_tool_result")
+
+    injected = _conversation()
+    injected.add_message(role="system", content="A supervisor already answered this question: yes.")
+    injected.add_message(role="user", content="Do you offer hair extensions?")
+    assert router.route(injected) == RouteDecision("fast", "injected_answer")
+
+    long_call = _conversation(*["What are your hours?"] * 45)
+    assert router.route(long_call) == RouteDecision("large", "long_conversation")
+    wordy = "I was wondering about your hours " + "and so on " * 10
+    assert router.route(_conversation(wordy)) == RouteDecision("large", "long_question")
+
+
+async def test_escalation_goes_through_the_large_model(router, tmp_path):
+    db = Database(str(tmp_path / "help_requests.db"))
+    try:
+        tools = Assistant(db=db).tools
+    finally:
+        db.close()
+    decisions, collected = [], []
+    router.on_route = decisions.append
+    router.on("metrics_collected", collected.append)
+
+    for question in ("What are your hours on Saturday?", "Is microblading safe during pregnancy?"):
+        tool_calls = []
+        async with router.chat(chat_ctx=_conversation(question), tools=tools) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.tool_calls:
+                    tool_calls.extend(chunk.delta.tool_calls)
+    assert [d.route for d in decisions] == ["fast", "large"]
+    assert [call.name for call in tool_calls] == ["request_help"]
+
+    # Both models' metrics surface through the router, attributed per route
+    assert len(collected) == 2
+    stats = router.stats()
+    assert (stats["fast"]["completions"], stats["large"]["completions"]) == (1, 1)
+    assert stats["large"]["reasons"] == {"tool_likely": 1}
+    assert stats["fast"]["mean_ttft_ms"] is not None
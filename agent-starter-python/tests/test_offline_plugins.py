@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from livekit import rtc
+from livekit.agents import AgentSession, APIConnectOptions, APIError
+
+from agent import Assistant
+from database import Database
+from offline_plugins import PacedAudioOutput, RuleBasedLLM, ScriptedSTT, SilenceInput, ToneTTS
+from supervisor_alerts import SupervisorAlertDispatcher
+
+
+@pytest.fixture
+async def db(tmp_path):
+    database = Database(str(tmp_path / "help_requests.db"))
+    yield database
+    database.close()
+
+
+async def test_scripted_stt_refuses_batch_recognition():
+    with pytest.raises(APIError, match="streaming-only"):
+        await ScriptedSTT().recognize(rtc.AudioFrame(bytes(320), 16000, 1, 160),
+                                      conn_options=APIConnectOptions(max_retry=0))
+
+
+async def test_offline_session_answers_and_escalates(db):
+    async def discard_alerts(alerts):
+        pass
+
+    stt = ScriptedSTT(words_per_second=20)
+    audio_starts = []
+    listening = asyncio.Event()
+    session = AgentSession(
+        stt=stt,
+        llm=RuleBasedLLM(ttft=0.02, tokens_per_second=500),
+        tts=ToneTTS(ttfb=0.01, chars_per_second=200),
+        turn_detection="stt",
+        min_endpointing_delay=0.1,
+        resume_false_interruption=False,
+    )
+    session.on("agent_state_changed",
+               lambda ev: listening.set() if ev.new_state == "listening" else listening.clear())
+    session.input.audio = SilenceInput()
+    session.output.audio = PacedAudioOutput(on_audio_start=audio_starts.append)
+    await session.start(agent=Assistant(db=db, alerts=SupervisorAlertDispatcher(discard_alerts)))
+    try:
+        for text in ("Can you hear me?", "Is microblading safe during pregnancy?"):
+            await asyncio.wait_for(listening.wait(), 10)
+            ended = await stt.speak(text)
+            listening.clear()
+            await asyncio.wait_for(listening.wait(), 10)
+            # Every turn is answered out loud, and only after the caller spoke
+            assert audio_starts and audio_starts[-1] > ended - 0.1
+    finally:
+        await session.aclose()
+
+    assert len(audio_starts) == 2
+    # The service question reached request_help through the rule-based LLM
+    requests = await db.get_pending_requests()
+    assert [r.question for r in requests] == ["Is microblading safe during pregnancy?"]
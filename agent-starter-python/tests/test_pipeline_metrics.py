@@ -0,0 +1,82 @@
+import multiprocessing
+import socket
+import urllib.request
+
+from livekit.agents import metrics
+from prometheus_client import generate_latest
+
+import pipeline_metrics
+from pipeline_metrics import PipelineMetrics, start_metrics_server
+from tool_metrics import ToolCallMetrics
+
+
+def _llm_metrics(ttft: float, cancelled: bool = False) -> metrics.LLMMetrics:
+    return metrics.LLMMetrics(
+        label="llm", request_id="req", timestamp=0.0, duration=1.0, ttft=ttft, cancelled=cancelled,
+        completion_tokens=10, prompt_tokens=100, prompt_cached_tokens=0, total_tokens=110, tokens_per_second=10.0,
+    )
+
+
+def test_stage_latencies_are_labelled_by_agent_only():
+    recorder = PipelineMetrics(room="room-stages", agent="StagesAgent")
+    recorder.observe(_llm_metrics(0.42))
+    recorder.observe(_llm_metrics(0.1, cancelled=True))
+    recorder.observe(metrics.TTSMetrics(
+        label="tts", request_id="req", timestamp=0.0, ttfb=0.18, duration=1.0, audio_duration=2.0,
+        cancelled=False, characters_count=40, streamed=True,
+    ))
+    recorder.observe(metrics.EOUMetrics(
+        timestamp=0.0, end_of_utterance_delay=0.6, transcription_delay=0.3, on_user_turn_completed_delay=0.01,
+        last_speaking_time=0.0,
+    ))
+    ToolCallMetrics(on_record=recorder.observe_tool_call).record("request_help", 0.004)
+
+    text = generate_latest(pipeline_metrics.REGISTRY).decode()
+    labels = 'agent="StagesAgent"'
+    # One series per agent, not per call
+    assert "room-stages" not in text
+    # The cancelled completion is left out
+    assert 'voice_llm_ttft_seconds_count{agent="StagesAgent",model="llm"} 1.0' in text
+    assert 'voice_llm_ttft_seconds_bucket{agent="StagesAgent",le="0.5",model="llm"} 1.0' in text
+    assert f'voice_tts_ttfb_seconds_sum{{{labels}}} 0.18' in text
+    assert f'voice_end_of_utterance_delay_seconds_count{{{labels}}} 1.0' in text
+    assert f'voice_transcription_delay_seconds_count{{{labels}}} 1.0' in text
+    assert 'voice_tool_call_seconds_bucket{agent="StagesAgent",le="0.005",tool="request_help"} 1.0' in text
+
+    # The same samples make up the session's usage record
+    usage = recorder.session_usage(metrics.UsageSummary(
+        llm_prompt_tokens=100, llm_prompt_cached_tokens=0, llm_completion_tokens=10, tts_characters_count=40,
+        tts_audio_duration=2.0, stt_audio_duration=3.5,
+    ), escalations=1)
+    assert (usage.room, usage.turns, usage.escalations, usage.stt_audio_seconds) == ("room-stages", 1, 1, 3.5)
+    assert {stage: summary["count"] for stage, summary in usage.latency.items()} == {
+        "llm_ttft": 1, "tts_ttfb": 1, "end_of_utterance": 1, "transcription": 1, "tool:request_help": 1,
+    }
+
+
+def _observe_in_job_process(room: str):
+    PipelineMetrics(room=room, agent="Assistant").observe(_llm_metrics(0.3))
+
+
+def test_metrics_endpoint_aggregates_job_processes(tmp_path, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server, _ = start_metrics_server(port, addr="127.0.0.1", multiprocess_dir=str(tmp_path))
+    try:
+        # Job processes start after the server and inherit the samples directory
+        ctx = multiprocessing.get_context("spawn")
+        for room in ("room-a", "room-a", "room-b"):
+            job = ctx.Process(target=_observe_in_job_process, args=(room,))
+            job.start()
+            job.join(30)
+            assert job.exitcode == 0
+
+        text = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Calls in different rooms add up in one series
+    assert 'voice_llm_ttft_seconds_count{agent="Assistant",model="llm"} 3.0' in text
@@ -0,0 +1,129 @@
+import asyncio
+import random
+import time
+
+import pytest
+from livekit import rtc
+from livekit.agents import APIConnectionError
+from livekit.agents.llm import ChatContext
+
+from offline_plugins import DEFAULT_REPLY, CannedSTT, RuleBasedLLM, ToneTTS
+from provider_failover import FailoverLLM, FailoverSTT, FailoverTTS
+
+
+def _conversation() -> ChatContext:
+    chat_ctx = ChatContext()
+    chat_ctx.add_message(role="system", content="You are a salon receptionist.")
+    chat_ctx.add_message(role="user", content="Hello?")
+    return chat_ctx
+
+
+async def _complete(router: FailoverLLM) -> tuple:
+    """(reply, seconds to first token)"""
+    started, ttft, reply = time.perf_counter(), None, ""
+    async with router.chat(chat_ctx=_conversation()) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                ttft = ttft if ttft is not None else time.perf_counter() - started
+                reply += chunk.delta.content
+    return reply.strip(), ttft
+
+
+def _percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def test_requests_fail_over_and_a_failing_provider_is_skipped():
+    router = FailoverLLM([RuleBasedLLM(ttft=0, fail=True, provider="groq"),
+                          RuleBasedLLM(ttft=0, tokens_per_second=1000, provider="openai")],
+                         hedge=False, min_samples=3, cooldown=60)
+    for _ in range(5):
+        reply, _ = await _complete(router)
+        assert reply == DEFAULT_REPLY
+
+    stats = router.stats()
+    # Three failures put it over the error rate; the rest go straight to openai
+    assert stats["failed_over"] == 3
+    assert stats["providers"]["groq/rule-based"]["failed"] == 3
+    assert stats["providers"]["groq/rule-based"]["degraded"]
+    assert stats["providers"]["openai/rule-based"]["won"] == 5
+
+    router.providers[1].fail = True
+    with pytest.raises(APIConnectionError):
+        await _complete(router)
+    assert router.stats()["failed"] == 1
+
+
+async def test_hedging_cuts_tail_latency():
+    # Two independent providers, each with one slow request in 25
+    def heavy_tail(rng: random.Random):
+        return lambda: 0.25 if rng.random() < 0.04 else rng.uniform(0.01, 0.015)
+
+    async def ttfts(hedge: bool) -> list:
+        router = FailoverLLM([RuleBasedLLM(ttft=heavy_tail(random.Random(1)), tokens_per_second=1000, provider="a"),
+                              RuleBasedLLM(ttft=heavy_tail(random.Random(2)), tokens_per_second=1000, provider="b")],
+                             hedge=hedge, min_samples=20, hedge_after=0.05)
+        results = []
+        for _ in range(10):
+            results += await asyncio.gather(*(_complete(router) for _ in range(20)))
+        return [ttft for _, ttft in results], router.stats()
+
+    plain, _ = await ttfts(hedge=False)
+    hedged, stats = await ttfts(hedge=True)
+    assert _percentile(plain, 99) > 0.25
+    assert _percentile(hedged, 99) < 0.1
+    assert abs(_percentile(hedged, 50) - _percentile(plain, 50)) < 0.01
+    # Only the slow requests went out twice
+    assert 0 < stats["hedged"] < 40
+    assert stats["hedge_won"] > 0
+
+
+async def test_streamed_speech_is_hedged_and_resampled():
+    router = FailoverTTS([ToneTTS(ttfb=0.5, provider="elevenlabs"),
+                          ToneTTS(ttfb=0.01, sample_rate=16000, chars_per_second=200, provider="openai")],
+                         hedge_after=0.05)
+    collected = []
+    router.on("metrics_collected", collected.append)
+
+    started = time.perf_counter()
+    frames = []
+    async with router.stream() as stream:
+        stream.push_text("Hello! Welcome to Glow Beauty Salon.")
+        stream.end_input()
+        async for audio in stream:
+            frames.append(audio.frame)
+    assert time.perf_counter() - started < 0.4
+    assert frames and {frame.sample_rate for frame in frames} == {24000}
+
+    providers = router.stats()["providers"]
+    assert (providers["openai/tone"]["hedged"], providers["openai/tone"]["won"]) == (1, 1)
+    assert providers["elevenlabs/tone"]["cancelled"] == 1
+    # One TTFB for the caller, including the hedge delay
+    assert len(collected) == 1 and 0.05 <= collected[0].ttfb < 0.4
+
+
+async def test_synthesize_fails_over():
+    router = FailoverTTS([ToneTTS(ttfb=0, fail=True, provider="elevenlabs"),
+                          ToneTTS(ttfb=0, chars_per_second=200, provider="openai")])
+    frames = [audio.frame async for audio in router.synthesize("Hello!")]
+    assert sum(frame.duration for frame in frames) > 0
+    assert router.stats()["failed_over"] == 1
+
+
+async def test_slow_stt_is_skipped_until_its_cooldown_ends():
+    router = FailoverSTT([CannedSTT("primary", latency=0.03, provider="groq"),
+                          CannedSTT("secondary", latency=0, provider="openai")],
+                         hedge=False, min_samples=2, max_p95=0.02, cooldown=0.2)
+    buffer = rtc.AudioFrame(bytes(320), 16000, 1, 160)
+
+    async def transcript() -> str:
+        return (await router.recognize(buffer)).alternatives[0].text
+
+    assert [await transcript() for _ in range(3)] == ["primary", "primary", "secondary"]
+    assert router.stats()["providers"]["groq/canned"]["degraded"]
+
+    await asyncio.sleep(0.2)
+    router.providers[0].latency = 0
+    assert await transcript() == "primary"
+    assert not router.stats()["providers"]["groq/canned"]["degraded"]
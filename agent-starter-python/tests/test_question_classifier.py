@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from question_classifier import PhraseMatcher, QuestionClassifier, StreamingClassifier
+
+
+def test_phrases_match_whole_words_only():
+    # "hi" inside "which" and "ok" inside "book" used to short-circuit these
+    assert QuestionClassifier.is_service_question("Which facial is best for dry skin?")
+    assert QuestionClassifier.is_service_question("Can I book a massage for Friday?")
+    assert QuestionClassifier.is_service_question("Nowadays do you still do perms?")
+
+    assert not QuestionClassifier.is_service_question("Hi, can you hear me?")
+    assert not QuestionClassifier.is_service_question("Okay thanks")
+    assert not QuestionClassifier.is_service_question("What’s up")
+
+
+def test_classify_reports_every_category_in_one_pass():
+    result = QuestionClassifier.classify("Hello, how much is a facial?")
+    assert result.categories == {"technical", "audio_check", "service"}
+    assert result.is_service and result.standard_response is None
+
+    result = QuestionClassifier.classify("Hello, can you hear me?")
+    assert not result.is_service
+    assert result.standard_response == QuestionClassifier.get_standard_response("hello")
+
+    (thanks, booking) = QuestionClassifier.classify_batch(["Thank you, goodbye", "Do you offer microblading?"])
+    assert thanks.standard_response.startswith("You're very welcome")
+    assert booking.is_service and booking.standard_response is None
+    assert "service" in booking.categories
+
+
+@pytest.mark.parametrize("question", [
+    "Hello, I'd like to book a facial for Saturday",
+    "Hi, how much is a brow tint?",
+    "Thanks, and do you offer microblading?",
+    "Can you hear me? I want to ask about laser hair removal pricing",
+    "I'm testing a new shampoo, is it safe with hair color?",
+    # No service keyword, but more than small talk
+    "Hello, I was wondering whether you do balayage",
+])
+def test_small_talk_in_front_of_a_question_gets_no_standard_response(question):
+    assert QuestionClassifier.classify(question).standard_response is None
+    assert not QuestionClassifier.is_small_talk(question)
+
+
+def test_only_whole_utterances_of_small_talk_are_small_talk():
+    for question in ("Can you hear me?", "Hi, can you hear me?", "thank you so much",
+                     "Hello, are you there?", "Testing testing one two three"):
+        assert QuestionClassifier.is_small_talk(question), question
+    assert not QuestionClassifier.is_small_talk("hello " * 9)
+    assert not QuestionClassifier.is_small_talk("")
+
+
+@pytest.mark.parametrize("answer", ["yes", "no", "yes please", "Okay thanks", "sure", "maybe", "yeah",
+                                    "how are you"])
+def test_answers_and_phrases_without_a_standard_response_go_to_the_llm(answer):
+    # "Yes" may answer the agent's own question ("Shall I ask my supervisor?")
+    assert not QuestionClassifier.is_small_talk(answer)
+    assert QuestionClassifier.classify(answer).standard_response is None
+    assert StreamingClassifier().update(answer) is None
+
+
+def test_overlapping_phrases_all_match():
+    matcher = PhraseMatcher({"a": ["can you hear"], "b": ["can you hear me"], "c": ["hear me"]})
+    assert matcher.match("um can you hear me") == {"a": 1, "b": 1, "c": 3}
+    assert matcher.match("can you hearing") == {}
+
+
+def test_match_cost_does_not_grow_with_phrase_count():
+    utterance = "do you have any openings for a balayage and a gloss on saturday afternoon"
+
+    def per_call(matcher):
+        start = time.perf_counter()
+        for _ in range(2000):
+            matcher.match(utterance)
+        return time.perf_counter() - start
+
+    small = PhraseMatcher({"service": ["balayage"]})
+    large = PhraseMatcher({"service": [f"treatment number {i}" for i in range(20000)] + ["balayage"]})
+    assert large.match(utterance) == small.match(utterance) == {"service": 7}
+    assert per_call(large) < per_call(small) * 3
+
+
+def test_streaming_updates_match_a_full_rescan():
+    matcher = QuestionClassifier.compile()
+    stream = matcher.stream()
+    for transcript in ("so", "so can you", "so can you hear me", "so can you hear me now", "no can you"):
+        assert stream.update(transcript) == matcher.match(transcript)
+
+    classifier = StreamingClassifier()
+    assert classifier.update("hello").standard_response.startswith("Yes, I can hear you")
+    # Decisions hold only while everything said so far is small talk
+    assert classifier.update("hello how much") is None
+    assert classifier.update("hello how much is a brow tint") is None
+    classifier.reset()
+    assert classifier.update("thanks so") is not None
+    assert classifier.update("thanks so I was wondering") is None
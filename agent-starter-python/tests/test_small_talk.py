@@ -0,0 +1,96 @@
+import pytest
+
+from small_talk import SmallTalkShortCircuit
+
+
+def test_only_small_talk_gets_a_canned_response():
+    small_talk = SmallTalkShortCircuit()
+    assert small_talk.response_for("Can you hear me?").startswith("Yes, I can hear you")
+    assert small_talk.response_for("thank you so much").startswith("You're very welcome")
+    assert small_talk.response_for("Do you offer microblading?") is None
+    assert small_talk.response_for("   ") is None
+
+
+@pytest.mark.parametrize("utterance", [
+    "Hello, I'd like to book a facial for Saturday",
+    "Hi, how much is a brow tint?",
+    "Thanks, and do you offer microblading?",
+    "Can you hear me? I want to ask about laser hair removal pricing",
+    "I'm testing a new shampoo, is it safe with hair color?",
+])
+def test_greetings_in_front_of_a_question_go_to_the_llm(utterance):
+    assert SmallTalkShortCircuit().response_for(utterance) is None
+
+
+@pytest.mark.parametrize("answer", ["yes", "no", "yes please"])
+def test_yes_and_no_reach_the_llm(answer):
+    assert SmallTalkShortCircuit().response_for(answer) is None
+
+
+def test_latency_saved_is_measured_against_llm_ttft():
+    small_talk = SmallTalkShortCircuit()
+    small_talk.record_turn(short_circuited=True, elapsed=0.002)
+    assert small_talk.latency_saved is None
+
+    small_talk.record_llm_ttft(0.4)
+    small_talk.record_llm_ttft(0.6)
+    small_talk.record_llm_ttft(-1)
+    small_talk.record_turn(short_circuited=False)
+    small_talk.record_turn(short_circuited=True, elapsed=0.002)
+
+    stats = small_talk.stats()
+    assert stats["turns"] == 3
+    assert stats["short_circuited"] == 2
+    assert stats["mean_llm_ttft_ms"] == pytest.approx(500)
+    assert stats["latency_saved_ms"] == pytest.approx(2 * 500 - 4)
+
+
+def test_final_transcripts_answer_small_talk_before_end_of_turn():
+    small_talk = SmallTalkShortCircuit()
+    assert small_talk.on_transcript("can you", is_final=False) is None
+    assert small_talk.on_transcript("can you hear", is_final=False) is None
+    assert small_talk.on_transcript("Can you hear me?", is_final=True).startswith("Yes, I can hear you")
+    assert small_talk.turn_text == "Can you hear me?"
+    # End-of-turn detection arrives later with the same transcript
+    assert small_talk.end_turn("Can you hear me?")
+    assert small_talk.stats()["early_responses"] == 1
+
+    # Service questions wait for the whole turn
+    assert small_talk.on_transcript("How much is", is_final=True) is None
+    assert small_talk.on_transcript("a facial?", is_final=True) is None
+    assert not small_talk.end_turn("How much is a facial?")
+
+
+def test_a_greeting_is_not_answered_while_a_question_may_follow():
+    small_talk = SmallTalkShortCircuit()
+    # A final segment while the caller is still speaking doesn't end the utterance
+    assert small_talk.on_transcript("Hi,", is_final=True, user_speaking=True) is None
+    assert small_talk.on_transcript("how much is a brow tint?", is_final=True) is None
+    assert not small_talk.end_turn("Hi, how much is a brow tint?")
+
+    # Answered once the caller paused, but a question after that still goes to the LLM
+    assert small_talk.on_transcript("Thanks,", is_final=True) is not None
+    assert small_talk.on_transcript("and do you offer microblading?", is_final=True) is None
+    assert not small_talk.end_turn("Thanks, and do you offer microblading?")
+
+
+@pytest.mark.parametrize("answer", ["no", "yes", "yes please", "okay"])
+def test_answers_are_not_responded_to_early(answer):
+    small_talk = SmallTalkShortCircuit()
+    assert small_talk.on_transcript(answer, is_final=False) is None
+    assert small_talk.on_transcript(answer, is_final=True) is None
+    assert not small_talk.end_turn(answer)
+    assert small_talk.stats()["early_responses"] == 0
+
+
+def test_time_to_first_audio_is_tracked_per_kind_of_turn():
+    small_talk = SmallTalkShortCircuit()
+    small_talk.on_user_stopped_speaking(10.0)
+    small_talk.on_transcript("thanks", is_final=True)
+    small_talk.on_agent_started_speaking(10.3)
+
+    small_talk.on_user_stopped_speaking(20.0)
+    small_talk.record_turn(short_circuited=False)
+    small_talk.on_agent_started_speaking(21.5)
+
+    assert small_talk.stats()["mean_first_audio_ms"] == {"early": pytest.approx(300), "llm": pytest.approx(1500)}
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from livekit.agents import ChatContext, ChatMessage
+
+from agent import Assistant
+from answer_index import LearnedAnswerIndex
+from database import Database
+from speculative_lookup import SpeculativeLookup
+
+
+@pytest.fixture
+async def index(tmp_path):
+    database = Database(str(tmp_path / "help_requests.db"))
+    await database.add_learned_answer("Do you offer hair extensions?", "Yes, tape-in and clip-in.")
+    yield LearnedAnswerIndex(database, revalidate_interval=0)
+    database.close()
+
+
+async def test_search_runs_ahead_of_end_of_turn(index):
+    lookup = SpeculativeLookup(index)
+    lookup.on_transcript("Hi, I was wondering.", is_final=True)
+    lookup.on_transcript("do you offer hair", is_final=False)
+    lookup.on_transcript("do you offer hair extensions?", is_final=True)
+    task = lookup._task
+    await asyncio.sleep(0.05)
+    assert task.done()
+
+    answer = await lookup.match("Hi, I was wondering. do you offer hair extensions?")
+    assert answer.answer == "Yes, tape-in and clip-in."
+    # A different final transcript is searched afresh; a similar but different
+    # service is not confident enough to answer with
+    assert await lookup.match("Do you offer eyelash extensions?") is None
+
+    stats = lookup.stats(mean_llm_ttft_ms=400.0)
+    assert (stats["lookups"], stats["hits"], stats["hit_rate"]) == (2, 1, 0.5)
+    assert stats["latency_saved_ms"] == 400.0
+
+
+async def test_switched_off(index):
+    lookup = SpeculativeLookup(index, mode="off")
+    lookup.on_transcript("Do you offer hair extensions?", is_final=True)
+    assert lookup._task is None
+    assert await lookup.match("Do you offer hair extensions?") is None
+    with pytest.raises(ValueError):
+        SpeculativeLookup(index, mode="sometimes")
+
+
+async def test_hit_is_injected_into_the_turn(index):
+    assistant = Assistant(db=index.db, answer_index=index)
+    assistant.on_transcript("Do you offer hair extensions?", is_final=True)
+    turn_ctx = ChatContext()
+    message = ChatMessage(role="user", content=["Do you offer hair extensions?"])
+    turn_ctx.items.append(message)
+
+    await assistant.on_user_turn_completed(turn_ctx, message)
+    assert turn_ctx.items[-1].role == "system"
+    assert "tape-in and clip-in" in turn_ctx.items[-1].text_content
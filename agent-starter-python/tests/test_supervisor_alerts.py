@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from agent import ESCALATION_RESPONSE, Assistant
+from database import Database, RequestStatus
+from supervisor_alerts import SupervisorAlert, SupervisorAlertDispatcher
+
+
+async def test_alerts_are_batched():
+    batches = []
+
+    async def send(alerts):
+        batches.append([alert.request_id for alert in alerts])
+
+    dispatcher = SupervisorAlertDispatcher(send, max_batch=3, batch_interval=0.05)
+    for i in range(5):
+        dispatcher.enqueue(SupervisorAlert(f"r{i}", f"q{i}", "+15550000000"))
+    assert await dispatcher.drain(timeout=1)
+    assert batches == [["r0", "r1", "r2"], ["r3", "r4"]]
+    assert dispatcher.stats()["sent"] == 5
+    await dispatcher.aclose()
+
+
+async def test_failed_batches_are_retried_then_given_up():
+    attempts = []
+
+    async def send(alerts):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3 or alerts[0].request_id == "doomed":
+            raise ConnectionError("SMS gateway down")
+
+    dispatcher = SupervisorAlertDispatcher(send, batch_interval=0, max_attempts=3, retry_delay=0.02)
+    dispatcher.enqueue(SupervisorAlert("r1", "q1", "+15550000000"))
+    assert await dispatcher.drain(timeout=1)
+    # Backoff doubles: 20 ms, then 40 ms
+    assert attempts[2] - attempts[1] > attempts[1] - attempts[0]
+    assert dispatcher.sent == 1 and dispatcher.retries == 2
+
+    dispatcher.enqueue(SupervisorAlert("doomed", "q2", "+15550000000"))
+    assert await dispatcher.drain(timeout=1)
+    assert dispatcher.failed == 1
+    await dispatcher.aclose()
+
+
+async def test_request_help_does_not_wait_for_the_alert(tmp_path):
+    delivered = asyncio.Event()
+
+    async def slow_send(alerts):
+        await asyncio.sleep(0.5)
+        delivered.set()
+
+    db = Database(str(tmp_path / "help_requests.db"))
+    try:
+        assistant = Assistant(db=db, alerts=SupervisorAlertDispatcher(slow_send, batch_interval=0))
+        start = time.perf_counter()
+        response = await assistant.request_help(None, "Do you do hair extensions?")
+        elapsed = time.perf_counter() - start
+
+        assert response == ESCALATION_RESPONSE
+        assert elapsed < 0.25
+        assert not delivered.is_set()
+        # Already durable when the tool returns
+        (request,) = await db.get_requests_by_status(RequestStatus.PENDING)
+        assert request.question == "Do you do hair extensions?"
+
+        await assistant.alerts.aclose()
+        assert delivered.is_set()
+        assert assistant.tool_metrics.stats()["request_help"]["calls"] == 1
+    finally:
+        db.close()
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from database import Database, RequestStatus
+from timeout_service import TimeoutService
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "help_requests.db"))
+    yield database
+    database.close()
+
+
+async def _run(service: TimeoutService):
+    task = asyncio.create_task(service.start_monitoring())
+    await asyncio.sleep(0.05)
+    return task
+
+
+async def _stop(service: TimeoutService, task):
+    service.stop_monitoring()
+    await asyncio.wait_for(task, timeout=1)
+
+
+async def test_requests_expire_at_their_deadline(db):
+    service = TimeoutService(db, timeout_hours=0.3 / 3600, sync_interval=60)
+    await db.create_help_request("old", "+15550000000", "Do you do perms?")
+    task = await _run(service)
+    assert service.pending_count == 1
+
+    await db.create_help_request("new", "+15550000000", "Do you sell gift cards?")
+    await db.create_help_request("answered", "+15550000000", "Is parking free?")
+    await db.resolve_help_request("answered", "Yes.")
+    assert service.pending_count == 2
+
+    await asyncio.sleep(0.3)
+    assert (await db.get_request("old")).status == RequestStatus.UNRESOLVED
+    await asyncio.sleep(0.15)
+    assert (await db.get_request("new")).status == RequestStatus.UNRESOLVED
+    assert (await db.get_request("answered")).status == RequestStatus.RESOLVED
+    assert service.pending_count == 0
+
+    await _stop(service, task)
+
+
+async def test_picks_up_requests_from_other_processes(db):
+    other = Database(db.db_path)
+    service = TimeoutService(db, timeout_hours=0.2 / 3600, sync_interval=0.05)
+    task = await _run(service)
+    try:
+        await other.create_help_request("remote", "+15550000000", "Do you do perms?")
+        await asyncio.sleep(0.1)
+        assert service.pending_count == 1
+
+        await asyncio.sleep(0.3)
+        assert (await db.get_request("remote")).status == RequestStatus.UNRESOLVED
+    finally:
+        await _stop(service, task)
+        other.close()
+
+
+async def test_idle_sync_does_not_query_requests(db, monkeypatch):
+    service = TimeoutService(db, timeout_hours=24, sync_interval=0.01)
+    task = await _run(service)
+
+    calls = []
+    original = db.get_pending_deadlines
+
+    async def counting(*args):
+        calls.append(args)
+        return await original(*args)
+
+    monkeypatch.setattr(db, "get_pending_deadlines", counting)
+    await asyncio.sleep(0.1)
+    assert calls == []
+
+    await _stop(service, task)
+
+
+async def test_tracks_schema_1_requests_before_they_are_migrated(tmp_path, monkeypatch):
+    import sqlite3
+    from datetime import datetime, timedelta
+
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE help_requests (id TEXT PRIMARY KEY, customer_phone TEXT NOT NULL, "
+                 "question TEXT NOT NULL, status TEXT NOT NULL, created_at TIMESTAMP NOT NULL, "
+                 "supervisor_response TEXT, responded_at TIMESTAMP)")
+    conn.execute("CREATE TABLE learned_answers (id TEXT PRIMARY KEY, question TEXT NOT NULL, "
+                 "answer TEXT NOT NULL, learned_at TIMESTAMP NOT NULL)")
+    now = datetime.now()
+    conn.executemany("INSERT INTO help_requests VALUES (?, ?, ?, 'pending', ?, NULL, NULL)", [
+        ("stale", "+15550000000", "Do you do perms?", str(now - timedelta(days=2))),
+        ("fresh", "+15550000000", "Is parking free?", str(now)),
+    ])
+    conn.commit()
+    conn.close()
+
+    # Hold the background migration back so the rows stay text
+    monkeypatch.setattr(Database, "_run_timestamp_migration", lambda self, batch_size=1000: None)
+    db = Database(path)
+    service = TimeoutService(db, timeout_hours=24, sync_interval=60)
+    task = await _run(service)
+    try:
+        assert not task.done()
+        assert (await db.get_request("stale")).status == RequestStatus.UNRESOLVED
+        assert (await db.get_request("fresh")).status == RequestStatus.PENDING
+        assert service.pending_count == 1
+    finally:
+        await _stop(service, task)
+        db.close()
+
+
+async def test_a_failed_first_sync_is_retried(db, monkeypatch):
+    await db.create_help_request("waiting", "+15550000000", "Do you do perms?")
+    original = db.get_pending_deadlines
+    failures = [RuntimeError("database is locked")]
+
+    async def flaky(*args):
+        if failures:
+            raise failures.pop()
+        return await original(*args)
+
+    monkeypatch.setattr(db, "get_pending_deadlines", flaky)
+    service = TimeoutService(db, timeout_hours=24, sync_interval=60, retry_interval=0.01)
+    task = await _run(service)
+    assert not failures and not task.done()
+    assert service.pending_count == 1
+
+    await _stop(service, task)
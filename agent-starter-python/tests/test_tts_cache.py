@@ -0,0 +1,136 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from livekit import rtc
+
+from offline_plugins import ToneTTS
+
+from tts_cache import TTSCache
+
+
+def _frames(count, sample_rate=24000, value=1):
+    samples = sample_rate // 50
+    return [rtc.AudioFrame(bytes([value, 0]) * samples, sample_rate, 1, samples) for _ in range(count)]
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class FakeProvider:
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, text):
+        async def synthesize():
+            self.requests.append("".join([chunk async for chunk in text]))
+            for frame in _frames(3, value=2):
+                yield frame
+        return synthesize()
+
+
+async def test_hits_play_from_disk_without_a_provider_request(tmp_path):
+    cache = TTSCache(str(tmp_path), "voice", "model")
+    cache.put("Thank you for calling!", _frames(5))
+
+    # A fresh instance (another worker process) finds the entry on disk
+    reopened = TTSCache(str(tmp_path), "voice", "model")
+    provider = FakeProvider()
+    frames = [f async for f in reopened.speak(_chunks("Thank you ", " for  calling!"), provider)]
+    assert provider.requests == []
+    assert len(frames) == 5
+    assert frames[0].sample_rate == 24000
+    assert bytes(frames[0].data.cast("B"))[:2] == b"\x01\x00"
+    assert reopened.stats()["hits"] == 1
+
+    # Other voices and models do not share entries
+    assert "Thank you for calling!" not in TTSCache(str(tmp_path), "other-voice", "model")
+    reopened.close()
+
+
+async def test_misses_stream_through_and_frequent_lines_are_learned(tmp_path):
+    cache = TTSCache(str(tmp_path), "voice", "model", learn_after=2)
+    cache.put("Thank you for calling!", _frames(5))
+    provider = FakeProvider()
+
+    # Diverges from the cached line, so everything buffered is replayed to the provider
+    frames = [f async for f in cache.speak(_chunks("Thank you ", "for waiting."), provider)]
+    assert provider.requests == ["Thank you for waiting."]
+    assert len(frames) == 3
+
+    hours = ("We're open ", "9AM-7PM on weekdays.")
+    for _ in range(2):
+        [f async for f in cache.speak(_chunks(*hours), provider)]
+    assert len(provider.requests) == 3
+    assert [f async for f in cache.speak(_chunks(*hours), provider)]
+    assert len(provider.requests) == 3
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 3, "learned": 1, "evicted": 0}
+
+
+async def test_prewarm_synthesizes_lines_concurrently(tmp_path):
+    cache = TTSCache(str(tmp_path), "voice", "model")
+    lines = ["Hello!", "Yes, I can hear you.", "We open at 9.", "Thank you for calling!"]
+    started = time.perf_counter()
+    assert await cache.prewarm(ToneTTS(ttfb=0.2, chars_per_second=200), lines) == 4
+    # One provider round trip, not four
+    assert time.perf_counter() - started < 0.6
+    assert all(line in cache for line in lines)
+    cache.close()
+
+
+class FlakyTTS:
+    """Synthesizes a tone, except for the texts in `fail`"""
+
+    def __init__(self, fail):
+        self.fail = fail
+
+    @asynccontextmanager
+    async def synthesize(self, text):
+        if text in self.fail:
+            raise ConnectionError("provider unavailable")
+
+        async def stream():
+            for frame in _frames(2):
+                yield SimpleNamespace(frame=frame)
+
+        yield stream()
+
+
+async def test_lines_that_fail_to_prewarm_are_left_to_live_tts(tmp_path):
+    cache = TTSCache(str(tmp_path), "voice", "model")
+    assert await cache.prewarm(FlakyTTS({"We open at 9."}), ["Hello!", "We open at 9."]) == 1
+    assert "Hello!" in cache
+    assert "We open at 9." not in cache
+    cache.close()
+
+
+async def test_learned_entries_are_evicted_least_recently_played_first(tmp_path):
+    entry_bytes = 3200
+    cache = TTSCache(str(tmp_path), "voice", "model", learn_after=1, max_learned_bytes=3 * entry_bytes)
+    cache.put("Thank you for calling!", _frames(5))
+    provider = FakeProvider()
+
+    async def say(line):
+        return [f async for f in cache.speak(_chunks(line), provider)]
+
+    for line in ("We open at 9.", "We close at 7.", "Parking is free."):
+        await say(line)
+    # Three learned lines (2880 bytes of audio each plus a header) fit the budget
+    assert cache.stats()["evicted"] == 0
+    await say("We open at 9.")
+    await say("Gift cards start at $25.")
+
+    assert cache.stats()["evicted"] == 1
+    assert "We close at 7." not in cache
+    assert all(line in cache for line in ("We open at 9.", "Parking is free.", "Gift cards start at $25."))
+    # Prewarmed lines are never evicted, and deleted files are gone from disk
+    assert "Thank you for calling!" in cache
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".pcm")]) == 4
+
+    reopened = TTSCache(str(tmp_path), "voice", "model", max_learned_bytes=entry_bytes)
+    assert "Thank you for calling!" in reopened and len(reopened) == 2
+    cache.close()
+    reopened.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Train and evaluate the local service-question intent model
+
+Usage:
+    python train_intent_model.py train [--db help_requests.db] [--labels extra.tsv] [--output intent_model.npz]
+    python train_intent_model.py report [--model intent_model.npz] [--db help_requests.db] [--labels extra.tsv]
+
+Labelled examples come from escalation history (see intent_model.load_history),
+small-talk seeds built from the classifier's phrase lists, and optional TSV
+files of `label<TAB>text` lines. The agent picks the model up from
+intent_model.npz (or INTENT_MODEL_PATH) at startup.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, 'src')
+
+from intent_model import IntentModel, load_history, load_labels, seed_examples
+from question_classifier import QuestionClassifier
+
+
+def _load_examples(args) -> tuple:
+    texts, labels = seed_examples()
+    if os.path.exists(args.db):
+        history = load_history(args.db)
+        texts += history[0]
+        labels += history[1]
+        print(f"Loaded {len(history[0])} labelled questions from {args.db}")
+    else:
+        print(f"No database at {args.db}, training on seed examples only")
+    for path in args.labels or []:
+        extra = load_labels(path)
+        texts += extra[0]
+        labels += extra[1]
+        print(f"Loaded {len(extra[0])} labelled questions from {path}")
+    return texts, labels
+
+
+def _scores(predicted, labels) -> dict:
+    predicted, labels = np.asarray(predicted, dtype=bool), np.asarray(labels, dtype=bool)
+    return {
+        "accuracy": float((predicted == labels).mean()),
+        # Non-service utterances that would still become supervisor tickets
+        "false_escalations": int((predicted & ~labels).sum()),
+        "missed_service": int((~predicted & labels).sum()),
+    }
+
+
+def _heuristic_predict(texts):
+    QuestionClassifier.intent_model = None
+    return [c.is_service for c in QuestionClassifier.classify_batch(texts)]
+
+
+def _per_utterance_us(predict, texts, repeat: int = 20) -> tuple:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        predict(texts)
+    batch = (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+    start = time.perf_counter()
+    for text in texts:
+        predict([text])
+    single = (time.perf_counter() - start) / len(texts) * 1e6
+    return batch, single
+
+
+def train(args):
+    texts, labels = _load_examples(args)
+    order = list(range(len(texts)))
+    random.Random(args.seed).shuffle(order)
+    split = int(len(order) * (1 - args.test_fraction))
+    train_idx, test_idx = order[:split], order[split:]
+
+    options = {"n_features": 2 ** args.hash_bits, "epochs": args.epochs}
+    holdout = {}
+    if test_idx:
+        model = IntentModel.train([texts[i] for i in train_idx], [labels[i] for i in train_idx], **options)
+        test_texts, test_labels = [texts[i] for i in test_idx], [labels[i] for i in test_idx]
+        holdout = _scores(model.predict(test_texts), test_labels)
+        baseline = _scores(_heuristic_predict(test_texts), test_labels)
+        print(f"\nHeld-out {len(test_idx)} examples")
+        print(f"{'':<12} {'accuracy':>9} {'false escalations':>18} {'missed service':>15}")
+        for label, s in (("heuristic", baseline), ("model", holdout)):
+            print(f"{label:<12} {s['accuracy']:>9.3f} {s['false_escalations']:>18} {s['missed_service']:>15}")
+
+    # The shipped model is fit on everything; the held-out scores go in its metadata
+    start = time.perf_counter()
+    model = IntentModel.train(texts, labels, **options)
+    model.metrics = {"examples": len(texts), **{f"holdout_{k}": v for k, v in holdout.items()}}
+    model.save(args.output)
+    print(f"\nTrained on {len(texts)} examples in {time.perf_counter() - start:.1f}s, saved {args.output}")
+
+
+def report(args):
+    model = IntentModel.load(args.model)
+    texts, labels = _load_examples(args)
+    print(f"\n{len(texts)} labelled examples (training data, so model accuracy is optimistic)")
+    if model.metrics:
+        print(f"Model metadata: {model.metrics}")
+
+    print(f"\n{'':<12} {'accuracy':>9} {'false esc.':>11} {'missed':>7} {'batch us/utt':>13} {'single us':>10}")
+    for label, predict in (("heuristic", _heuristic_predict), ("model", model.predict)):
+        s = _scores(predict(texts), labels)
+        batch, single = _per_utterance_us(predict, texts)
+        print(f"{label:<12} {s['accuracy']:>9.3f} {s['false_escalations']:>11} {s['missed_service']:>7} "
+              f"{batch:>13.1f} {single:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_cmd = sub.add_parser("train", help="train a model from escalation history")
+    train_cmd.add_argument("--output", default="intent_model.npz")
+    train_cmd.add_argument("--hash-bits", type=int, default=18)
+    train_cmd.add_argument("--epochs", type=int, default=300)
+    train_cmd.add_argument("--test-fraction", type=float, default=0.2)
+    train_cmd.add_argument("--seed", type=int, default=13)
+    train_cmd.set_defaults(func=train)
+
+    report_cmd = sub.add_parser("report", help="accuracy and latency against the keyword heuristic")
+    report_cmd.add_argument("--model", default="intent_model.npz")
+    report_cmd.set_defaults(func=report)
+
+    for cmd in (train_cmd, report_cmd):
+        cmd.add_argument("--db", default="help_requests.db")
+        cmd.add_argument("--labels", action="append", help="TSV of label<TAB>text lines; repeatable")
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
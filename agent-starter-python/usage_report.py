@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Hourly and daily usage, cost and latency of agent sessions, for sizing worker
+fleets and provider quotas
+
+Usage:
+    python usage_report.py [--period hour|day] [--since 2025-10-01] [--db help_requests.db]
+                           [--llm-input-per-million 0.11] [--llm-output-per-million 0.34]
+                           [--stt-per-hour 0.04] [--tts-per-thousand-chars 0.15]
+
+Every agent session appends one usage record at shutdown. Each run first folds
+the records added since the previous run into the stored rollups, so the cost
+of a report does not grow with history. Costs are computed from the rollups at
+report time, so changing a price takes effect for past periods too. Latency
+percentiles are approximate (histogram bucket bounds).
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+sys.path.insert(0, 'src')
+
+from database import Database, UsageRollup, latency_percentile
+
+STAGES = (("llm_ttft", "LLM TTFT"), ("tts_ttfb", "TTS TTFB"), ("end_of_utterance", "EOU"),
+          ("tool:request_help", "request_help"))
+
+
+def _cost(rollup: UsageRollup, args) -> float:
+    return (rollup.llm_prompt_tokens / 1e6 * args.llm_input_per_million
+            + rollup.llm_completion_tokens / 1e6 * args.llm_output_per_million
+            + rollup.stt_audio_seconds / 3600 * args.stt_per_hour
+            + rollup.tts_characters / 1000 * args.tts_per_thousand_chars)
+
+
+def _percentiles(rollup: UsageRollup, stage: str) -> str:
+    summary = rollup.latency.get(stage)
+    p50, p95 = latency_percentile(summary, 50), latency_percentile(summary, 95)
+    return f"{p50:5.0f}/{p95:<5.0f}" if p50 is not None else f"{'-':>5}/{'-':<5}"
+
+
+async def report(args):
+    db = Database(args.db)
+    try:
+        folded = await db.roll_up_usage()
+        rollups = await db.get_usage_rollups(args.period, args.since)
+    finally:
+        db.close()
+
+    print(f"Folded {folded} new session(s) into the rollups\n")
+    if not rollups:
+        print("No sessions recorded")
+        return
+    start_format = "%Y-%m-%d %H:00" if args.period == "hour" else "%Y-%m-%d"
+    print(f"{args.period:<16} {'sessions':>8} {'minutes':>8} {'turns':>6} {'escal':>6} {'LLM in':>9} "
+          f"{'LLM out':>8} {'STT min':>8} {'TTS chars':>9} {'cost $':>8}  "
+          + "  ".join(f"{label + ' p50/p95':>17}" for _, label in STAGES))
+    totals = UsageRollup(args.period, datetime.now())
+    for rollup in rollups:
+        print(f"{rollup.period_start.strftime(start_format):<16} {rollup.sessions:>8} "
+              f"{rollup.duration_seconds / 60:>8.1f} {rollup.turns:>6} {rollup.escalations:>6} "
+              f"{rollup.llm_prompt_tokens:>9} {rollup.llm_completion_tokens:>8} "
+              f"{rollup.stt_audio_seconds / 60:>8.1f} {rollup.tts_characters:>9} {_cost(rollup, args):>8.3f}  "
+              + "  ".join(f"{_percentiles(rollup, stage):>17}" for stage, _ in STAGES))
+        for name in ("sessions", "duration_seconds", "llm_prompt_tokens", "llm_completion_tokens",
+                     "stt_audio_seconds", "tts_characters"):
+            setattr(totals, name, getattr(totals, name) + getattr(rollup, name))
+    print(f"\nTotal: {totals.sessions} sessions, {totals.duration_seconds / 60:.1f} minutes, "
+          f"${_cost(totals, args):.2f} (${_cost(totals, args) / totals.sessions:.4f} per session)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--period", choices=["hour", "day"], default="hour")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="first period to show, local time")
+    parser.add_argument("--db", default="help_requests.db")
+    # Defaults are list prices for the models the agent uses; override with your contract rates
+    parser.add_argument("--llm-input-per-million", type=float, default=0.11, help="USD per 1M prompt tokens")
+    parser.add_argument("--llm-output-per-million", type=float, default=0.34, help="USD per 1M completion tokens")
+    parser.add_argument("--stt-per-hour", type=float, default=0.04, help="USD per hour of transcribed audio")
+    parser.add_argument("--tts-per-thousand-chars", type=float, default=0.15, help="USD per 1000 TTS characters")
+    asyncio.run(report(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()